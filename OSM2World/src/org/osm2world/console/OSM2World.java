@@ -30,6 +30,14 @@ public class OSM2World {
 
 	public static void main(String[] unparsedArgs) {
 		
+		/* long-lived job server for Touch Mapper */
+		
+		if (unparsedArgs.length > 0
+				&& TouchMapperJobServer.ARGUMENT.equals(unparsedArgs[0])) {
+			System.exit(TouchMapperJobServer.run(
+					Arrays.copyOfRange(unparsedArgs, 1, unparsedArgs.length)));
+		}
+		
 		/* assume --gui if no parameters are given */
 		
 		if (unparsedArgs.length == 0) {
@@ -145,6 +153,24 @@ public class OSM2World {
 		
 	}
 
+	/**
+	 * runs a single conversion without a config file, like the command line
+	 * does, but throws exceptions instead of printing them.
+	 * Used by {@link TouchMapperJobServer}.
+	 */
+	static void convert(String[] unparsedArgs) throws Exception {
+		
+		CLIArguments args = parseArguments(unparsedArgs);
+		
+		if (getProgramMode(args) != ProgramMode.CONVERT) {
+			throw new IllegalArgumentException("not a conversion: "
+					+ Arrays.toString(unparsedArgs));
+		}
+		
+		Output.output(new BaseConfiguration(), new CLIArgumentsGroup(args));
+		
+	}
+
 	private static void executeArgumentsGroup(CLIArgumentsGroup argumentsGroup) {
 		
 		/* load configuration file */
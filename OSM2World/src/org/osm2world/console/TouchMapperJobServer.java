@@ -0,0 +1,366 @@
+package org.osm2world.console;
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.lang.management.MemoryUsage;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.SocketTimeoutException;
+import java.nio.charset.Charset;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.nio.file.attribute.PosixFilePermissions;
+import java.security.MessageDigest;
+import java.security.SecureRandom;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+import org.osm2world.core.map_data.object_info.ObjectInfoManager;
+import org.osm2world.core.target.obj.ObjTarget;
+import org.osm2world.core.util.TouchMapperSettings;
+
+import com.fasterxml.jackson.databind.ObjectMapper;
+
+/**
+ * Runs Touch Mapper conversions in a long-lived JVM, so that JVM startup,
+ * class loading and JIT warm-up are paid once instead of once per map.
+ *
+ * The server listens on an ephemeral port of 127.0.0.1 and writes
+ * {"port": ..., "token": ..., "pid": ...} to a port file that only its owner
+ * can read. Each connection carries one JSON line request and gets one JSON
+ * line reply; requests without the token are rejected.
+ * {"ping": true} is a health check. A job request has input, output, scale,
+ * extruderWidth, excludeBuildings and logPath; the conversion's console
+ * output goes to logPath. The server exits after maxJobs jobs, after a
+ * failed job, or when no connection arrives for idleSeconds.
+ */
+public final class TouchMapperJobServer {
+
+	public static final String ARGUMENT = "--touch-mapper-job-server";
+
+	private static final Charset UTF8 = Charset.forName("UTF-8");
+	private static final int REQUEST_READ_TIMEOUT_MILLIS = 10000;
+
+	private final File portFile;
+	private final int maxJobs;
+	private final int idleSeconds;
+	private final String token = newToken();
+	private final ObjectMapper mapper = new ObjectMapper();
+
+	private ServerSocket serverSocket;
+	private int jobs = 0;
+
+	private TouchMapperJobServer(File portFile, int maxJobs, int idleSeconds) {
+		this.portFile = portFile;
+		this.maxJobs = maxJobs;
+		this.idleSeconds = idleSeconds;
+	}
+
+	/**
+	 * entry point for {@link OSM2World#main} when its first argument is
+	 * {@link #ARGUMENT}; args are PORT_FILE [MAX_JOBS [IDLE_SECONDS]]
+	 *
+	 * @return exit status
+	 */
+	static int run(String[] args) {
+
+		if (args.length < 1 || args.length > 3) {
+			System.err.println("usage: " + ARGUMENT
+					+ " PORT_FILE [MAX_JOBS [IDLE_SECONDS]]");
+			return 2;
+		}
+
+		int maxJobs = 25;
+		int idleSeconds = 900;
+
+		try {
+			if (args.length > 1) {
+				maxJobs = Math.max(1, Integer.parseInt(args[1]));
+			}
+			if (args.length > 2) {
+				idleSeconds = Math.max(1, Integer.parseInt(args[2]));
+			}
+		} catch (NumberFormatException e) {
+			System.err.println("invalid number: " + e.getMessage());
+			return 2;
+		}
+
+		try {
+			new TouchMapperJobServer(new File(args[0]), maxJobs, idleSeconds).serve();
+			return 0;
+		} catch (IOException e) {
+			e.printStackTrace();
+			return 1;
+		}
+
+	}
+
+	private void serve() throws IOException {
+
+		serverSocket = new ServerSocket(0, 50, InetAddress.getByName("127.0.0.1"));
+		serverSocket.setSoTimeout(idleSeconds * 1000);
+		writePortFile(serverSocket.getLocalPort());
+
+		System.err.println("job server listening on port "
+				+ serverSocket.getLocalPort() + " (max " + maxJobs + " jobs, idle timeout "
+				+ idleSeconds + " s)");
+
+		try {
+			while (serverSocket != null) {
+
+				Socket socket;
+
+				try {
+					socket = serverSocket.accept();
+				} catch (SocketTimeoutException e) {
+					System.err.println("idle for " + idleSeconds + " s, exiting");
+					break;
+				}
+
+				try {
+					handle(socket);
+				} catch (IOException e) {
+					e.printStackTrace();
+				} finally {
+					socket.close();
+				}
+
+			}
+		} finally {
+			stopListening();
+		}
+
+	}
+
+	private void handle(Socket socket) throws IOException {
+
+		socket.setSoTimeout(REQUEST_READ_TIMEOUT_MILLIS);
+		BufferedReader reader = new BufferedReader(
+				new InputStreamReader(socket.getInputStream(), UTF8));
+		String line = reader.readLine();
+
+		if (line == null) {
+			return;
+		}
+
+		Map<String, Object> reply;
+
+		@SuppressWarnings("unchecked")
+		Map<String, Object> request = mapper.readValue(line, Map.class);
+
+		if (!isAuthorized(request.get("token"))) {
+			reply = new LinkedHashMap<String, Object>();
+			reply.put("ok", false);
+			reply.put("error", "invalid token");
+		} else if (Boolean.TRUE.equals(request.get("ping"))) {
+			reply = new LinkedHashMap<String, Object>();
+			reply.put("ok", true);
+			reply.put("jobs", jobs);
+		} else {
+			reply = runJob(request);
+			if (!Boolean.TRUE.equals(reply.get("ok")) || jobs >= maxJobs) {
+				/* stop accepting before replying, so that the client's next
+				 * job can't connect to a server that is about to exit */
+				reply.put("exiting", true);
+				stopListening();
+			}
+		}
+
+		OutputStream out = socket.getOutputStream();
+		out.write((mapper.writeValueAsString(reply) + "\n").getBytes(UTF8));
+		out.flush();
+
+	}
+
+	private Map<String, Object> runJob(Map<String, Object> request) {
+
+		Map<String, Object> reply = new LinkedHashMap<String, Object>();
+
+		resetPeakUsage();
+		long start = System.nanoTime();
+
+		PrintStream originalOut = System.out;
+		PrintStream originalErr = System.err;
+		PrintStream log = null;
+
+		try {
+
+			String input = (String) request.get("input");
+			String output = (String) request.get("output");
+			float scale = ((Number) request.get("scale")).floatValue();
+			float extruderWidth = ((Number) request.get("extruderWidth")).floatValue();
+			boolean excludeBuildings = Boolean.TRUE.equals(request.get("excludeBuildings"));
+
+			log = new PrintStream(new FileOutputStream(
+					(String) request.get("logPath")), true, "UTF-8");
+			System.setOut(log);
+			System.setErr(log);
+
+			TouchMapperSettings.configure(scale, extruderWidth, excludeBuildings);
+			ObjectInfoManager.reset();
+			ObjTarget.resetAnonymousMaterialCounter();
+
+			OSM2World.convert(new String[] {"-i", input, "-o", output});
+
+			reply.put("ok", true);
+
+		} catch (Throwable t) {
+			t.printStackTrace();
+			reply.put("ok", false);
+			reply.put("error", String.valueOf(t));
+		} finally {
+			System.setOut(originalOut);
+			System.setErr(originalErr);
+			if (log != null) {
+				log.close();
+			}
+		}
+
+		jobs += 1;
+
+		MemoryUsage heap = ManagementFactory.getMemoryMXBean().getHeapMemoryUsage();
+		reply.put("seconds", (System.nanoTime() - start) / 1e9);
+		reply.put("heapUsedBytes", heap.getUsed());
+		reply.put("heapPeakBytes", heapPeakBytes());
+		reply.put("heapMaxBytes", heap.getMax());
+		Long maxRssKiB = maxRssKiB();
+		if (maxRssKiB != null) {
+			reply.put("maxRssKiB", maxRssKiB);
+		}
+		reply.put("jobs", jobs);
+
+		return reply;
+
+	}
+
+	private boolean isAuthorized(Object requestToken) {
+		return requestToken instanceof String && MessageDigest.isEqual(
+				token.getBytes(UTF8), ((String) requestToken).getBytes(UTF8));
+	}
+
+	private void stopListening() throws IOException {
+
+		if (serverSocket == null) {
+			return;
+		}
+
+		serverSocket.close();
+		serverSocket = null;
+
+		/* a newer server may already own the port file */
+		try {
+			String content = new String(Files.readAllBytes(portFile.toPath()), UTF8);
+			if (content.contains(token)) {
+				Files.deleteIfExists(portFile.toPath());
+			}
+		} catch (IOException e) {
+			// already gone
+		}
+
+	}
+
+	private void writePortFile(int port) throws IOException {
+
+		Map<String, Object> content = new LinkedHashMap<String, Object>();
+		content.put("port", port);
+		content.put("token", token);
+		content.put("pid", pid());
+
+		File directory = portFile.getAbsoluteFile().getParentFile();
+		Path tempPath = Files.createTempFile(directory.toPath(),
+				portFile.getName(), ".tmp",
+				PosixFilePermissions.asFileAttribute(
+						PosixFilePermissions.fromString("rw-------")));
+
+		Files.write(tempPath, mapper.writeValueAsBytes(content));
+		Files.move(tempPath, portFile.toPath(),
+				StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE);
+
+	}
+
+	private static String newToken() {
+		byte[] bytes = new byte[16];
+		new SecureRandom().nextBytes(bytes);
+		StringBuilder result = new StringBuilder();
+		for (byte b : bytes) {
+			result.append(String.format("%02x", b & 0xff));
+		}
+		return result.toString();
+	}
+
+	private static long pid() {
+		/* "pid@hostname" on HotSpot */
+		String name = ManagementFactory.getRuntimeMXBean().getName();
+		try {
+			return Long.parseLong(name.split("@")[0]);
+		} catch (NumberFormatException e) {
+			return -1;
+		}
+	}
+
+	private static void resetPeakUsage() {
+
+		for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+			if (pool.getType() == MemoryType.HEAP) {
+				pool.resetPeakUsage();
+			}
+		}
+
+		/* lets VmHWM measure this job only (Linux 4.0+) */
+		try {
+			Files.write(new File("/proc/self/clear_refs").toPath(), "5".getBytes(UTF8));
+		} catch (IOException e) {
+			// VmHWM then covers the whole server lifetime
+		} catch (SecurityException e) {
+			// same
+		}
+
+	}
+
+	/**
+	 * @return sum of the heap pools' peak usage since the last
+	 *         {@link #resetPeakUsage()}, which is an upper bound of the peak heap use
+	 */
+	private static long heapPeakBytes() {
+		long result = 0;
+		for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+			if (pool.getType() == MemoryType.HEAP) {
+				MemoryUsage peak = pool.getPeakUsage();
+				if (peak != null) {
+					result += peak.getUsed();
+				}
+			}
+		}
+		return result;
+	}
+
+	private static Long maxRssKiB() {
+		try {
+			List<String> lines = Files.readAllLines(
+					new File("/proc/self/status").toPath(), UTF8);
+			for (String line : lines) {
+				if (line.startsWith("VmHWM:")) {
+					String[] parts = line.substring(6).trim().split("\\s+");
+					return Long.parseLong(parts[0]);
+				}
+			}
+		} catch (IOException e) {
+			// not Linux
+		} catch (NumberFormatException e) {
+			// unexpected format
+		}
+		return null;
+	}
+
+}
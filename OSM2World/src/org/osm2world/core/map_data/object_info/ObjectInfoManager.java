@@ -17,7 +17,17 @@ public class ObjectInfoManager {
 	private static Map<String, WayObject> ways = new HashMap<>();
 	private static Map<String, PoiObject> pois = new HashMap<>();
 	private static Map<String, Map<String, PoiObject>> poiByType = new HashMap<>(); // tram_stop => Jaakkimantie => WayObject
-	
+
+	/**
+	 * forgets the ways and POIs of the previous conversion;
+	 * needed when one JVM runs several conversions
+	 */
+	public static void reset() {
+		ways = new HashMap<>();
+		pois = new HashMap<>();
+		poiByType = new HashMap<>();
+	}
+
 	public static void addRoadSegment(MapWaySegment line) {
 		try {
 			String name = line.getTags().getValue("name");
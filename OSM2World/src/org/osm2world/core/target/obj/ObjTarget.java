@@ -57,6 +57,14 @@ public class ObjTarget extends FaceTarget<RenderableToObj> {
 				
 	}
 	
+	/**
+	 * restarts the numbering of anonymous materials (MAT_0, MAT_1, ...)
+	 * for the next output written by the same JVM
+	 */
+	public static void resetAnonymousMaterialCounter() {
+		anonymousMaterialCounter = 0;
+	}
+	
 	@Override
 	public Class<RenderableToObj> getRenderableType() {
 		return RenderableToObj.class;
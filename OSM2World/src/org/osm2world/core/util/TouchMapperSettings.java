@@ -0,0 +1,75 @@
+package org.osm2world.core.util;
+
+/**
+ * Per-conversion Touch Mapper settings (map scale, extruder width and
+ * whether buildings are left out).
+ *
+ * Values are read from the TOUCH_MAPPER_* environment variables at startup.
+ * The job server replaces them with {@link #configure} before each job, so
+ * world modules must read them when a conversion runs, not at class init.
+ */
+public final class TouchMapperSettings {
+
+	public static final String SCALE_ENV = "TOUCH_MAPPER_SCALE";
+	public static final String EXTRUDER_WIDTH_ENV = "TOUCH_MAPPER_EXTRUDER_WIDTH";
+	public static final String EXCLUDE_BUILDINGS_ENV = "TOUCH_MAPPER_EXCLUDE_BUILDINGS";
+
+	private static volatile Float scale =
+			parseFloat(System.getenv(SCALE_ENV));
+	private static volatile Float extruderWidth =
+			parseFloat(System.getenv(EXTRUDER_WIDTH_ENV));
+	private static volatile boolean excludeBuildings =
+			"true".equals(System.getenv(EXCLUDE_BUILDINGS_ENV));
+
+	private TouchMapperSettings() { }
+
+	static Float parseFloat(String rawValue) {
+		if (rawValue == null || rawValue.trim().isEmpty()) {
+			return null;
+		}
+		return Float.parseFloat(rawValue.trim());
+	}
+
+	/**
+	 * replaces the settings for the following conversions
+	 */
+	public static void configure(float scale, float extruderWidth,
+			boolean excludeBuildings) {
+		TouchMapperSettings.scale = scale;
+		TouchMapperSettings.extruderWidth = extruderWidth;
+		TouchMapperSettings.excludeBuildings = excludeBuildings;
+	}
+
+	/**
+	 * @return map scale denominator, e.g. 3100 for 1:3100
+	 */
+	public static float getScale() {
+		return require(scale, SCALE_ENV);
+	}
+
+	/**
+	 * @return printer extruder width in millimeters
+	 */
+	public static float getExtruderWidth() {
+		return require(extruderWidth, EXTRUDER_WIDTH_ENV);
+	}
+
+	public static boolean isExcludeBuildings() {
+		return excludeBuildings;
+	}
+
+	/**
+	 * @return factor for sizes that were historically tuned for scale 3100
+	 */
+	public static float getSizesScaling() {
+		return getScale() / 3100;
+	}
+
+	private static float require(Float value, String envName) {
+		if (value == null) {
+			throw new IllegalStateException(envName + " is not set");
+		}
+		return value;
+	}
+
+}
@@ -57,6 +57,7 @@ import org.osm2world.core.target.common.material.ImmutableMaterial;
 import org.osm2world.core.target.common.material.Material;
 import org.osm2world.core.target.common.material.Materials;
 import org.osm2world.core.util.MinMaxUtil;
+import org.osm2world.core.util.TouchMapperSettings;
 import org.osm2world.core.util.exception.TriangulationException;
 import org.osm2world.core.world.data.AreaWorldObject;
 import org.osm2world.core.world.data.NodeWorldObject;
@@ -73,12 +74,10 @@ import com.google.common.base.Function;
  */
 public class BuildingModule extends ConfigurableWorldModule {
 	
-	private static String TM_EXCLUDE_BUILDINGS = System.getenv("TOUCH_MAPPER_EXCLUDE_BUILDINGS");
-
 	@Override
 	public void applyTo(MapData mapData) {
 		
-		if (TM_EXCLUDE_BUILDINGS.equals("true")) {
+		if (TouchMapperSettings.isExcludeBuildings()) {
 			return;
 		}
 		
@@ -20,6 +20,7 @@ import org.osm2world.core.target.RenderableToAllTargets;
 import org.osm2world.core.target.Target;
 import org.osm2world.core.target.common.material.Material;
 import org.osm2world.core.target.common.material.Materials;
+import org.osm2world.core.util.TouchMapperSettings;
 import org.osm2world.core.world.data.TerrainBoundaryWorldObject;
 import org.osm2world.core.world.modules.common.ConfigurableWorldModule;
 import org.osm2world.core.world.modules.common.WorldModuleGeometryUtil;
@@ -69,15 +70,11 @@ public class RailwayModule extends ConfigurableWorldModule {
 	private static class Rail extends AbstractNetworkWaySegmentWorldObject
 		implements RenderableToAllTargets, TerrainBoundaryWorldObject {
 
-		private static float TM_SCALE = Float.parseFloat(System.getenv("TOUCH_MAPPER_SCALE"));
-		private static float TM_EXTRUDER = Float.parseFloat(System.getenv("TOUCH_MAPPER_EXTRUDER_WIDTH"));
-		
-		private static float sizesScaling = TM_SCALE / 3100; // historically things were tuned for scale 3100
-
-		private static final float GROUND_WIDTH = 2.25f * sizesScaling;
-		private static final float RAIL_DIST = 1.5f * sizesScaling;
+		// sizes at scale 3100, multiplied by TouchMapperSettings.getSizesScaling()
+		private static final float GROUND_WIDTH = 2.25f;
+		private static final float RAIL_DIST = 1.5f;
 	
-		private static final float SLEEPER_HEIGHT = 0.125f * sizesScaling;
+		private static final float SLEEPER_HEIGHT = 0.125f;
 		
 		private static final List<VectorXYZ> RAIL_SHAPE = asList(
 			new VectorXYZ(-0.45f, 0, 0), new VectorXYZ(-0.1f, 0.1f, 0),
@@ -91,13 +88,16 @@ public class RailwayModule extends ConfigurableWorldModule {
 			for (int i=0; i < RAIL_SHAPE.size(); i++) {
 				VectorXYZ v = RAIL_SHAPE.get(i);
 				v = v.mult(0.25f);
-				v = v.y(v.y + SLEEPER_HEIGHT);
+				v = v.y(v.y + SLEEPER_HEIGHT); // unscaled, RAIL_SHAPE is only used by disabled code
 				RAIL_SHAPE.set(i, v);
 			}
 		}
 				
+		private final float groundWidth;
+		
 		public Rail(MapWaySegment segment) {
 			super(segment);
+			groundWidth = GROUND_WIDTH * TouchMapperSettings.getSizesScaling();
 		}
 
 		@Override
@@ -173,7 +173,7 @@ public class RailwayModule extends ConfigurableWorldModule {
 
 		@Override
 		public float getWidth() {
-			return GROUND_WIDTH;
+			return groundWidth;
 		}
 		
 	}
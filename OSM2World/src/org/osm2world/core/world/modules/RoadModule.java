@@ -43,6 +43,7 @@ import org.osm2world.core.target.common.TextureData;
 import org.osm2world.core.target.common.material.Material;
 import org.osm2world.core.target.common.material.Materials;
 import org.osm2world.core.target.common.material.TexCoordFunction;
+import org.osm2world.core.util.TouchMapperSettings;
 import org.osm2world.core.world.data.TerrainBoundaryWorldObject;
 import org.osm2world.core.world.modules.common.ConfigurableWorldModule;
 import org.osm2world.core.world.network.AbstractNetworkWaySegmentWorldObject;
@@ -792,9 +793,6 @@ public class RoadModule extends ConfigurableWorldModule {
 		extends AbstractNetworkWaySegmentWorldObject
 		implements RenderableToAllTargets, TerrainBoundaryWorldObject {
 
-		private static float TM_SCALE = Float.parseFloat(System.getenv("TOUCH_MAPPER_SCALE"));
-		private static float TM_EXTRUDER = Float.parseFloat(System.getenv("TOUCH_MAPPER_EXTRUDER_WIDTH"));
-
 		// Using exactly extruder width will leave many roads unprinted. The ideal road width may
 		// be much less than the goal because edges where roads connect are not perpendicular
 		// to road direction. Further unevenness in road width is caused by fattening in Blender.
@@ -850,9 +848,9 @@ public class RoadModule extends ConfigurableWorldModule {
 				this.width = parseWidth(tags, 1.0f);
 			} else {
 				this.laneLayout = buildBasicLaneLayout();
-				float mmToUnits = TM_SCALE / 1000;
-				float minRoadWidth = TM_EXTRUDER * ROAD_WIDTH_MULTIPLIER * mmToUnits;
-				float sizesScaling = TM_SCALE / 3100; // historically things were tuned for scale 3100
+				float mmToUnits = TouchMapperSettings.getScale() / 1000;
+				float minRoadWidth = TouchMapperSettings.getExtruderWidth() * ROAD_WIDTH_MULTIPLIER * mmToUnits;
+				float sizesScaling = TouchMapperSettings.getSizesScaling(); // historically things were tuned for scale 3100
 				this.width = Math.max(minRoadWidth, calculateWidth() * 0.8f * sizesScaling);
 				laneLayout.setCalculatedValues(width);
 			}
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+# Compress-once store for uploaded artifacts. Each artifact is gzipped exactly once, in a
+# background thread started as soon as its content is final. The result provides both the
+# compressed size for stats and the upload body: files are compressed to a '.gz' file next to
+# the original, in-memory content to bytes.
+
+import gzip
+import io
+import threading
+import time
+
+time_clock = getattr(time, 'perf_counter', time.time)
+COMPRESS_LEVEL = 5
+COMPRESS_CHUNK_BYTES = 1024 * 1024
+
+
+class CompressedArtifact(object):
+    def __init__(self, name, raw_bytes):
+        self.name = name
+        self.raw_bytes = raw_bytes
+        self.gzip_bytes = None
+        self.compress_seconds = None
+        self.gzip_path = None
+        self.gzip_data = None
+        self.error = None
+        self._done = threading.Event()
+
+    # Return a readable binary file object of the compressed content.
+    def open_gzip(self):
+        if self.gzip_path is not None:
+            return open(self.gzip_path, 'rb')
+        return io.BytesIO(self.gzip_data)
+
+
+class ArtifactStore(object):
+    def __init__(self, compresslevel=COMPRESS_LEVEL, rss_tracker=None):
+        self.compresslevel = compresslevel
+        self.rss_tracker = rss_tracker
+        self._artifacts = {}
+
+    def _start(self, artifact, compress_fn):
+        def run():
+            start_time = time_clock()
+            try:
+                compress_fn(artifact)
+                artifact.compress_seconds = time_clock() - start_time
+            except Exception as e:
+                artifact.error = e
+            finally:
+                artifact._done.set()
+        self._artifacts[artifact.name] = artifact
+        # Daemon thread: a request timeout must be able to exit the process mid-compression.
+        thread = threading.Thread(target=run, name='compress-' + artifact.name)
+        thread.daemon = True
+        thread.start()
+        return artifact
+
+    # Start compressing the final file at path to path + '.gz'.
+    def add_file(self, name, path):
+        with open(path, 'rb') as src:
+            src.seek(0, 2)
+            raw_bytes = src.tell()
+
+        def compress(artifact):
+            gzip_path = path + '.gz'
+            with open(path, 'rb') as src, open(gzip_path, 'wb') as dst:
+                # Empty filename keeps the original name out of the gzip header.
+                with gzip.GzipFile(filename='', fileobj=dst, mode='wb', compresslevel=self.compresslevel) as gz:
+                    while True:
+                        chunk = src.read(COMPRESS_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        gz.write(chunk)
+                        if self.rss_tracker is not None:
+                            self.rss_tracker()
+                artifact.gzip_bytes = dst.tell()
+            artifact.gzip_path = gzip_path
+
+        return self._start(CompressedArtifact(name, raw_bytes), compress)
+
+    # Start compressing final in-memory content.
+    def add_bytes(self, name, data):
+        def compress(artifact):
+            artifact.gzip_data = gzip.compress(data, compresslevel=self.compresslevel)
+            artifact.gzip_bytes = len(artifact.gzip_data)
+
+        return self._start(CompressedArtifact(name, len(data)), compress)
+
+    # Wait until the named artifact is compressed and return it. Raise if compression failed.
+    def get(self, name):
+        artifact = self._artifacts[name]
+        artifact._done.wait()
+        if artifact.error is not None:
+            raise Exception("Can't compress {}: {}".format(name, artifact.error))
+        return artifact
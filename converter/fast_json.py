@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+# JSON reading and writing for the large converter documents (map-meta-raw.json,
+# map-meta.json, map-meta.augmented.json, map-content.json) with the fastest installed
+# backend: orjson, then ujson, then the stdlib json module. TOUCH_MAPPER_JSON_BACKEND forces
+# one of 'orjson', 'ujson' or 'stdlib'.
+#
+# All backends keep key order and write non-ASCII text as UTF-8, like json.dump with
+# ensure_ascii=False; compact output uses (',', ':') separators and pretty output an indent of
+# 2 plus a final newline. Values a fast backend can't encode (e.g. integers over 64 bits) are
+# encoded with the stdlib instead. Output of different backends is equivalent JSON, but float
+# exponents may be spelled differently (orjson writes 1e-7 where the stdlib writes 1e-07).
+
+import json
+import os
+from collections import OrderedDict
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import ujson  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - ujson is optional
+    ujson = None
+
+
+BACKEND_ENV_VAR = 'TOUCH_MAPPER_JSON_BACKEND'
+BACKENDS = ('orjson', 'ujson', 'stdlib')
+
+
+def _available(name):
+    if name == 'orjson':
+        return orjson is not None
+    if name == 'ujson':
+        return ujson is not None
+    return name == 'stdlib'
+
+
+def select_backend(forced=None):
+    # forced (or the env var) wins when that backend is installed.
+    if forced is None:
+        forced = (os.environ.get(BACKEND_ENV_VAR) or '').strip().lower() or None
+    if forced is not None and _available(forced):
+        return forced
+    for name in BACKENDS:
+        if _available(name):
+            return name
+    return 'stdlib'
+
+
+BACKEND = select_backend()
+
+
+def _stdlib_dumps(value, pretty):
+    if pretty:
+        text = json.dumps(value, indent=2, ensure_ascii=False, check_circular=False) + '\n'
+    else:
+        text = json.dumps(value, separators=(',', ':'), ensure_ascii=False, check_circular=False)
+    return text.encode('utf8')
+
+
+def dumps(value, pretty=False, backend=None):
+    # UTF-8 encoded JSON of value.
+    backend = backend or BACKEND
+    if backend == 'orjson':
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        try:
+            return orjson.dumps(value, option=option)
+        except TypeError:
+            return _stdlib_dumps(value, pretty)
+    if backend == 'ujson':
+        try:
+            if pretty:
+                text = ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False, indent=2) + '\n'
+            else:
+                text = ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, OverflowError, ValueError):
+            return _stdlib_dumps(value, pretty)
+        return text.encode('utf8')
+    return _stdlib_dumps(value, pretty)
+
+
+def loads(data, ordered=False, backend=None):
+    # Parse str or UTF-8 bytes. Objects are dicts, which keep key order; ordered=True makes the
+    # stdlib backend return OrderedDicts like json.load(object_pairs_hook=OrderedDict) did.
+    backend = backend or BACKEND
+    if backend == 'orjson':
+        return orjson.loads(data)
+    if backend == 'ujson':
+        return ujson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf8')
+    if ordered:
+        return json.loads(data, object_pairs_hook=OrderedDict)
+    return json.loads(data)
+
+
+def load_file(path, ordered=False, backend=None):
+    with open(path, 'rb') as handle:
+        return loads(handle.read(), ordered=ordered, backend=backend)
+
+
+def dump_file(path, value, pretty=False, backend=None):
+    with open(path, 'wb') as handle:
+        handle.write(dumps(value, pretty=pretty, backend=backend))
+
+
+__all__ = ['BACKEND', 'BACKENDS', 'dump_file', 'dumps', 'load_file', 'loads', 'select_backend']
@@ -1,13 +1,13 @@
 # Python 3.5
 from __future__ import division
 
-import json
 import argparse
+import multiprocessing
 import os
 import sys
 import time
 from collections import OrderedDict
-from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from typing_extensions import TypedDict  # type: ignore[import-not-found]
@@ -18,12 +18,17 @@ else:  # pragma: no cover - blender python may not have typing_extensions
         def TypedDict(name, fields, total=True):  # type: ignore[no-redef]
             return dict
 
-from . import map_desc_render
+try:
+    import fast_json
+except ImportError:  # imported as converter.map_desc, without converter/ on sys.path
+    from .. import fast_json  # type: ignore[no-redef]
+from . import areas_raster, map_desc_render
 from .areas_raster import analyze_area_visibility, set_debug_osm_id
-from .feature_semantics import build_feature_semantics
+from .classification_engine import compile_spec
+from .item_memo import ItemMemo
 from .ways_clip import BBox as ClipBBox
-from .ways_clip import clip_line_string
-from .map_desc_loc_segments import BBox, Point, classify_location
+from .ways_clip import clip_line_string, clip_line_strings
+from .map_desc_loc_segments import BBox, Point, classify_location, location_zone_grid
 
 
 Bounds = TypedDict(
@@ -352,13 +357,18 @@ def _attach_locations(entry: Dict[str, Any], item: Dict[str, Any], bbox: Optiona
     bbox_typed = _coerce_bbox(bbox)
     if not bbox_typed or not classify_location:
         return
+    # Every item of a map has the same bbox, so this is one zone grid per map.
+    zone_grid = location_zone_grid(bbox_typed)
+    if zone_grid is None:
+        return
+    classify = zone_grid.classify
     geom = item.get("geometry") or {}
     point = None
 
     if geom.get("type") == "point":
         point = _point_from_coords(geom.get("coordinates"))
         if point:
-            entry["_classification"]["location"] = classify_location(point, bbox_typed)
+            entry["_classification"]["location"] = classify(point)
         return
 
     if geom.get("type") == "line_string":
@@ -368,11 +378,11 @@ def _attach_locations(entry: Dict[str, Any], item: Dict[str, Any], bbox: Optiona
             end = _point_from_coords(coords[-1])
             center = _average_point(coords) or _center_from_bounds(item.get("bounds"))
             if start:
-                entry["_classification"]["locationStart"] = classify_location(start, bbox_typed)
+                entry["_classification"]["locationStart"] = classify(start)
             if end:
-                entry["_classification"]["locationEnd"] = classify_location(end, bbox_typed)
+                entry["_classification"]["locationEnd"] = classify(end)
             if center:
-                entry["_classification"]["locationCenter"] = classify_location(center, bbox_typed)
+                entry["_classification"]["locationCenter"] = classify(center)
         if entry["_classification"].get("mainClass") == "D" and not entry["_classification"].get("location"):
             if entry["_classification"].get("locationCenter"):
                 entry["_classification"]["location"] = entry["_classification"]["locationCenter"]
@@ -382,7 +392,7 @@ def _attach_locations(entry: Dict[str, Any], item: Dict[str, Any], bbox: Optiona
         points = _polygon_points(geom)
         point = _average_point(points) or _center_from_bounds(item.get("bounds"))
         if point:
-            entry["_classification"]["locationCenter"] = classify_location(point, bbox_typed)
+            entry["_classification"]["locationCenter"] = classify(point)
         if entry["_classification"].get("mainClass") == "D" and not entry["_classification"].get("location"):
             if entry["_classification"].get("locationCenter"):
                 entry["_classification"]["location"] = entry["_classification"]["locationCenter"]
@@ -390,7 +400,7 @@ def _attach_locations(entry: Dict[str, Any], item: Dict[str, Any], bbox: Optiona
 
     point = _center_from_bounds(item.get("bounds"))
     if point:
-        entry["_classification"]["locationCenter"] = classify_location(point, bbox_typed)
+        entry["_classification"]["locationCenter"] = classify(point)
     if entry["_classification"].get("mainClass") == "D" and not entry["_classification"].get("location"):
         if entry["_classification"].get("locationCenter"):
             entry["_classification"]["location"] = entry["_classification"]["locationCenter"]
@@ -469,10 +479,179 @@ def _attach_visible_geometry(entry: Dict[str, Any], item: Dict[str, Any],
     item["visibleGeometry"] = visible
 
 
+def _attach_visible_geometries(described: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                               boundary: Optional[Dict[str, Any]], add_timing: Any) -> None:
+    # _attach_visible_geometry for (entry, item) pairs, with all line strings clipped in one
+    # clip_line_strings call.
+    start = time.perf_counter()
+    boundary_box = _coerce_clip_bbox(boundary)
+    lines = []  # type: List[Any]
+    line_pairs = []  # type: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    for entry, item in described:
+        geom = item.get("geometry") or {}
+        coords = geom.get("coordinates")
+        if boundary_box and geom.get("type") == "line_string" and isinstance(coords, list):
+            lines.append(coords)
+            line_pairs.append((entry, item))
+            continue
+        _attach_visible_geometry(entry, item, boundary)
+    if lines and boundary_box:
+        for (entry, item), visible in zip(line_pairs, clip_line_strings(lines, boundary_box)):
+            entry["visibleGeometry"] = visible
+            item["visibleGeometry"] = visible
+    add_timing("group-map-data.attach-visible-geometry", time.perf_counter() - start)
+
+
+def _describe_item(item: Dict[str, Any], memo: ItemMemo, bbox: Optional[Dict[str, Any]],
+                   add_timing: Any) -> Optional[Dict[str, Any]]:
+    # Classified entry for item, or None when it is ignored. Attaches semantics to item too;
+    # visible geometry is attached afterwards by _attach_visible_geometries.
+    classify_start = time.perf_counter()
+    classification_key = memo.classification_key(item)
+    classification = memo.classify(item, classification_key)
+    add_timing("group-map-data.classify-item", time.perf_counter() - classify_start)
+    if not classification or classification.get("ignore"):
+        return None
+
+    semantics = memo.semantics(item)
+    if semantics:
+        item["semantics"] = semantics
+
+    modifiers = memo.modifiers(item, classification_key)
+
+    entry = dict(item)
+    entry["_classification"] = {
+        "mainClass": classification.get("mainClass"),
+        "subClass": classification.get("subClass"),
+        "ruleId": classification.get("ruleId"),
+        "role": classification.get("role"),
+        "poiImportance": classification.get("poiImportance"),
+        "modifiers": modifiers
+    }
+
+    _attach_locations(entry, item, bbox)
+    return entry
+
+
+# Opt-in parallel grouping, off by default. With TOUCH_MAPPER_MAP_DESC_WORKERS > 1, maps with
+# at least TOUCH_MAPPER_MAP_DESC_PARALLEL_MIN_ITEMS items are classified in chunks on a process
+# pool. Each worker compiles the spec once; the parent applies the results in item order, so
+# the grouping is identical to the serial one. Pool startup and pickling cost more than
+# grouping small maps, so smaller maps and daemonic processes (the jobs of
+# process-request.py --concurrency, which may not have children) stay serial. The default
+# threshold only keeps small maps serial once workers are set; it is not a measured break-even
+# point, so measure on the target host (map-desc-parallel check with --scale) before enabling.
+DEFAULT_PARALLEL_MIN_ITEMS = 2000
+PARALLEL_CHUNK_ITEMS = 256
+
+_GROUP_WORKER_STATE = {}  # type: Dict[str, Any]
+
+
+def _parse_env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        return max(0, int(raw.strip()))
+    except ValueError:
+        return default
+
+
+def parallel_workers_from_env() -> int:
+    # 0 or 1 keeps grouping serial.
+    return _parse_env_int("TOUCH_MAPPER_MAP_DESC_WORKERS", 0)
+
+
+def _pool_workers(workers: int, item_count: int) -> int:
+    # Worker processes to group item_count items on, 0 for serial grouping
+    min_items = _parse_env_int("TOUCH_MAPPER_MAP_DESC_PARALLEL_MIN_ITEMS", DEFAULT_PARALLEL_MIN_ITEMS)
+    if workers <= 1 or item_count < max(min_items, 2):
+        return 0
+    if multiprocessing.current_process().daemon:
+        return 0
+    return workers
+
+
+def _init_group_worker(spec: Dict[str, Any], options_override: Optional[Dict[str, Any]],
+                       bbox: Optional[Dict[str, Any]], boundary: Optional[Dict[str, Any]],
+                       debug_osm_id: Optional[int]) -> None:
+    engine = compile_spec(spec)
+    _GROUP_WORKER_STATE["memo"] = ItemMemo(engine, engine.resolve_options(options_override))
+    _GROUP_WORKER_STATE["bbox"] = bbox
+    _GROUP_WORKER_STATE["boundary"] = boundary
+    set_debug_osm_id(debug_osm_id)
+
+
+def _describe_chunk(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Runs in a pool worker. Items are copies, so return what grouping added to each item:
+    # (classification, semantics, visible geometry), or None for ignored items.
+    memo = _GROUP_WORKER_STATE["memo"]
+    bbox = _GROUP_WORKER_STATE["bbox"]
+    boundary = _GROUP_WORKER_STATE["boundary"]
+    profile = {}  # type: Dict[str, float]
+
+    def add_timing(name: str, elapsed: float) -> None:
+        profile[name] = profile.get(name, 0.0) + elapsed
+
+    counts_before = memo.counts()
+    entries = [_describe_item(item, memo, bbox, add_timing) for item in items]
+    _attach_visible_geometries(
+        [(entry, item) for entry, item in zip(entries, items) if entry is not None], boundary, add_timing
+    )
+    results = []  # type: List[Any]
+    for entry, item in zip(entries, items):
+        if entry is None:
+            results.append(None)
+            continue
+        results.append((entry["_classification"], item.get("semantics"), entry.get("visibleGeometry")))
+    counts = memo.counts()
+    memo_counts = {}
+    for name, (hits, misses) in counts.items():
+        before_hits, before_misses = counts_before[name]
+        memo_counts[name] = (hits - before_hits, misses - before_misses)
+    return {"results": results, "profile": profile, "memoCounts": memo_counts}
+
+
+def _describe_items_parallel(items: List[Dict[str, Any]], spec: Dict[str, Any],
+                             options_override: Optional[Dict[str, Any]],
+                             bbox: Optional[Dict[str, Any]], boundary: Optional[Dict[str, Any]],
+                             workers: int, memo: ItemMemo,
+                             add_timing: Any) -> Iterable[Optional[Dict[str, Any]]]:
+    # Entries for items in order, None for ignored ones, with visible geometry attached.
+    # Worker timings are summed into the profile (CPU seconds across workers, not wall time)
+    # and worker memo hits and misses into memo.
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [items[i:i + PARALLEL_CHUNK_ITEMS] for i in range(0, len(items), PARALLEL_CHUNK_ITEMS)]
+    initargs = (spec, options_override, bbox, boundary, areas_raster.DEBUG_OSM_ID)
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             initializer=_init_group_worker, initargs=initargs) as executor:
+        for chunk, described in zip(chunks, executor.map(_describe_chunk, chunks)):
+            for name, elapsed in described["profile"].items():
+                add_timing(name, elapsed)
+            memo.add_counts(described["memoCounts"])
+            for item, result in zip(chunk, described["results"]):
+                if result is None:
+                    yield None
+                    continue
+                classification, semantics, visible = result
+                if semantics:
+                    item["semantics"] = semantics
+                entry = dict(item)
+                entry["_classification"] = classification
+                if visible is not None:
+                    entry["visibleGeometry"] = visible
+                    item["visibleGeometry"] = visible
+                yield entry
+
+
 def group_map_data(map_data: Dict[str, Any], spec: Dict[str, Any],
                    options_override: Optional[Dict[str, Any]] = None,
-                   profile: Optional[Dict[str, float]] = None) -> OrderedDict:
-    # Code below creates stage "Grouped + classified meta" data.
+                   profile: Optional[Dict[str, float]] = None,
+                   workers: Optional[int] = None,
+                   stats: Optional[Dict[str, Any]] = None) -> OrderedDict:
+    # Code below creates stage "Grouped + classified meta" data. profile gets timings;
+    # stats, if given, gets "groupMapDataWorkers": the pool size used, 0 for serial grouping.
     grouped = OrderedDict()
     for main_key in spec.get("classes", OrderedDict()).keys():
         grouped[main_key] = OrderedDict()
@@ -485,35 +664,17 @@ def group_map_data(map_data: Dict[str, Any], spec: Dict[str, Any],
     bbox = _get_map_bbox(map_data)
     boundary = (map_data.get("meta") or {}).get("boundary")
 
-    def add_item(item):
-        classify_start = time.perf_counter()
-        classification = classify_item(item, spec, options_override)
-        add_timing("group-map-data.classify-item", time.perf_counter() - classify_start)
-        if not classification or classification.get("ignore"):
-            return
-
-        semantics = build_feature_semantics(item)
-        if semantics:
-            item["semantics"] = semantics
-
-        modifiers = _collect_modifiers(item, spec, options_override)
-
-        entry = dict(item)
-        entry["_classification"] = {
-            "mainClass": classification.get("mainClass"),
-            "subClass": classification.get("subClass"),
-            "ruleId": classification.get("ruleId"),
-            "role": classification.get("role"),
-            "poiImportance": classification.get("poiImportance"),
-            "modifiers": modifiers
-        }
-
-        _attach_locations(entry, item, bbox)
-
-        attach_visible_geometry_start = time.perf_counter()
-        _attach_visible_geometry(entry, item, boundary)
-        add_timing("group-map-data.attach-visible-geometry", time.perf_counter() - attach_visible_geometry_start)
-
+    # Same results as classify_item and _collect_modifiers, without walking every rule dict
+    # per item.
+    compile_start = time.perf_counter()
+    engine = compile_spec(spec)
+    # Items with the same relevant tags and fields share semantics, classification and
+    # modifiers.
+    memo = ItemMemo(engine, engine.resolve_options(options_override))
+    add_timing("group-map-data.compile-spec", time.perf_counter() - compile_start)
+
+    def add_entry(entry):
+        classification = entry["_classification"]
         main_group = grouped.get(classification.get("mainClass"))
         if main_group is None:
             grouped[classification.get("mainClass")] = OrderedDict()
@@ -524,20 +685,58 @@ def group_map_data(map_data: Dict[str, Any], spec: Dict[str, Any],
         main_group[sub_key].append(entry)
 
     grouping_start = time.perf_counter()
+    items = []
     for key, value in map_data.items():
         if not isinstance(value, list):
             continue
         for item in value:
             if isinstance(item, dict) and item.get("elementType"):
-                add_item(item)
+                items.append(item)
+
+    if workers is None:
+        workers = parallel_workers_from_env()
+    workers = _pool_workers(workers, len(items))
+    if stats is not None:
+        stats["groupMapDataWorkers"] = workers
+    if workers:
+        entries = _describe_items_parallel(
+            items, spec, options_override, bbox, boundary, workers, memo, add_timing
+        )
+        for entry in entries:
+            if entry is not None:
+                add_entry(entry)
+    else:
+        described = []
+        for item in items:
+            entry = _describe_item(item, memo, bbox, add_timing)
+            if entry is not None:
+                described.append((entry, item))
+        _attach_visible_geometries(described, boundary, add_timing)
+        for entry, _ in described:
+            add_entry(entry)
     add_timing("group-map-data.total", time.perf_counter() - grouping_start)
+    memo.record_profile(profile, "group-map-data.memo")
 
     return grouped
 
 
 def _load_json(path: str) -> OrderedDict:
-    with open(path, "r") as handle:
-        return json.load(handle, object_pairs_hook=OrderedDict)
+    return fast_json.load_file(path, ordered=True)
+
+
+_SPEC_CACHE = {}  # type: Dict[str, OrderedDict]
+
+
+def load_spec() -> OrderedDict:
+    # Return the classification spec, parsed once per process. Long-lived converter
+    # workers call run_map_desc for many maps; the spec is treated as read-only.
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    spec_path = os.path.join(base_dir, "map-description-classifications.json")
+    spec = _SPEC_CACHE.get(spec_path)
+    if spec is None:
+        spec = _load_json(spec_path)
+        _SPEC_CACHE[spec_path] = spec
+    return spec
 
 
 def _parse_env_bool(name: str) -> Optional[bool]:
@@ -563,24 +762,7 @@ def _pretty_json_enabled(pretty_json: Optional[bool] = None) -> bool:
 
 def _write_json_fast(path: str, value: Any, pretty_json: Optional[bool] = None) -> None:
     use_pretty = _pretty_json_enabled(pretty_json)
-    with open(path, "w") as handle:
-        if use_pretty:
-            json.dump(
-                value,
-                handle,
-                indent=2,
-                ensure_ascii=False,
-                check_circular=False
-            )
-            handle.write("\n")
-            return
-        json.dump(
-            value,
-            handle,
-            separators=(",", ":"),
-            ensure_ascii=False,
-            check_circular=False
-        )
+    fast_json.dump_file(path, value, pretty=use_pretty)
 
 def run_standalone(args: List[str]) -> OrderedDict:
     parser = argparse.ArgumentParser(description="Touch Mapper map description generator")
@@ -599,7 +781,9 @@ def run_standalone(args: List[str]) -> OrderedDict:
 def run_map_desc(input_path: str, output_path: Optional[str] = None,
                  options_override: Optional[Dict[str, Any]] = None,
                  profile: Optional[Dict[str, float]] = None,
-                 pretty_json: Optional[bool] = None) -> OrderedDict:
+                 pretty_json: Optional[bool] = None,
+                 workers: Optional[int] = None,
+                 stats: Optional[Dict[str, Any]] = None) -> OrderedDict:
     run_start = time.perf_counter()
 
     def add_timing(name: str, elapsed: float) -> None:
@@ -607,15 +791,12 @@ def run_map_desc(input_path: str, output_path: Optional[str] = None,
             return
         profile[name] = profile.get(name, 0.0) + elapsed
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    spec_path = os.path.join(base_dir, "map-description-classifications.json")
-
-    spec = _load_json(spec_path)
+    spec = load_spec()
 
     map_data = _load_json(input_path)
 
     group_map_data_start = time.perf_counter()
-    grouped = group_map_data(map_data, spec, options_override, profile)
+    grouped = group_map_data(map_data, spec, options_override, profile, workers, stats)
     add_timing("group-map-data", time.perf_counter() - group_map_data_start)
 
     if output_path is None:
@@ -651,6 +832,7 @@ def run_map_desc(input_path: str, output_path: Optional[str] = None,
 __all__ = [
     "classify_item",
     "group_map_data",
+    "load_spec",
     "run_map_desc",
     "run_standalone"
 ]
@@ -0,0 +1,227 @@
+# Python 3.5
+from __future__ import division
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from .map_desc_loc_segments import BBox, CENTER_BAND, PART_BAND
+
+
+Ring = List[Tuple[float, float]]
+SegmentKey = Tuple[Optional[str], Optional[str]]
+
+# Direction sectors of classify_location as (direction, start angle, end angle) in degrees,
+# counter-clockwise from east in boundary-normalized coordinates.
+DIRECTION_SECTORS = (
+    ("east", -25.0, 25.0),
+    ("northeast", 25.0, 65.0),
+    ("north", 65.0, 115.0),
+    ("northwest", 115.0, 155.0),
+    ("west", 155.0, 205.0),
+    ("southwest", -155.0, -115.0),
+    ("south", -115.0, -65.0),
+    ("southeast", -65.0, -25.0),
+)
+
+
+def ring_area(ring: Ring) -> float:
+    # Shoelace formula; positive for counter-clockwise rings.
+    if len(ring) < 3:
+        return 0.0
+    total = 0.0
+    x0, y0 = ring[-1]
+    for x1, y1 in ring:
+        total += x0 * y1 - x1 * y0
+        x0, y0 = x1, y1
+    return total / 2.0
+
+
+def ring_centroid(ring: Ring) -> Optional[Tuple[float, float]]:
+    # Area centroid, computed relative to the first vertex for precision.
+    if len(ring) < 3:
+        return None
+    ox, oy = ring[0]
+    area2 = 0.0
+    sum_x = 0.0
+    sum_y = 0.0
+    x0 = ring[-1][0] - ox
+    y0 = ring[-1][1] - oy
+    for x, y in ring:
+        x1 = x - ox
+        y1 = y - oy
+        cross = x0 * y1 - x1 * y0
+        area2 += cross
+        sum_x += (x0 + x1) * cross
+        sum_y += (y0 + y1) * cross
+        x0, y0 = x1, y1
+    if area2 == 0:
+        return None
+    return ox + sum_x / (3.0 * area2), oy + sum_y / (3.0 * area2)
+
+
+def is_convex(ring: Ring) -> bool:
+    # Convex and simple: every turn has the same sign and the turns add up to one full
+    # revolution (a pentagram turns one way too, but twice around).
+    count = len(ring)
+    if count < 3:
+        return False
+    sign = 0
+    turning = 0.0
+    for i in range(count):
+        ax, ay = ring[i - 2]
+        bx, by = ring[i - 1]
+        cx, cy = ring[i]
+        ux = bx - ax
+        uy = by - ay
+        vx = cx - bx
+        vy = cy - by
+        cross = ux * vy - uy * vx
+        if cross != 0:
+            turn_sign = 1 if cross > 0 else -1
+            if sign == 0:
+                sign = turn_sign
+            elif turn_sign != sign:
+                return False
+        turning += math.atan2(cross, ux * vx + uy * vy)
+    return sign != 0 and abs(abs(turning) - 2.0 * math.pi) < 1e-6
+
+
+def _clip_half_plane(ring: Ring, inside_fn, intersect_fn) -> Ring:
+    # One Sutherland-Hodgman step.
+    if not ring:
+        return ring
+    result = []
+    prev = ring[-1]
+    prev_inside = inside_fn(prev)
+    for point in ring:
+        point_inside = inside_fn(point)
+        if point_inside:
+            if not prev_inside:
+                result.append(intersect_fn(prev, point))
+            result.append(point)
+        elif prev_inside:
+            result.append(intersect_fn(prev, point))
+        prev = point
+        prev_inside = point_inside
+    return result
+
+
+def _clip_x(ring: Ring, limit: float, keep_greater: bool) -> Ring:
+    def inside(point):
+        return point[0] >= limit if keep_greater else point[0] <= limit
+
+    def intersect(a, b):
+        t = (limit - a[0]) / (b[0] - a[0])
+        return limit, a[1] + t * (b[1] - a[1])
+
+    return _clip_half_plane(ring, inside, intersect)
+
+
+def _clip_y(ring: Ring, limit: float, keep_greater: bool) -> Ring:
+    def inside(point):
+        return point[1] >= limit if keep_greater else point[1] <= limit
+
+    def intersect(a, b):
+        t = (limit - a[1]) / (b[1] - a[1])
+        return a[0] + t * (b[0] - a[0]), limit
+
+    return _clip_half_plane(ring, inside, intersect)
+
+
+def clip_ring_to_rect(ring: Ring, min_x: float, min_y: float, max_x: float, max_y: float) -> Ring:
+    # Clip a (possibly concave) ring to an axis-aligned rectangle. Concave input may give
+    # zero-width bridges along the rectangle edges; they add no area.
+    clipped = _clip_x(ring, min_x, True)
+    clipped = _clip_x(clipped, max_x, False)
+    clipped = _clip_y(clipped, min_y, True)
+    clipped = _clip_y(clipped, max_y, False)
+    return clipped
+
+
+def _clip_left_of_ray(ring: Ring, angle_deg: float, keep_left: bool) -> Ring:
+    # Keep the half-plane left (counter-clockwise) or right of the line through the origin
+    # at angle_deg.
+    rad = math.radians(angle_deg)
+    dir_x = math.cos(rad)
+    dir_y = math.sin(rad)
+
+    def side(point):
+        return dir_x * point[1] - dir_y * point[0]
+
+    def inside(point):
+        value = side(point)
+        return value >= 0 if keep_left else value <= 0
+
+    def intersect(a, b):
+        side_a = side(a)
+        side_b = side(b)
+        t = side_a / (side_a - side_b)
+        return a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])
+
+    return _clip_half_plane(ring, inside, intersect)
+
+
+def _square_area(ring: Ring, half_size: float) -> float:
+    return abs(ring_area(clip_ring_to_rect(ring, -half_size, -half_size, half_size, half_size)))
+
+
+def normalize_ring(ring: Ring, boundary: BBox) -> Ring:
+    # Map boundary to [-1, 1] x [-1, 1], the frame classify_location measures in.
+    min_x = boundary["minX"]
+    min_y = boundary["minY"]
+    width = boundary["maxX"] - boundary["minX"]
+    height = boundary["maxY"] - boundary["minY"]
+    return [
+        (((x - min_x) / width - 0.5) * 2.0, ((y - min_y) / height - 0.5) * 2.0)
+        for x, y in ring
+    ]
+
+
+def _ring_zone_areas(ring: Ring) -> Tuple[float, Dict[SegmentKey, float]]:
+    # Area of a normalized ring inside the map, and per classify_location zone.
+    inside = clip_ring_to_rect(ring, -1.0, -1.0, 1.0, 1.0)
+    total = abs(ring_area(inside))
+    zones = {}  # type: Dict[SegmentKey, float]
+    if total <= 0:
+        return 0.0, zones
+    zones[("center", None)] = _square_area(inside, CENTER_BAND)
+    for direction, start, end in DIRECTION_SECTORS:
+        sector = _clip_left_of_ray(inside, start, True)
+        sector = _clip_left_of_ray(sector, end, False)
+        if len(sector) < 3:
+            continue
+        sector_area = abs(ring_area(sector))
+        if sector_area <= 0:
+            continue
+        center_area = _square_area(sector, CENTER_BAND)
+        part_outer_area = _square_area(sector, PART_BAND)
+        zones[("part", direction)] = part_outer_area - center_area
+        zones[("near_edge", direction)] = sector_area - part_outer_area
+    return total, zones
+
+
+def polygon_zone_areas(outer: Ring, holes: List[Ring],
+                       boundary: BBox) -> Tuple[float, Dict[SegmentKey, float]]:
+    # Exact area of a polygon with holes inside boundary, as a fraction of the boundary area,
+    # and the same split by classify_location zone. Sector edges have zero area, so which
+    # zone owns them does not matter.
+    total, zones = _ring_zone_areas(normalize_ring(outer, boundary))
+    for hole in holes:
+        hole_total, hole_zones = _ring_zone_areas(normalize_ring(hole, boundary))
+        total -= hole_total
+        for key, area in hole_zones.items():
+            zones[key] = zones.get(key, 0.0) - area
+    # Normalized map area is 4.
+    return max(0.0, total / 4.0), dict(
+        (key, max(0.0, area / 4.0)) for key, area in zones.items()
+    )
+
+
+__all__ = [
+    "clip_ring_to_rect",
+    "is_convex",
+    "normalize_ring",
+    "polygon_zone_areas",
+    "ring_area",
+    "ring_centroid",
+]
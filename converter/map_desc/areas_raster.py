@@ -4,7 +4,13 @@ from __future__ import division
 import math
 from typing import Any, Dict, List, Optional, Tuple
 
-from .map_desc_loc_segments import BBox, Point, classify_location
+from .areas_coverage import clip_ring_to_rect, is_convex, polygon_zone_areas, ring_area, ring_centroid
+from .map_desc_loc_segments import BBox, Point, classify_location_cached
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
 
 
 GridCell = Tuple[int, int]
@@ -18,6 +24,11 @@ TRY_BASE_GRID_FIRST = False
 
 COMPLEX_FILL_RATIO = 0.4
 
+# Exactly clipped parts smaller than this many grid cells (coverage, zone segments, convex
+# components) and edge contacts shorter than this many cells are left out, as cell sampling
+# misses them too.
+MIN_VISIBLE_CELLS = 1.0
+
 ANGLE_DEGREES = (0.0, 22.5, 45.0, 67.5)
 ORIENTATION_LABELS = {
     0.0: "east-west",
@@ -27,6 +38,10 @@ ORIENTATION_LABELS = {
     67.5: "north-northeast to south-southwest"
 }
 
+# Rasterize with NumPy when available. The pure Python path gives identical results and is
+# used as the fallback.
+USE_NUMPY = np is not None
+
 DEBUG_OSM_ID = None
 
 
@@ -152,14 +167,32 @@ def _make_point(x: float, y: float) -> Point:
     return {"x": x, "y": y}
 
 
-def _segment_key(point: Point, boundary: BBox) -> Tuple[Optional[str], Optional[str]]:
-    classification = classify_location(point, boundary)
-    if not classification:
-        return None, None
-    loc = classification.get("loc") if isinstance(classification, dict) else None
-    loc_kind = loc.get("kind") if isinstance(loc, dict) else None
-    loc_dir = loc.get("dir") if isinstance(loc, dict) else None
-    return loc_kind, loc_dir
+def _segments_from_counts(segment_counts: Dict[Tuple[Optional[str], Optional[str]], float]) -> List[Dict[str, Any]]:
+    segments = []
+    for (loc_kind, loc_dir), count in segment_counts.items():
+        if count <= 0:
+            continue
+        entry = {"insideCount": count}  # type: Dict[str, Any]
+        if loc_kind:
+            entry["loc"] = {"kind": loc_kind, "dir": loc_dir}
+        segments.append(entry)
+    segments.sort(key=lambda entry: (
+        -entry["insideCount"],
+        (entry.get("loc") or {}).get("kind") or "",
+        (entry.get("loc") or {}).get("dir") or ""
+    ))
+    return segments
+
+
+def _edges_percent(edge_hit_counts: Dict[str, float], grid_size: int) -> List[Dict[str, float]]:
+    edges_percent = []
+    if grid_size > 0:
+        for edge in ("north", "east", "south", "west"):
+            hit_count = edge_hit_counts.get(edge, 0)
+            if hit_count:
+                percent = round(100.0 * hit_count / grid_size, 1)
+                edges_percent.append({edge: percent})
+    return edges_percent
 
 
 def _rasterize_polygon(outer: Ring, holes: List[Ring],
@@ -176,7 +209,6 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
             "consideredCount": 0,
             "trueCells": [],
             "mask": [],
-            "segments": [],
             "components": [],
             "edgesTouched": [],
             "componentCount": 0
@@ -193,7 +225,6 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
             "consideredCount": 0,
             "trueCells": [],
             "mask": [],
-            "segments": [],
             "components": [],
             "edgesTouched": [],
             "componentCount": 0
@@ -212,9 +243,14 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
         print("[areas_raster] {} outer_bbox={}".format(debug_tag, outer_bbox))
         print("[areas_raster] {} holes={}".format(debug_tag, len(holes)))
 
+    if USE_NUMPY:
+        return _rasterize_window_np(
+            outer, outer_bbox, holes, hole_bboxes, boundary, grid_size, dx, dy,
+            min_row, max_row, min_col, max_col, debug=debug, debug_tag=debug_tag
+        )
+
     mask = [[False for _ in range(grid_size)] for _ in range(grid_size)]
     true_cells = []  # type: List[GridCell]
-    segment_counts = {}  # type: Dict[Tuple[Optional[str], Optional[str]], int]
     considered_count = 0
     inside_count = 0
     edge_hits = {
@@ -244,32 +280,10 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
                 edge_hits["west"].add(row)
             if col == grid_size - 1:
                 edge_hits["east"].add(row)
-            seg_key = _segment_key(_make_point(x, y), boundary)
-            segment_counts[seg_key] = segment_counts.get(seg_key, 0) + 1
-
-    segments = []
-    if inside_count:
-        for (loc_kind, loc_dir), count in segment_counts.items():
-            entry = {"insideCount": count}  # type: Dict[str, Any]
-            if loc_kind:
-                entry["loc"] = {"kind": loc_kind, "dir": loc_dir}
-            segments.append(entry)
-        segments.sort(key=lambda entry: (
-            -entry["insideCount"],
-            (entry.get("loc") or {}).get("kind") or "",
-            (entry.get("loc") or {}).get("dir") or ""
-        ))
     if debug:
-        top_segments = []
-        for seg in segments[:5]:
-            loc = seg.get("loc") or {}
-            top_segments.append(
-                "{}:{}={}".format(loc.get("kind"), loc.get("dir"), seg.get("insideCount"))
-            )
         print("[areas_raster] {} insideCells={} consideredCells={}".format(
             debug_tag, inside_count, considered_count
         ))
-        print("[areas_raster] {} segments(top5)={}".format(debug_tag, top_segments))
 
     components = []
     edges_touched = set()
@@ -310,7 +324,7 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
                     visited.add(neighbor)
                     stack.append(neighbor)
             centroid = _make_point(sum_x / count, sum_y / count)
-            location = classify_location(centroid, boundary)
+            location = classify_location_cached(centroid, boundary)
             edges_touched.update(edges)
             components.append({
                 "cellCount": count,
@@ -322,13 +336,9 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
 
     if components:
         components.sort(key=lambda entry: -entry.get("cellCount", 0))
-    edges_percent = []
-    if grid_size > 0:
-        for edge in ("north", "east", "south", "west"):
-            hit_count = len(edge_hits.get(edge, []))
-            if hit_count:
-                percent = round(100.0 * hit_count / grid_size, 1)
-                edges_percent.append({edge: percent})
+    edges_percent = _edges_percent(dict(
+        (edge, len(cells)) for edge, cells in edge_hits.items()
+    ), grid_size)
     if debug:
         print("[areas_raster] {} components={} edgesTouched={}".format(
             debug_tag, len(components), sorted(edges_touched)
@@ -340,16 +350,146 @@ def _rasterize_polygon(outer: Ring, holes: List[Ring],
         "consideredCount": considered_count,
         "trueCells": true_cells,
         "mask": mask,
-        "segments": segments,
         "components": components,
         "edgesTouched": edges_percent,
         "componentCount": len(components)
     }
 
 
-def _shape_from_cells(cells: List[GridCell]) -> Optional[Dict[str, Any]]:
-    if not cells:
-        return None
+def _ring_mask_np(ring: Ring, bbox: BBox, xs: Any, ys: Any) -> Any:
+    # Even-odd scanline fill: per row, count ring edge crossings right of each cell centre.
+    # Crossing x values use the same arithmetic as _point_in_ring, so results are identical.
+    points = np.array(ring, dtype=np.float64)
+    x1 = points[:, 0]
+    y1 = points[:, 1]
+    x0 = np.roll(x1, 1)
+    y0 = np.roll(y1, 1)
+    cols_in_bbox = (xs >= bbox["minX"]) & (xs <= bbox["maxX"])
+    inside = np.zeros((len(ys), len(xs)), dtype=bool)
+    for i, y in enumerate(ys.tolist()):
+        if y < bbox["minY"] or y > bbox["maxY"]:
+            continue
+        straddles = (y1 > y) != (y0 > y)
+        if not straddles.any():
+            continue
+        ex0 = x0[straddles]
+        ey0 = y0[straddles]
+        ex1 = x1[straddles]
+        ey1 = y1[straddles]
+        x_intersect = (ex0 - ex1) * (y - ey1) / (ey0 - ey1) + ex1
+        x_intersect.sort()
+        crossings_right = len(x_intersect) - np.searchsorted(x_intersect, xs, side="right")
+        inside[i] = ((crossings_right & 1) == 1) & cols_in_bbox
+    return inside
+
+
+def _rasterize_window_np(outer: Ring, outer_bbox: BBox,
+                         holes: List[Ring], hole_bboxes: List[BBox],
+                         boundary: BBox, grid_size: int, dx: float, dy: float,
+                         min_row: int, max_row: int, min_col: int, max_col: int,
+                         debug: bool = False,
+                         debug_tag: str = "") -> Dict[str, Any]:
+    # NumPy version of the cell loop in _rasterize_polygon. "mask" and "trueCells" are arrays.
+    xs = boundary["minX"] + (np.arange(min_col, max_col + 1) + 0.5) * dx
+    ys = boundary["minY"] + (np.arange(min_row, max_row + 1) + 0.5) * dy
+    window = _ring_mask_np(outer, outer_bbox, xs, ys)
+    for ring, bbox in zip(holes, hole_bboxes):
+        if not window.any():
+            break
+        window &= ~_ring_mask_np(ring, bbox, xs, ys)
+    mask = np.zeros((grid_size, grid_size), dtype=bool)
+    mask[min_row:max_row + 1, min_col:max_col + 1] = window
+    considered_count = int(window.size)
+    inside_count = int(np.count_nonzero(window))
+    true_cells = np.argwhere(mask)
+
+    if debug:
+        print("[areas_raster] {} insideCells={} consideredCells={}".format(
+            debug_tag, inside_count, considered_count
+        ))
+
+    components = _label_components_np(mask, boundary, grid_size, dx, dy)
+    edges_touched = set()
+    for component in components:
+        edges_touched.update(component["edges"])
+    edges_percent = _edges_percent({
+        "north": int(np.count_nonzero(mask[grid_size - 1])),
+        "east": int(np.count_nonzero(mask[:, grid_size - 1])),
+        "south": int(np.count_nonzero(mask[0])),
+        "west": int(np.count_nonzero(mask[:, 0]))
+    }, grid_size)
+    if debug:
+        print("[areas_raster] {} components={} edgesTouched={}".format(
+            debug_tag, len(components), sorted(edges_touched)
+        ))
+
+    return {
+        "gridSize": grid_size,
+        "insideCells": inside_count,
+        "consideredCount": considered_count,
+        "trueCells": true_cells,
+        "mask": mask,
+        "components": components,
+        "edgesTouched": edges_percent,
+        "componentCount": len(components)
+    }
+
+
+def _label_components_np(mask: Any, boundary: BBox, grid_size: int,
+                         dx: float, dy: float) -> List[Dict[str, Any]]:
+    # 4-connected components. The traversal visits cells in the same order as the DFS in
+    # _rasterize_polygon, because centroids are float sums in visiting order; the sums use
+    # sequential np.add.accumulate, not pairwise np.sum, to keep them identical. The mask is
+    # padded with a false border so neighbours need no bounds checks.
+    width = grid_size + 2
+    padded = np.zeros((width, width), dtype=bool)
+    padded[1:-1, 1:-1] = mask
+    inside = padded.ravel().tolist()
+    visited = bytearray(len(inside))
+    last = grid_size - 1
+    components = []
+    for start in np.flatnonzero(padded).tolist():
+        if visited[start]:
+            continue
+        visited[start] = 1
+        stack = [start]
+        order = []
+        while stack:
+            index = stack.pop()
+            order.append(index)
+            for neighbor in (index - width, index + width, index - 1, index + 1):
+                if inside[neighbor] and not visited[neighbor]:
+                    visited[neighbor] = 1
+                    stack.append(neighbor)
+        cells = np.array(order)
+        rows = cells // width - 1
+        cols = cells % width - 1
+        count = len(order)
+        sum_x = float(np.add.accumulate(boundary["minX"] + (cols + 0.5) * dx)[-1])
+        sum_y = float(np.add.accumulate(boundary["minY"] + (rows + 0.5) * dy)[-1])
+        edges = set()
+        if rows.min() == 0:
+            edges.add("south")
+        if rows.max() == last:
+            edges.add("north")
+        if cols.min() == 0:
+            edges.add("west")
+        if cols.max() == last:
+            edges.add("east")
+        centroid = _make_point(sum_x / count, sum_y / count)
+        components.append({
+            "cellCount": count,
+            "centroid": centroid,
+            "location": classify_location_cached(centroid, boundary),
+            "touchesEdge": bool(edges),
+            "edges": sorted(edges)
+        })
+    components.sort(key=lambda entry: -entry.get("cellCount", 0))
+    return components
+
+
+def _cell_extents(cells: List[GridCell]) -> Tuple[Tuple[float, float, float, float],
+                                                  List[Tuple[float, float, float, float, float]]]:
     points = []
     min_x = None
     max_x = None
@@ -367,9 +507,8 @@ def _shape_from_cells(cells: List[GridCell]) -> Optional[Dict[str, Any]]:
             min_y = y
         if max_y is None or y > max_y:
             max_y = y
-    area_cells = float(len(points))
 
-    best = None
+    extents = []
     for angle in ANGLE_DEGREES:
         rad = math.radians(angle)
         ux = math.cos(rad)
@@ -393,8 +532,54 @@ def _shape_from_cells(cells: List[GridCell]) -> Optional[Dict[str, Any]]:
                 max_v = proj_v
         if min_u is None or min_v is None or max_u is None or max_v is None:
             continue
-        span_u = (max_u - min_u) + 1.0
-        span_v = (max_v - min_v) + 1.0
+        extents.append((angle, min_u, max_u, min_v, max_v))
+    return (min_x, max_x, min_y, max_y), extents
+
+
+def _cell_array_extents(cells: Any) -> Tuple[Tuple[float, float, float, float],
+                                             List[Tuple[float, float, float, float, float]]]:
+    # Same projections as _cell_extents on an (n, 2) array of (row, col) cells.
+    xs = cells[:, 1] + 0.5
+    ys = cells[:, 0] + 0.5
+    extents = []
+    for angle in ANGLE_DEGREES:
+        rad = math.radians(angle)
+        ux = math.cos(rad)
+        uy = math.sin(rad)
+        vx = -uy
+        vy = ux
+        proj_u = xs * ux + ys * uy
+        proj_v = xs * vx + ys * vy
+        extents.append((
+            angle,
+            float(proj_u.min()), float(proj_u.max()),
+            float(proj_v.min()), float(proj_v.max())
+        ))
+    bounds = (float(xs.min()), float(xs.max()), float(ys.min()), float(ys.max()))
+    return bounds, extents
+
+
+def _shape_from_cells(cells: Any) -> Optional[Dict[str, Any]]:
+    if len(cells) == 0:
+        return None
+    if np is not None and isinstance(cells, np.ndarray):
+        bounds, extents = _cell_array_extents(cells)
+    else:
+        bounds, extents = _cell_extents(cells)
+    return _shape_from_extents(float(len(cells)), bounds, extents, 1.0)
+
+
+def _shape_from_extents(area_cells: float,
+                        bounds: Tuple[float, float, float, float],
+                        extents: List[Tuple[float, float, float, float, float]],
+                        span_padding: float) -> Optional[Dict[str, Any]]:
+    # Pick the best fitting of the ANGLE_DEGREES bounding rectangles. Extents are in cell
+    # units; span_padding is 1.0 for cell centres, whose cells reach half a cell further.
+    min_x, max_x, min_y, max_y = bounds
+    best = None
+    for angle, min_u, max_u, min_v, max_v in extents:
+        span_u = (max_u - min_u) + span_padding
+        span_v = (max_v - min_v) + span_padding
         if span_u <= 0 or span_v <= 0:
             continue
         rect_area = span_u * span_v
@@ -439,6 +624,84 @@ def _shape_from_cells(cells: List[GridCell]) -> Optional[Dict[str, Any]]:
     return result
 
 
+def _analyze_convex_polygon(outer: Ring, boundary: BBox, grid_size: int) -> Dict[str, Any]:
+    # Exact components, edges and shape of a convex polygon without holes: clipped to the
+    # boundary it is still convex, so it is one component. Works in cell units so results are
+    # comparable with rasterized polygons.
+    dx = (boundary["maxX"] - boundary["minX"]) / grid_size
+    dy = (boundary["maxY"] - boundary["minY"]) / grid_size
+    cell_ring = [((x - boundary["minX"]) / dx, (y - boundary["minY"]) / dy) for x, y in outer]
+    clipped = clip_ring_to_rect(cell_ring, 0.0, 0.0, float(grid_size), float(grid_size))
+    area_cells = abs(ring_area(clipped)) if len(clipped) >= 3 else 0.0
+    centroid_cells = ring_centroid(clipped) if area_cells >= MIN_VISIBLE_CELLS else None
+    if centroid_cells is None:
+        return {
+            "gridSize": grid_size,
+            "insideCells": 0,
+            "consideredCount": 0,
+            "components": [],
+            "edgesTouched": [],
+            "componentCount": 0,
+            "shape": None
+        }
+
+    # Clipped vertices on a map edge have that edge's coordinate exactly.
+    edge_lengths = {"north": 0.0, "east": 0.0, "south": 0.0, "west": 0.0}
+    x0, y0 = clipped[-1]
+    for x1, y1 in clipped:
+        if y0 == 0.0 and y1 == 0.0:
+            edge_lengths["south"] += abs(x1 - x0)
+        elif y0 == grid_size and y1 == grid_size:
+            edge_lengths["north"] += abs(x1 - x0)
+        elif x0 == 0.0 and x1 == 0.0:
+            edge_lengths["west"] += abs(y1 - y0)
+        elif x0 == grid_size and x1 == grid_size:
+            edge_lengths["east"] += abs(y1 - y0)
+        x0, y0 = x1, y1
+    edge_lengths = dict(
+        (edge, length) for edge, length in edge_lengths.items() if length >= MIN_VISIBLE_CELLS
+    )
+    edges = list(edge_lengths.keys())
+
+    centroid = _make_point(
+        boundary["minX"] + centroid_cells[0] * dx,
+        boundary["minY"] + centroid_cells[1] * dy
+    )
+    xs = [x for x, _ in clipped]
+    ys = [y for _, y in clipped]
+    extents = []
+    for angle in ANGLE_DEGREES:
+        rad = math.radians(angle)
+        ux = math.cos(rad)
+        uy = math.sin(rad)
+        proj_u = [x * ux + y * uy for x, y in clipped]
+        proj_v = [y * ux - x * uy for x, y in clipped]
+        extents.append((angle, min(proj_u), max(proj_u), min(proj_v), max(proj_v)))
+    shape = _shape_from_extents(area_cells, (min(xs), max(xs), min(ys), max(ys)), extents, 0.0)
+
+    return {
+        "gridSize": grid_size,
+        "insideCells": round(area_cells, 2),
+        "consideredCount": 0,
+        "components": [{
+            "cellCount": round(area_cells, 2),
+            "centroid": centroid,
+            "location": classify_location_cached(centroid, boundary),
+            "touchesEdge": bool(edges),
+            "edges": sorted(edges)
+        }],
+        "edgesTouched": _edges_percent(edge_lengths, grid_size),
+        "componentCount": 1,
+        "shape": shape
+    }
+
+
+def _mask_as_lists(mask: Any) -> Any:
+    if np is not None and isinstance(mask, np.ndarray):
+        return mask.tolist()
+    return mask
+
+
 def _dir_label(direction: Optional[str]) -> Optional[str]:
     if not direction:
         return None
@@ -551,8 +814,7 @@ def analyze_area_visibility(geometry: Dict[str, Any],
         return {
             "coverage": {
                 "coveragePercent": 0.0,
-                "insideCells": 0,
-                "consideredCells": 0,
+                "insideCells": 0.0,
                 "gridSize": initial_grid_size,
                 "segments": []
             },
@@ -566,7 +828,10 @@ def analyze_area_visibility(geometry: Dict[str, Any],
     refined_from = None
     analysis_60 = None
     analysis_120 = None
-    if TRY_BASE_GRID_FIRST:
+    convex = not holes and is_convex(outer)
+    if convex:
+        analysis = _analyze_convex_polygon(outer, boundary, initial_grid_size)
+    elif TRY_BASE_GRID_FIRST:
         analysis_60 = _rasterize_polygon(
             outer, holes, boundary, clip_bbox, GRID_BASE,
             debug=debug, debug_tag=debug_tag + ":60"
@@ -587,22 +852,35 @@ def analyze_area_visibility(geometry: Dict[str, Any],
         )
         analysis = analysis_120
 
-    inside_count = analysis.get("insideCells", 0)
     grid_size = analysis.get("gridSize", initial_grid_size)
     total_cells = grid_size * grid_size if grid_size else 0
+    # Coverage is exact: polygon area inside the map and inside each location zone, in cells.
+    coverage_fraction = 0.0
+    segments = []  # type: List[Dict[str, Any]]
+    if boundary["maxX"] > boundary["minX"] and boundary["maxY"] > boundary["minY"]:
+        coverage_fraction, zone_fractions = polygon_zone_areas(outer, holes, boundary)
+        if coverage_fraction * total_cells < MIN_VISIBLE_CELLS:
+            coverage_fraction = 0.0
+        else:
+            segments = _segments_from_counts(dict(
+                (key, round(fraction * total_cells, 2)) for key, fraction in zone_fractions.items()
+                if fraction * total_cells >= MIN_VISIBLE_CELLS
+            ))
     coverage_percent = 0.0
     if total_cells > 0:
-        coverage_percent = round(100.0 * inside_count / total_cells, 1)
+        coverage_percent = round(100.0 * coverage_fraction, 1)
         if coverage_percent < 0:
             coverage_percent = 0.0
         if coverage_percent > 100:
             coverage_percent = 100.0
+    # The clipped polygon area in cells, for convex and rasterized polygons alike.
+    inside_cells = round(coverage_fraction * total_cells, 2)
     if debug:
         print("[areas_raster] {} gridSize={} insideCells={} coveragePercent={}".format(
-            debug_tag, grid_size, inside_count, coverage_percent
+            debug_tag, grid_size, inside_cells, coverage_percent
         ))
         coverage_summary, coverage_percents = _coverage_breakdown_text(
-            analysis.get("segments", []), inside_count, total_cells
+            segments, coverage_fraction * total_cells, total_cells
         )
         if coverage_summary:
             print("[areas_raster] {} coverageSegments={}".format(debug_tag, coverage_summary))
@@ -611,16 +889,19 @@ def analyze_area_visibility(geometry: Dict[str, Any],
         if refined_from:
             print("[areas_raster] {} refinedFrom={}".format(debug_tag, refined_from))
 
-    shape = _shape_from_cells(analysis.get("trueCells") or [])
+    if convex:
+        shape = analysis.get("shape")
+    else:
+        true_cells = analysis.get("trueCells")
+        shape = _shape_from_cells(true_cells if true_cells is not None else [])
     if debug:
         print("[areas_raster] {} shape={}".format(debug_tag, shape))
 
     coverage = {
         "coveragePercent": coverage_percent,
-        "insideCells": inside_count,
-        "consideredCells": analysis.get("consideredCount", 0),
+        "insideCells": inside_cells,
         "gridSize": grid_size,
-        "segments": analysis.get("segments", [])
+        "segments": segments
     }
     result = {
         "coverage": coverage,
@@ -635,10 +916,10 @@ def analyze_area_visibility(geometry: Dict[str, Any],
 
     if debug:
         from .areas_raster_debug import print_union_grid
-        mask_60 = analysis_60.get("mask") if analysis_60 else None
+        mask_60 = _mask_as_lists(analysis_60.get("mask")) if analysis_60 else None
         mask_120 = None
         if analysis_120:
-            mask_120 = analysis_120.get("mask")
+            mask_120 = _mask_as_lists(analysis_120.get("mask"))
         print_union_grid(mask_60, mask_120, boundary)
     return result
 
@@ -0,0 +1,438 @@
+# Python 3.5
+from __future__ import division
+
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# Compiled form of map-description-classifications.json.
+#
+# The interpreter in __init__.py (classify_item, _collect_modifiers) walks every rule dict
+# for every item. compile_spec() turns each rule into a closure over pre-resolved field
+# accessors and frozenset value sets, once per spec. Rules are indexed by the item's
+# element type and geometry type, and screened by the tag keys their top-level tag
+# conditions need, so only candidate rules are evaluated. Candidates keep spec order, so
+# first match wins exactly as in the interpreter. The `classification` check in test/compat/
+# verifies that both give identical results.
+
+Predicate = Callable[[Dict[str, Any]], bool]
+Accessor = Callable[[Dict[str, Any]], Any]
+
+_LIST_MATCH_KEYS = (
+    ("primaryRepresentationAny", "primaryRepresentationField"),
+    ("representationsAny", "representationsField"),
+    ("tmCategoryAny", "tmCategoryField"),
+    ("tmRoadTypeAny", "tmRoadTypeField"),
+)
+
+
+def _input_field(inputs: Dict[str, Any], name: str) -> Optional[str]:
+    value = inputs.get(name)
+    return value if isinstance(value, str) else None
+
+
+def _value_set(values: Any) -> Optional[FrozenSet[Any]]:
+    # Hashable lookup set for a spec value list, or None when the spec value is not a list
+    # of hashable values.
+    if not isinstance(values, (list, tuple)):
+        return None
+    try:
+        return frozenset(values)
+    except TypeError:
+        return None
+
+
+def _contains(value_set: Optional[FrozenSet[Any]], values: Any, value: Any) -> bool:
+    # value in values, through the frozenset when possible. Unhashable item values (lists,
+    # dicts) fall back to the list itself, which compares them by equality.
+    if value_set is not None:
+        try:
+            return value in value_set
+        except TypeError:
+            pass
+    return value in values
+
+
+def _field_accessor(path: Optional[str]) -> Accessor:
+    # Same lookup as _get_field, with the dotted path split once.
+    if not path:
+        return lambda item: None
+    parts = tuple(path.split("."))
+    if len(parts) == 1:
+        key = parts[0]
+        return lambda item: item.get(key)
+    if len(parts) == 2:
+        first, second = parts
+
+        def get_two(item: Dict[str, Any]) -> Any:
+            cur = item.get(first)
+            if cur is None:
+                return None
+            return cur.get(second)
+        return get_two
+
+    def get_path(item: Dict[str, Any]) -> Any:
+        cur = item
+        for part in parts:
+            if cur is None:
+                return None
+            cur = cur.get(part)
+        return cur
+    return get_path
+
+
+def _direct_accessor(field_name: Optional[str]) -> Accessor:
+    # item.get(field_name), for fields the interpreter reads without splitting dots.
+    if not field_name:
+        return lambda item: None
+    return lambda item: item.get(field_name)
+
+
+def _never(item: Dict[str, Any]) -> bool:
+    return False
+
+
+def _compile_field_in(accessor: Accessor, values: Any) -> Predicate:
+    value_set = _value_set(values)
+
+    def match(item: Dict[str, Any]) -> bool:
+        return _contains(value_set, values, accessor(item))
+    return match
+
+
+def _compile_any_field(field_name: str, values: Any) -> Predicate:
+    # Same as _match_any_field.
+    if not values:
+        return _never
+    value_set = _value_set(values)
+
+    def match(item: Dict[str, Any]) -> bool:
+        val = item.get(field_name)
+        if not val:
+            return False
+        if isinstance(val, list):
+            for entry in val:
+                if _contains(value_set, values, entry):
+                    return True
+            return False
+        return _contains(value_set, values, val)
+    return match
+
+
+def _compile_tag_conditions(conditions: List[Dict[str, Any]]) -> List[Tuple[Any, bool, Any, Optional[FrozenSet[Any]]]]:
+    compiled = []
+    for cond in conditions:
+        values = cond.get("values", [])
+        compiled.append((cond.get("key"), bool(cond.get("anyValue")), values, _value_set(values)))
+    return compiled
+
+
+def _compile_tags_any(tags_accessor: Accessor, conditions: Any) -> Optional[Predicate]:
+    # Same as _match_tags_any; None when the conditions always match.
+    if not conditions:
+        return None
+    compiled = _compile_tag_conditions(conditions)
+
+    def match(item: Dict[str, Any]) -> bool:
+        tags = tags_accessor(item)
+        if not tags:
+            return False
+        for key, any_value, values, value_set in compiled:
+            if not isinstance(key, str) or key not in tags:
+                continue
+            val = tags.get(key)
+            if any_value:
+                if val is not None and val != "":
+                    return True
+                continue
+            if _contains(value_set, values, val):
+                return True
+        return False
+    return match
+
+
+def _compile_tags_all(tags_accessor: Accessor, conditions: Any) -> Optional[Predicate]:
+    # Same as _match_tags_all; None when the conditions always match.
+    if not conditions:
+        return None
+    compiled = _compile_tag_conditions(conditions)
+
+    def match(item: Dict[str, Any]) -> bool:
+        tags = tags_accessor(item)
+        for key, any_value, values, value_set in compiled:
+            if not isinstance(key, str):
+                return False
+            if not tags or key not in tags:
+                return False
+            val = tags.get(key)
+            if any_value:
+                if val is None or val == "":
+                    return False
+                continue
+            if not _contains(value_set, values, val):
+                return False
+        return True
+    return match
+
+
+def _compile_rule(rule: Dict[str, Any], inputs: Dict[str, Any]) -> Predicate:
+    # Closure equivalent of _match_rule. Checks keep the interpreter's order.
+    checks = []  # type: List[Predicate]
+    if "elementTypes" in rule:
+        field_name = _input_field(inputs, "elementTypeField")
+        if not field_name:
+            return _never
+        checks.append(_compile_field_in(_direct_accessor(field_name), rule["elementTypes"]))
+    if "geometryTypes" in rule:
+        field_name = _input_field(inputs, "geometryTypeField")
+        if not field_name:
+            return _never
+        checks.append(_compile_field_in(_field_accessor(field_name), rule["geometryTypes"]))
+    for rule_key, input_name in _LIST_MATCH_KEYS:
+        if rule_key in rule:
+            field_name = _input_field(inputs, input_name)
+            if not field_name:
+                return _never
+            checks.append(_compile_any_field(field_name, rule[rule_key]))
+
+    tags_field = _input_field(inputs, "tagsField")
+    if tags_field:
+        tags_accessor = lambda item: item.get(tags_field)  # type: Accessor
+    else:
+        tags_accessor = lambda item: {}
+    for compiled in (
+        _compile_tags_any(tags_accessor, rule.get("tagsAny")) if "tagsAny" in rule else None,
+        _compile_tags_all(tags_accessor, rule.get("tagsAll")) if "tagsAll" in rule else None,
+    ):
+        if compiled is not None:
+            checks.append(compiled)
+
+    if "anyOf" in rule:
+        any_of = tuple(_compile_rule(sub, inputs) for sub in rule["anyOf"])
+
+        def match_any_of(item: Dict[str, Any]) -> bool:
+            for sub in any_of:
+                if sub(item):
+                    return True
+            return False
+        checks.append(match_any_of)
+    if "allOf" in rule:
+        all_of = tuple(_compile_rule(sub, inputs) for sub in rule["allOf"])
+
+        def match_all_of(item: Dict[str, Any]) -> bool:
+            for sub in all_of:
+                if not sub(item):
+                    return False
+            return True
+        checks.append(match_all_of)
+
+    if not checks:
+        return lambda item: True
+    if len(checks) == 1:
+        return checks[0]
+    checks_tuple = tuple(checks)
+
+    def match_all(item: Dict[str, Any]) -> bool:
+        for check in checks_tuple:
+            if not check(item):
+                return False
+        return True
+    return match_all
+
+
+def _index_values(rule: Dict[str, Any], key: str) -> Optional[FrozenSet[Any]]:
+    # Values a top-level rule field must take, or None when the rule does not constrain it
+    # (or constrains it in a way the index does not model).
+    if key not in rule:
+        return None
+    return _value_set(rule[key])
+
+
+def _required_tag_keys(rule: Dict[str, Any]) -> Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]:
+    # Tag keys of which the item needs at least one (tagsAny), and keys it needs all of
+    # (tagsAll), for the rule to have any chance of matching.
+    any_keys = None
+    all_keys = None
+    tags_any = rule.get("tagsAny") if "tagsAny" in rule else None
+    if tags_any:
+        any_keys = frozenset(cond.get("key") for cond in tags_any if isinstance(cond.get("key"), str))
+    tags_all = rule.get("tagsAll") if "tagsAll" in rule else None
+    if tags_all:
+        all_keys = frozenset(cond.get("key") for cond in tags_all if isinstance(cond.get("key"), str))
+    return any_keys, all_keys
+
+
+class _CompiledRule(object):
+    __slots__ = ("rule", "match", "element_types", "geometry_types", "any_tag_keys", "all_tag_keys")
+
+    def __init__(self, rule: Dict[str, Any], inputs: Dict[str, Any]) -> None:
+        self.rule = rule
+        self.match = _compile_rule(rule, inputs)
+        self.element_types = _index_values(rule, "elementTypes")
+        self.geometry_types = _index_values(rule, "geometryTypes")
+        self.any_tag_keys, self.all_tag_keys = _required_tag_keys(rule)
+
+
+class _RuleIndex(object):
+    # Ordered rule list with candidate lists memoized per (elementType, geometry.type).
+
+    def __init__(self, rules: List[Dict[str, Any]], inputs: Dict[str, Any]) -> None:
+        self.rules = [_CompiledRule(rule, inputs) for rule in rules]
+        self.element_type = _direct_accessor(_input_field(inputs, "elementTypeField"))
+        self.geometry_type = _field_accessor(_input_field(inputs, "geometryTypeField"))
+        tags_field = _input_field(inputs, "tagsField")
+        self.tags = (lambda item: item.get(tags_field)) if tags_field else (lambda item: {})
+        self._candidates = {}  # type: Dict[Tuple[Any, Any], List[_CompiledRule]]
+
+    def _candidates_for(self, element_type: Any, geometry_type: Any) -> List[_CompiledRule]:
+        key = (element_type, geometry_type)
+        try:
+            candidates = self._candidates.get(key)
+        except TypeError:
+            # Unhashable field values can't be memoized; every rule is a candidate.
+            return self.rules
+        if candidates is None:
+            candidates = [
+                entry for entry in self.rules
+                if (entry.element_types is None or element_type in entry.element_types)
+                and (entry.geometry_types is None or geometry_type in entry.geometry_types)
+            ]
+            self._candidates[key] = candidates
+        return candidates
+
+    def matches(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # All rules matching item, in spec order.
+        return self._find(item, False)
+
+    def first_match(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        found = self._find(item, True)
+        return found[0] if found else None
+
+    def _find(self, item: Dict[str, Any], first_only: bool) -> List[Dict[str, Any]]:
+        try:
+            candidates = self._candidates_for(self.element_type(item), self.geometry_type(item))
+        except AttributeError:
+            # Malformed item (e.g. non-dict geometry): let the rules themselves fail or not,
+            # in order, like the interpreter.
+            candidates = self.rules
+        tags = self.tags(item)
+        tag_keys = tags if isinstance(tags, dict) else None
+        found = []
+        for entry in candidates:
+            if tag_keys is not None:
+                if entry.any_tag_keys is not None and entry.any_tag_keys.isdisjoint(tag_keys):
+                    continue
+                if entry.all_tag_keys is not None and not entry.all_tag_keys.issubset(tag_keys):
+                    continue
+            if not entry.match(item):
+                continue
+            found.append(entry.rule)
+            if first_only:
+                break
+        return found
+
+
+def _referenced_tag_keys(spec: Dict[str, Any]) -> List[Any]:
+    keys = []  # type: List[Any]
+
+    def walk(rule: Dict[str, Any]) -> None:
+        for name in ("tagsAny", "tagsAll"):
+            for cond in rule.get(name) or []:
+                if isinstance(cond.get("key"), str):
+                    keys.append(cond.get("key"))
+        for name in ("anyOf", "allOf"):
+            for sub in rule.get(name) or []:
+                walk(sub)
+        for mod in rule.get("modifiers") or []:
+            if mod.get("valueFromTag"):
+                keys.append(mod.get("valueFromTag"))
+
+    for name in ("rules", "fallbacks", "modifierRules"):
+        for rule in spec.get(name, []):
+            walk(rule)
+    return keys
+
+
+class CompiledSpec(object):
+    # classify_item and _collect_modifiers for one spec, compiled.
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        inputs = spec.get("inputs", {})
+        self.spec = spec
+        self.options = dict(spec.get("options", {}))
+        self.rules = _RuleIndex(spec.get("rules", []), inputs)
+        self.fallbacks = _RuleIndex(spec.get("fallbacks", []), inputs)
+        self.modifier_rules = _RuleIndex(spec.get("modifierRules", []), inputs)
+        tags_field = _input_field(inputs, "tagsField")
+        self._tags = (lambda item: item.get(tags_field)) if tags_field else (lambda item: {})
+        # Everything classify() and modifiers() read from an item, for item_memo keys: plain
+        # fields, and tags restricted to the keys some rule or modifier looks at.
+        self.key_fields = (
+            _direct_accessor(_input_field(inputs, "elementTypeField")),
+            _field_accessor(_input_field(inputs, "geometryTypeField")),
+        ) + tuple(
+            _direct_accessor(_input_field(inputs, input_name)) for _, input_name in _LIST_MATCH_KEYS
+        )
+        self.tags_field = tags_field
+        self.tag_keys = frozenset(_referenced_tag_keys(spec))
+
+    def resolve_options(self, options_override: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # Spec options with overrides applied; resolve once per map, not per item.
+        options = dict(self.options)
+        options.update(options_override or {})
+        return options
+
+    def classify(self, item: Dict[str, Any], options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Same as classify_item, with options from resolve_options.
+        rule = self.rules.first_match(item)
+        if rule is not None:
+            actions = rule.get("actions", {})
+            ignore = bool(actions.get("ignore"))
+            opt_name = actions.get("ignoreWhenOptionFalse")
+            if opt_name and not options.get(opt_name):
+                ignore = True
+            return {
+                "mainClass": rule.get("mainClass"),
+                "subClass": rule.get("subClass"),
+                "ruleId": rule.get("id"),
+                "ignore": ignore,
+                "role": actions.get("role"),
+                "poiImportance": actions.get("poiImportance")
+            }
+        fb = self.fallbacks.first_match(item)
+        if fb is not None:
+            return {
+                "mainClass": fb.get("mainClass"),
+                "subClass": fb.get("subClass"),
+                "ruleId": fb.get("id"),
+                "ignore": False
+            }
+        return None
+
+    def modifiers(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Same as _collect_modifiers.
+        modifiers = []
+        for rule in self.modifier_rules.matches(item):
+            for mod in rule.get("modifiers", []):
+                entry = {"name": mod.get("name")}
+                if mod.get("valueFromTag"):
+                    tags_value = self._tags(item)
+                    tags = tags_value if isinstance(tags_value, dict) else {}
+                    entry["value"] = tags.get(mod.get("valueFromTag"))
+                modifiers.append(entry)
+        return modifiers
+
+
+_COMPILED_CACHE = {}  # type: Dict[int, Tuple[Dict[str, Any], CompiledSpec]]
+
+
+def compile_spec(spec: Dict[str, Any]) -> CompiledSpec:
+    # Compiled spec, built once per spec object. Like load_spec, this treats the spec as
+    # read-only; the cache entry keeps the spec alive so its id stays unique.
+    cached = _COMPILED_CACHE.get(id(spec))
+    if cached is not None and cached[0] is spec:
+        return cached[1]
+    compiled = CompiledSpec(spec)
+    _COMPILED_CACHE[id(spec)] = (spec, compiled)
+    return compiled
+
+
+__all__ = ["CompiledSpec", "compile_spec"]
@@ -54,6 +54,16 @@ ACCESS_VALUES = {"yes", "no", "permissive", "private", "destination", "customers
 CROSSING_TYPES = {"uncontrolled", "traffic_signals", "marked", "island"}
 KERB_VALUES = {"flush", "lowered", "raised"}
 
+# Every tag key the _parse_* functions read. Other tags can't change the semantics, so
+# item_memo keys semantics on these only; keep in sync when adding a parser.
+SEMANTIC_TAG_KEYS = frozenset([
+    "access", "crossing", "crossing:markings", "cycleway", "cycleway:left", "cycleway:right",
+    "est_width", "highway", "incline", "kerb", "lane_width", "lanes", "lanes:backward",
+    "lanes:forward", "lit", "material", "maxspeed", "maxspeed:backward", "maxspeed:forward",
+    "oneway", "segregated", "sidewalk", "smoothness", "step_count", "surface",
+    "tactile_paving", "tracktype", "wheelchair", "width"
+])
+
 
 def _normalize_tag_value(value: Any) -> Optional[str]:
     if value is None:
@@ -529,6 +539,11 @@ def _parse_access(tags: Dict[str, Any], raw: OrderedDict) -> Tuple[Any, bool]:
     return (_parse_enum(_get_tag_value(tags, "access", raw), ACCESS_VALUES), True)
 
 
+def semantic_tag_sets(item: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # The tag dicts build_feature_semantics merges, in merge order.
+    return [source["tags"] for source in _tag_sources(item)]
+
+
 def build_feature_semantics(item: Dict[str, Any]) -> Optional[OrderedDict]:
     sources = _tag_sources(item)
     if not sources:
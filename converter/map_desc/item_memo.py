@@ -0,0 +1,157 @@
+# Python 3.5
+from __future__ import division
+
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .classification_engine import CompiledSpec
+from .feature_semantics import SEMANTIC_TAG_KEYS, build_feature_semantics, semantic_tag_sets
+
+# Real maps repeat a small number of tag combinations (unnamed footways, residential
+# buildings, crossings) thousands of times. ItemMemo interns each item into a hashable key
+# made of only what a computation reads: the tags it looks at (so names and other
+# unrelated tags don't split keys) plus the classification input fields. Feature
+# semantics, classification and modifiers are memoized per key in bounded LRUs.
+
+DEFAULT_MEMO_ENTRIES = 4096
+
+
+def memo_entries_from_env() -> int:
+    # TOUCH_MAPPER_MAP_DESC_MEMO_ENTRIES overrides the LRU size; 0 disables memoization.
+    raw = os.environ.get("TOUCH_MAPPER_MAP_DESC_MEMO_ENTRIES")
+    if raw is None:
+        return DEFAULT_MEMO_ENTRIES
+    try:
+        return max(0, int(raw.strip()))
+    except ValueError:
+        return DEFAULT_MEMO_ENTRIES
+
+
+def freeze_value(value: Any) -> Hashable:
+    # Hashable stand-in that is equal only for values every consumer treats the same. The
+    # class is part of the key (1, True and "1" differ), floats go by repr (0.0 and -0.0
+    # differ). Raises TypeError for values it can't intern.
+    if value is None or isinstance(value, (str, bool, int)):
+        return (value.__class__, value)
+    if isinstance(value, float):
+        return (float, repr(value))
+    if isinstance(value, (list, tuple)):
+        return (value.__class__, tuple(freeze_value(entry) for entry in value))
+    if isinstance(value, dict):
+        return (value.__class__, frozenset(
+            (freeze_value(key), freeze_value(entry)) for key, entry in value.items()
+        ))
+    raise TypeError("can't intern {}".format(value.__class__.__name__))
+
+
+def freeze_tags(tags: Dict[str, Any], keys: frozenset) -> Hashable:
+    # Tags restricted to keys. Order does not matter: consumers look tags up by key.
+    return frozenset(
+        (key, freeze_value(tags[key])) for key in tags if key in keys
+    )
+
+
+class LruMemo(object):
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+
+    def get(self, key: Optional[Hashable], compute: Callable[[], Any]) -> Any:
+        # Memoized compute() for key. A None key is not memoized.
+        if key is None or self.max_entries <= 0:
+            self.misses += 1
+            return compute()
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        value = compute()
+        entries[key] = value
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return value
+
+
+class ItemMemo(object):
+    # Memoized build_feature_semantics, CompiledSpec.classify and CompiledSpec.modifiers for
+    # the items of one map.
+
+    def __init__(self, engine: CompiledSpec, options: Dict[str, Any],
+                 max_entries: Optional[int] = None) -> None:
+        if max_entries is None:
+            max_entries = memo_entries_from_env()
+        self.engine = engine
+        self.options = options
+        self.semantics_memo = LruMemo(max_entries)
+        self.classify_memo = LruMemo(max_entries)
+        self.modifiers_memo = LruMemo(max_entries)
+
+    def _semantics_key(self, item: Dict[str, Any]) -> Optional[Hashable]:
+        try:
+            return tuple(freeze_tags(tags, SEMANTIC_TAG_KEYS) for tags in semantic_tag_sets(item))
+        except TypeError:
+            return None
+
+    def classification_key(self, item: Dict[str, Any]) -> Optional[Hashable]:
+        # Shared by classify() and modifiers(), which read the same item fields.
+        engine = self.engine
+        try:
+            fields = tuple(freeze_value(accessor(item)) for accessor in engine.key_fields)
+            if not engine.tags_field:
+                return fields
+            tags = item.get(engine.tags_field)
+            if tags is None:
+                return fields, None
+            if not isinstance(tags, dict):
+                return None
+            return fields, freeze_tags(tags, engine.tag_keys)
+        except (AttributeError, TypeError):
+            return None
+
+    def semantics(self, item: Dict[str, Any]) -> Optional[OrderedDict]:
+        # Shared between items with the same key: semantics are attached, never modified.
+        return self.semantics_memo.get(self._semantics_key(item), lambda: build_feature_semantics(item))
+
+    def classify(self, item: Dict[str, Any], key: Optional[Hashable]) -> Optional[Dict[str, Any]]:
+        # key from classification_key(); returns a copy.
+        classification = self.classify_memo.get(key, lambda: self.engine.classify(item, self.options))
+        return dict(classification) if classification is not None else None
+
+    def modifiers(self, item: Dict[str, Any], key: Optional[Hashable]) -> List[Dict[str, Any]]:
+        # key from classification_key(); returns copies, they end up in mutable entries.
+        modifiers = self.modifiers_memo.get(key, lambda: self.engine.modifiers(item))
+        return [dict(entry) for entry in modifiers]
+
+    def _memos(self) -> List[Tuple[str, LruMemo]]:
+        return [("semantics", self.semantics_memo),
+                ("classify", self.classify_memo),
+                ("modifiers", self.modifiers_memo)]
+
+    def counts(self) -> Dict[str, Tuple[int, int]]:
+        # (hits, misses) per memo.
+        return {name: (memo.hits, memo.misses) for name, memo in self._memos()}
+
+    def add_counts(self, counts: Dict[str, Tuple[int, int]]) -> None:
+        # Fold in lookups done by another ItemMemo, e.g. one in a map_desc pool worker.
+        for name, memo in self._memos():
+            hits, misses = counts.get(name, (0, 0))
+            memo.hits += hits
+            memo.misses += misses
+
+    def record_profile(self, profile: Optional[Dict[str, float]], prefix: str) -> None:
+        if profile is None:
+            return
+        for name, memo in self._memos():
+            lookups = memo.hits + memo.misses
+            base = "{}.{}".format(prefix, name)
+            profile[base + ".hits"] = memo.hits
+            profile[base + ".misses"] = memo.misses
+            profile[base + ".hit-rate"] = memo.hits / lookups if lookups else 0.0
+
+
+__all__ = ["DEFAULT_MEMO_ENTRIES", "ItemMemo", "LruMemo", "freeze_value"]
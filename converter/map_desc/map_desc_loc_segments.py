@@ -3,7 +3,7 @@ from __future__ import division
 
 import math
 
-from typing import Any, Dict, Optional, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from typing_extensions import TypedDict  # type: ignore[import-not-found]
@@ -26,6 +26,31 @@ LocationLoc = TypedDict("LocationLoc", {"kind": str, "dir": Optional[str]})
 CENTER_BAND = 0.30
 PART_BAND = 0.68
 
+# Cells per axis of the location zone grid. With 120 cells the band edges (nx = 0.35, 0.65)
+# would fall exactly on cell edges and whole cell rows would straddle zones; 128 avoids that.
+ZONE_GRID_SIZE = 128
+# Normalized distance a grid cell must keep from zone borders to be treated as one zone.
+# Far above float rounding, far below cell size.
+ZONE_GRID_MARGIN = 1e-9
+# Sector borders of _angle_dir as (direction, start angle, end angle) in degrees.
+_SECTOR_RAYS = tuple(
+    (direction, (math.cos(math.radians(start)), math.sin(math.radians(start))),
+     (math.cos(math.radians(end)), math.sin(math.radians(end))))
+    for direction, start, end in (
+        ("east", -25.0, 25.0),
+        ("northeast", 25.0, 65.0),
+        ("north", 65.0, 115.0),
+        ("northwest", 115.0, 155.0),
+        ("west", 155.0, 205.0),
+        ("southwest", -155.0, -115.0),
+        ("south", -115.0, -65.0),
+        ("southeast", -65.0, -25.0),
+    )
+)
+_SECTOR_RAYS_BY_DIRECTION = dict((entry[0], entry) for entry in _SECTOR_RAYS)
+_CELL_MIXED = -1
+_CELL_SEEN_ONCE = -2
+
 
 def _clamp(value: float, min_value: float, max_value: float) -> float:
     if value < min_value:
@@ -100,4 +125,130 @@ def classify_location(point: Optional[Point],
     return {"loc": _location_loc("near_edge", direction)}
 
 
-__all__ = ["classify_location"]
+class LocationZoneGrid(object):
+    # classify_location for one bbox, looked up from a grid over the normalized map. A cell
+    # holds a zone id when every point within ZONE_GRID_MARGIN of it is in that zone; points
+    # in cells that straddle a zone border use classify_location itself, so results are
+    # identical. Cells are filled as they get used: most maps classify far fewer points than
+    # the grid has cells.
+
+    def __init__(self, bbox: BBox, grid_size: int = ZONE_GRID_SIZE) -> None:
+        self.bbox = dict(bbox)
+        self.min_x = bbox["minX"]
+        self.min_y = bbox["minY"]
+        self.width = bbox["maxX"] - bbox["minX"]
+        self.height = bbox["maxY"] - bbox["minY"]
+        self.grid_size = grid_size
+        self.zones = []  # type: List[Tuple[str, Optional[str]]]
+        # None: never hit, _CELL_SEEN_ONCE: hit once, _CELL_MIXED: straddles a zone border,
+        # else index into self.zones.
+        self.cells = [None] * (grid_size * grid_size)  # type: List[Optional[int]]
+
+    def _zone_id(self, zone: Tuple[str, Optional[str]]) -> int:
+        if zone not in self.zones:
+            self.zones.append(zone)
+        return self.zones.index(zone)
+
+    def _cell_zone(self, row: int, col: int) -> int:
+        size = self.grid_size
+        margin = ZONE_GRID_MARGIN
+        # Cell in [-1, 1], the frame classify_location measures in.
+        x0 = (col / size - 0.5) * 2.0
+        x1 = ((col + 1) / size - 0.5) * 2.0
+        y0 = (row / size - 0.5) * 2.0
+        y1 = ((row + 1) / size - 0.5) * 2.0
+        near_x = 0.0 if x0 - margin <= 0 <= x1 + margin else min(abs(x0), abs(x1)) - margin
+        near_y = 0.0 if y0 - margin <= 0 <= y1 + margin else min(abs(y0), abs(y1)) - margin
+        r_min = max(near_x, near_y)
+        r_max = max(abs(x0), abs(x1), abs(y0), abs(y1)) + margin
+        if r_max < CENTER_BAND:
+            return self._zone_id(("center", None))
+        if r_min > PART_BAND:
+            kind = "near_edge"
+        elif r_min > CENTER_BAND and r_max < PART_BAND:
+            kind = "part"
+        else:
+            return _CELL_MIXED
+        # Sectors are convex cones, so a cell is inside one when all corners are, with room
+        # for the margin on both sides.
+        direction = _angle_dir((x0 + x1) / 2.0, (y0 + y1) / 2.0)
+        if direction is None:
+            return _CELL_MIXED
+        _, (start_x, start_y), (end_x, end_y) = _SECTOR_RAYS_BY_DIRECTION[direction]
+        for x, y in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
+            if start_x * y - start_y * x <= 2.0 * margin:
+                return _CELL_MIXED
+            if end_x * y - end_y * x >= -2.0 * margin:
+                return _CELL_MIXED
+        return self._zone_id((kind, direction))
+
+    def classify(self, point: Optional[Point]) -> Optional[Dict[str, Any]]:
+        if not point:
+            return None
+        point_x = point.get("x")
+        point_y = point.get("y")
+        if point_x is None or point_y is None or self.width == 0 or self.height == 0:
+            return classify_location(point, self.bbox)
+        nx = (point_x - self.min_x) / self.width
+        ny = (point_y - self.min_y) / self.height
+        # Inline _clamp; NaN passes through and fails the range check below.
+        if nx < 0:
+            nx = 0
+        elif nx > 1:
+            nx = 1
+        if ny < 0:
+            ny = 0
+        elif ny > 1:
+            ny = 1
+        if not (0 <= nx <= 1 and 0 <= ny <= 1):
+            return classify_location(point, self.bbox)
+        size = self.grid_size
+        col = int(nx * size)
+        row = int(ny * size)
+        if col == size:
+            col -= 1
+        if row == size:
+            row -= 1
+        index = row * size + col
+        zone_id = self.cells[index]
+        if zone_id is None:
+            # Working out a cell costs more than one classify_location; only do it once the
+            # cell is hit again.
+            self.cells[index] = _CELL_SEEN_ONCE
+            return classify_location(point, self.bbox)
+        if zone_id == _CELL_SEEN_ONCE:
+            zone_id = self._cell_zone(row, col)
+            self.cells[index] = zone_id
+        if zone_id < 0:
+            return classify_location(point, self.bbox)
+        kind, direction = self.zones[zone_id]
+        return {"loc": {"kind": kind, "dir": direction}}
+
+
+_ZONE_GRID_CACHE = []  # type: List[Tuple[Tuple[float, float, float, float], LocationZoneGrid]]
+
+
+def location_zone_grid(bbox: Optional[BBox]) -> Optional[LocationZoneGrid]:
+    # Zone grid for bbox, built once and reused while the same bbox keeps being asked for.
+    if not bbox:
+        return None
+    key = (bbox.get("minX"), bbox.get("minY"), bbox.get("maxX"), bbox.get("maxY"))
+    if _ZONE_GRID_CACHE and _ZONE_GRID_CACHE[0][0] == key:
+        return _ZONE_GRID_CACHE[0][1]
+    if any(value is None for value in key):
+        return None
+    grid = LocationZoneGrid(bbox)
+    _ZONE_GRID_CACHE[:] = [(key, grid)]
+    return grid
+
+
+def classify_location_cached(point: Optional[Point],
+                             bbox: Optional[BBox]) -> Optional[Dict[str, Any]]:
+    # Same result as classify_location, looked up through the bbox's zone grid.
+    grid = location_zone_grid(bbox)
+    if grid is None:
+        return classify_location(point, bbox)
+    return grid.classify(point)
+
+
+__all__ = ["LocationZoneGrid", "classify_location", "classify_location_cached", "location_zone_grid"]
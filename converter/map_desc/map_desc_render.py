@@ -1,11 +1,12 @@
 # Python 3.5
 from __future__ import division
 
-import json
 import os
 import re
 import sys
 import time
+from array import array
+from bisect import bisect_left
 from collections import OrderedDict
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING
 from urllib.parse import quote, unquote, urlsplit, urlunsplit
@@ -19,7 +20,11 @@ else:  # pragma: no cover - blender python may not have typing_extensions
         def TypedDict(name, fields, total=True):  # type: ignore[no-redef]
             return dict
 
-from .map_desc_loc_segments import classify_location
+try:
+    import fast_json
+except ImportError:  # imported as converter.map_desc, without converter/ on sys.path
+    from .. import fast_json  # type: ignore[no-redef]
+from .map_desc_loc_segments import LocationZoneGrid, location_zone_grid
 
 MAX_ITEMS_PER_SUBCLASS = 10
 SAMPLE_TS = (0.0, 0.25, 0.5, 0.75, 1.0)
@@ -1304,48 +1309,131 @@ def _format_area(area_sq_m: Optional[float]) -> Optional[str]:
     return "~" + str(int(_js_round(area))) + " m^2"
 
 
-def _coord_key(coord: List[float]) -> str:
-    # Stable key for coordinate matching across ways/nodes.
-    return _to_fixed(float(coord[0]), 3) + "," + _to_fixed(float(coord[1]), 3)
-
-
-def _polyline_length(coords: List[List[float]]) -> float:
-    length = 0.0
-    for i in range(1, len(coords)):
-        a = coords[i - 1]
-        b = coords[i]
-        dx = b[0] - a[0]
-        dy = b[1] - a[1]
-        length += (dx * dx + dy * dy) ** 0.5
-    return length
-
-
-def _sample_point(coords: List[List[float]], t: float) -> Tuple[float, float]:
-    total = _polyline_length(coords)
-    if total <= 0 or len(coords) == 1:
-        return coords[0][0], coords[0][1]
-    target = max(0.0, min(1.0, t)) * total
-    walked = 0.0
-    for i in range(1, len(coords)):
-        a = coords[i - 1]
-        b = coords[i]
-        dx = b[0] - a[0]
-        dy = b[1] - a[1]
-        seg_len = (dx * dx + dy * dy) ** 0.5
-        if seg_len == 0:
-            continue
-        if walked + seg_len >= target:
-            ratio = (target - walked) / seg_len
-            return a[0] + ratio * dx, a[1] + ratio * dy
-        walked += seg_len
-    return coords[-1][0], coords[-1][1]
+CoordKey = Tuple[int, int]
+
+
+def _coord_key(coord: List[float]) -> CoordKey:
+    # Stable key for coordinate matching across ways/nodes: _js_round(value * 1000) per
+    # axis, the integers _to_fixed(value, 3) formats. Two coordinates get the same key
+    # exactly when their 3-decimal strings are equal.
+    x = float(coord[0]) * 1000
+    y = float(coord[1]) * 1000
+    return (
+        int((x + 0.5) // 1) if x >= 0 else int((x - 0.5) // 1),
+        int((y + 0.5) // 1) if y >= 0 else int((y - 0.5) // 1)
+    )
+
+
+def _coord_key_point(key: CoordKey) -> Tuple[float, float]:
+    # The coordinate a key stands for; same floats as parsing the 3-decimal strings.
+    return key[0] / 1000.0, key[1] / 1000.0
+
+
+class CoordIndex(object):
+    # All coordinate lookups of build_intermediate, keyed by quantized (x, y). Per-key sets
+    # deduplicate in O(1); the lists keep first-seen order, which output order depends on.
+
+    def __init__(self) -> None:
+        self.connections = OrderedDict()  # type: OrderedDict
+        self.connection_ids = {}  # type: Dict[CoordKey, Set[Tuple[Any, Any]]]
+        self.road_names = {}  # type: Dict[CoordKey, List[str]]
+        self.road_name_sets = {}  # type: Dict[CoordKey, Set[Any]]
+        self.connectors = {}  # type: Dict[CoordKey, List[Dict[str, Any]]]
+
+
+class Polyline(object):
+    # One line segment's coordinates with cumulative lengths, built once and shared by
+    # sampling, vertex positions and length totals. Lengths are summed vertex by vertex in
+    # the same order as a plain walk, so every derived value is bit-identical to one.
+    __slots__ = ("coords", "xs", "ys", "cumulative", "length")
+
+    def __init__(self, coords: List[List[float]]) -> None:
+        self.coords = coords
+        self.xs = array("d")
+        self.ys = array("d")
+        self.cumulative = array("d")
+        walked = 0.0
+        prev = None
+        for coord in coords:
+            if prev is not None:
+                dx = coord[0] - prev[0]
+                dy = coord[1] - prev[1]
+                walked += (dx * dx + dy * dy) ** 0.5
+            self.xs.append(coord[0])
+            self.ys.append(coord[1])
+            self.cumulative.append(walked)
+            prev = coord
+        self.length = walked
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def _segment(self, i: int) -> Tuple[float, float, float]:
+        dx = self.xs[i] - self.xs[i - 1]
+        dy = self.ys[i] - self.ys[i - 1]
+        return dx, dy, (dx * dx + dy * dy) ** 0.5
+
+    def point_at(self, t: float) -> Tuple[float, float]:
+        # Point at fraction t of the length: the first non-degenerate segment whose end is
+        # at or past the target, found by binary search.
+        coords = self.coords
+        total = self.length
+        if total <= 0 or len(coords) == 1:
+            return coords[0][0], coords[0][1]
+        target = max(0.0, min(1.0, t)) * total
+        count = len(coords)
+        if total == float("inf") or total != total:
+            return self._walk_point_at(target)
+        cumulative = self.cumulative
+        i = bisect_left(cumulative, target, 1, count)
+        while i < count:
+            dx, dy, seg_len = self._segment(i)
+            if seg_len != 0:
+                walked = cumulative[i - 1]
+                ratio = (target - walked) / seg_len
+                return self.xs[i - 1] + ratio * dx, self.ys[i - 1] + ratio * dy
+            i += 1
+        return coords[-1][0], coords[-1][1]
+
+    def _walk_point_at(self, target: float) -> Tuple[float, float]:
+        # Linear walk for non-finite lengths, where binary search has no order to use.
+        walked = 0.0
+        for i in range(1, len(self.coords)):
+            dx, dy, seg_len = self._segment(i)
+            if seg_len == 0:
+                continue
+            if walked + seg_len >= target:
+                ratio = (target - walked) / seg_len
+                return self.xs[i - 1] + ratio * dx, self.ys[i - 1] + ratio * dy
+            walked += seg_len
+        return self.coords[-1][0], self.coords[-1][1]
+
+    def vertex_first_occurrence_t(self) -> "OrderedDict[CoordKey, Dict[str, Any]]":
+        # Map each unique vertex coordinate key to the first path position t in [0, 1].
+        index = OrderedDict()  # type: OrderedDict
+        coords = self.coords
+        if not coords:
+            return index
+        first = coords[0]
+        index[_coord_key(first)] = {"t": 0.0, "point": (first[0], first[1])}
+        total = self.length
+        if total <= 0 or len(coords) == 1:
+            return index
+        cumulative = self.cumulative
+        for i in range(1, len(coords)):
+            b = coords[i]
+            key = _coord_key(b)
+            if key in index:
+                continue
+            index[key] = {"t": cumulative[i] / total, "point": (b[0], b[1])}
+        return index
 
 
 def _location_zone_for_point(point: Tuple[float, float],
-                             boundary: Optional[Boundary]) -> Optional[Dict[str, Any]]:
-    if not boundary:
+                             zone_grid: Optional[LocationZoneGrid]) -> Optional[Dict[str, Any]]:
+    if not zone_grid:
         return None
-    classification = classify_location({"x": point[0], "y": point[1]}, boundary)
+    classification = zone_grid.classify({"x": point[0], "y": point[1]})
     if not classification:
         return None
     loc = classification.get("loc") if isinstance(classification, dict) else None
@@ -1354,12 +1442,13 @@ def _location_zone_for_point(point: Tuple[float, float],
     return _loc_from_classification(classification)
 
 
-def _sample_location_samples(coords: List[List[float]],
+def _sample_location_samples(polyline: Polyline,
                              boundary: Optional[Boundary]) -> List[Dict[str, Any]]:
     samples = []
+    zone_grid = location_zone_grid(boundary)
     for t in SAMPLE_TS:
-        pt = _sample_point(coords, t)
-        zone = _location_zone_for_point(pt, boundary) or "unknown"
+        pt = polyline.point_at(t)
+        zone = _location_zone_for_point(pt, zone_grid) or "unknown"
         samples.append({"t": t, "zone": zone})
     return samples
 
@@ -1402,13 +1491,14 @@ def _event_sort_key(event: Dict[str, Any]) -> Tuple[float, int]:
     return event.get("t", 0.0), order.get(evt_type, 99)
 
 
-def _build_connectors_by_coord_key(connectors: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-    index = {}  # type: Dict[str, List[Dict[str, Any]]]
+def _build_connectors_by_coord_key(coord_index: CoordIndex,
+                                   connectors: List[Dict[str, Any]]) -> Dict[CoordKey, List[Dict[str, Any]]]:
+    index = coord_index.connectors
     for connector in connectors:
         point = connector.get("point")
         if not point:
             continue
-        key = _coord_key([point[0], point[1]])
+        key = _coord_key(point)
         bucket = index.get(key)
         if bucket is None:
             index[key] = [connector]
@@ -1417,53 +1507,24 @@ def _build_connectors_by_coord_key(connectors: List[Dict[str, Any]]) -> Dict[str
     return index
 
 
-def _segment_vertex_first_occurrence_t(
-    coords: List[List[float]]
-) -> "OrderedDict[str, Dict[str, Any]]":
-    # Map each unique segment coordinate key to the first path position t in [0, 1].
-    index = OrderedDict()  # type: OrderedDict
-    if not coords:
-        return index
-
-    first = coords[0]
-    first_key = _coord_key(first)
-    index[first_key] = {"t": 0.0, "point": (first[0], first[1])}
-
-    total = _polyline_length(coords)
-    if total <= 0 or len(coords) == 1:
-        return index
-
-    walked = 0.0
-    for i in range(1, len(coords)):
-        a = coords[i - 1]
-        b = coords[i]
-        dx = b[0] - a[0]
-        dy = b[1] - a[1]
-        seg_len = (dx * dx + dy * dy) ** 0.5
-        walked += seg_len
-        key = _coord_key(b)
-        if key in index:
-            continue
-        index[key] = {"t": walked / total, "point": (b[0], b[1])}
-    return index
-
-
-def _segment_events(coords: List[List[float]],
+def _segment_events(polyline: Polyline,
                     boundary: Optional[Boundary],
-                    connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                    connections_index: Dict[str, List[Dict[str, Any]]],
+                    connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                    connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                     emit_connectivity: bool) -> List[Dict[str, Any]]:
     events = []
+    coords = polyline.coords
     if not coords:
         return events
     start = (coords[0][0], coords[0][1])
     end = (coords[-1][0], coords[-1][1])
+    zone_grid = location_zone_grid(boundary)
 
     if boundary:
         for t_val, point in ((0.0, start), (1.0, end)):
             edge_info = _edge_contact(point, boundary, EDGE_EPS)
             if edge_info:
-                zone = _location_zone_for_point(point, boundary) or "unknown"
+                zone = _location_zone_for_point(point, zone_grid) or "unknown"
                 event = {"t": t_val, "type": "map_edge_crossing", "zone": zone}
                 event.update(edge_info)
                 events.append(event)
@@ -1471,14 +1532,14 @@ def _segment_events(coords: List[List[float]],
     junction_events = []
     if emit_connectivity:
         if connectors_by_coord_key:
-            segment_coord_index = _segment_vertex_first_occurrence_t(coords)
+            segment_coord_index = polyline.vertex_first_occurrence_t()
             for coord_key, hit in segment_coord_index.items():
                 matches = connectors_by_coord_key.get(coord_key)
                 if not matches:
                     continue
                 t_val = hit.get("t", 0.0)
                 closest = hit.get("point", start)
-                zone = _location_zone_for_point(closest, boundary) or "unknown"
+                zone = _location_zone_for_point(closest, zone_grid) or "unknown"
                 connections = connections_index.get(coord_key)
                 for connector in matches:
                     event = {
@@ -1497,7 +1558,7 @@ def _segment_events(coords: List[List[float]],
             continue
         if any(abs(evt.get("t", 0.0) - t_val) <= 1e-6 for evt in junction_events):
             continue
-        zone = _location_zone_for_point(point, boundary) or "unknown"
+        zone = _location_zone_for_point(point, zone_grid) or "unknown"
         events.append({"t": t_val, "type": "terminates", "zone": zone})
 
     return sorted(events, key=_event_sort_key)
@@ -1505,10 +1566,11 @@ def _segment_events(coords: List[List[float]],
 
 def _build_visible_segments(item: Dict[str, Any],
                             boundary: Optional[Boundary],
-                            connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                            connections_index: Dict[str, List[Dict[str, Any]]],
+                            connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                            connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                             emit_connectivity: bool,
-                            profile: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+                            profile: Optional[Dict[str, float]] = None,
+                            polylines: Optional[List[Polyline]] = None) -> List[Dict[str, Any]]:
     start_total = time.perf_counter()
 
     def add_timing(name: str, elapsed: float) -> None:
@@ -1517,22 +1579,23 @@ def _build_visible_segments(item: Dict[str, Any],
         profile[name] = profile.get(name, 0.0) + elapsed
 
     segments = []
-    segment_list = _iter_line_segments(item)
-    if not segment_list:
+    if polylines is None:
+        polylines = _item_polylines(item)
+    if not polylines:
         add_timing("build-visible-segments.total", time.perf_counter() - start_total)
         return segments
 
     # Order segments by descending length, then stable index.
     indexed = []
-    for idx, coords in enumerate(segment_list):
-        if not isinstance(coords, list) or not coords:
+    for idx, polyline in enumerate(polylines):
+        if not polyline.coords:
             continue
-        indexed.append((idx, coords, _polyline_length(coords)))
+        indexed.append((idx, polyline, polyline.length))
     sorted_indexed = sorted(indexed, key=lambda entry: (-entry[2], entry[0]))
-    for _, coords, length in sorted_indexed:
-        location_samples = _sample_location_samples(coords, boundary)
+    for _, polyline, length in sorted_indexed:
+        location_samples = _sample_location_samples(polyline, boundary)
         events = _segment_events(
-            coords,
+            polyline,
             boundary,
             connectors_by_coord_key,
             connections_index,
@@ -1599,7 +1662,7 @@ def _collect_connectors(grouped: Dict[str, Any]) -> List[Dict[str, Any]]:
 
 
 def _collect_inferred_named_connectors(
-    connections_index: Dict[str, List[Dict[str, Any]]]
+    connections_index: Dict[CoordKey, List[Dict[str, Any]]]
 ) -> List[Dict[str, Any]]:
     # Recover named road junctions from shared line coordinates when explicit node
     # connector features are missing from grouped metadata.
@@ -1622,13 +1685,8 @@ def _collect_inferred_named_connectors(
             names.append(name)
         if len(names) < 2:
             continue
-        try:
-            x_str, y_str = key.split(",")
-            point = (float(x_str), float(y_str))
-        except (ValueError, AttributeError):
-            continue
         inferred.append({
-            "point": point,
+            "point": _coord_key_point(key),
             "connectorType": "RoadJunction",
             "osmType": None,
             "osmId": None
@@ -1645,12 +1703,12 @@ def _merge_connectors(
         point = connector.get("point")
         if not point:
             continue
-        seen.add(_coord_key([point[0], point[1]]))
+        seen.add(_coord_key(point))
     for connector in secondary:
         point = connector.get("point")
         if not point:
             continue
-        key = _coord_key([point[0], point[1]])
+        key = _coord_key(point)
         if key in seen:
             continue
         seen.add(key)
@@ -1677,8 +1735,10 @@ def _is_railway_subclass(sub_class: Any) -> bool:
     return isinstance(sub_class, str) and sub_class.startswith("A3_")
 
 
-def _build_connections_index(grouped: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
-    index = {}
+def _build_connections_index(coord_index: CoordIndex,
+                             grouped: Dict[str, Any]) -> Dict[CoordKey, List[Dict[str, Any]]]:
+    index = coord_index.connections
+    ids_by_key = coord_index.connection_ids
     for item in _iter_grouped_items(grouped):
         geom = item.get("geometry") or {}
         if geom.get("type") != "line_string":
@@ -1689,17 +1749,17 @@ def _build_connections_index(grouped: Dict[str, Any]) -> Dict[str, List[Dict[str
         # Railway intersections are intentionally omitted from connectivity narration.
         if _is_railway_subclass(info.get("subClass")):
             continue
+        feature_id = (info.get("osmType"), info.get("osmId"))
         for coords in _iter_line_segments(item):
             for coord in coords:
                 key = _coord_key(coord)
-                entry = index.get(key)
-                if not entry:
+                ids = ids_by_key.get(key)
+                if ids is None:
                     index[key] = [info]
-                else:
-                    if not any(info.get("osmId") == existing.get("osmId") and
-                               info.get("osmType") == existing.get("osmType")
-                               for existing in entry):
-                        entry.append(info)
+                    ids_by_key[key] = {feature_id}
+                elif feature_id not in ids:
+                    ids.add(feature_id)
+                    index[key].append(info)
     return index
 
 
@@ -1713,9 +1773,11 @@ def _iter_line_segments(item: Dict[str, Any]) -> List[List[List[float]]]:
     return []
 
 
-def _build_road_names_by_coord(map_data: Dict[str, Any]) -> Dict[str, List[str]]:
+def _build_road_names_by_coord(coord_index: CoordIndex,
+                               map_data: Dict[str, Any]) -> Dict[CoordKey, List[str]]:
     # Build a coordinate->road-names map for connectivity summaries.
-    road_map = {}
+    road_map = coord_index.road_names
+    name_sets = coord_index.road_name_sets
     ways = []
     if isinstance(map_data, dict) and isinstance(map_data.get("ways"), list):
         ways = map_data.get("ways") or []
@@ -1733,39 +1795,37 @@ def _build_road_names_by_coord(map_data: Dict[str, Any]) -> Dict[str, List[str]]
         for coords in _iter_line_segments(way):
             for coord in coords:
                 key = _coord_key(coord)
-                entry = road_map.get(key)
-                if not entry:
+                names = name_sets.get(key)
+                if names is None:
                     road_map[key] = [name]
-                else:
-                    if name not in entry:
-                        entry.append(name)
+                    name_sets[key] = {name}
+                elif name not in names:
+                    names.add(name)
+                    road_map[key].append(name)
     return road_map
 
 
-def _segment_length(coords: List[List[float]]) -> float:
-    length = 0.0
-    for i in range(1, len(coords)):
-        a = coords[i - 1]
-        b = coords[i]
-        dx = b[0] - a[0]
-        dy = b[1] - a[1]
-        length += (dx * dx + dy * dy) ** 0.5
-    return length
+def _item_polylines(item: Dict[str, Any]) -> List[Polyline]:
+    # One Polyline per line segment, in _iter_line_segments order; shared by the visible
+    # segment metadata and the length total of one summary.
+    return [Polyline(coords) for coords in _iter_line_segments(item)]
 
 
-def _compute_line_length(item: Dict[str, Any]) -> Optional[float]:
+def _compute_line_length(item: Dict[str, Any],
+                         polylines: Optional[List[Polyline]] = None) -> Optional[float]:
     # Polyline length in local map units.
     geom = item.get("geometry") or {}
     if geom.get("type") != "line_string":
         return None
-    segments = _iter_line_segments(item)
-    if not segments:
+    if polylines is None:
+        polylines = _item_polylines(item)
+    if not polylines:
         return None
     total = 0.0
-    for coords in segments:
-        if len(coords) < 2:
+    for polyline in polylines:
+        if len(polyline) < 2:
             continue
-        total += _segment_length(coords)
+        total += polyline.length
     return total
 
 
@@ -1830,8 +1890,8 @@ def _modifiers_suffix(modifiers: Optional[List[Dict[str, Any]]]) -> str:
 
 def _summarize_linear_base(item: Dict[str, Any],
                            boundary: Optional[Boundary],
-                           connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                           connections_index: Dict[str, List[Dict[str, Any]]],
+                           connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                           connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                            emit_connectivity: bool,
                            profile: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
     # Summary for linear features: name, modifiers, and visible segment metadata.
@@ -1845,12 +1905,14 @@ def _summarize_linear_base(item: Dict[str, Any],
     name = _get_name(item.get("tags"))
     mod_suffix = _modifiers_suffix(item.get("_classification", {}).get("modifiers"))
     build_visible_segments_start = time.perf_counter()
+    polylines = _item_polylines(item)
     visible_segments = _build_visible_segments(
-        item, boundary, connectors_by_coord_key, connections_index, emit_connectivity, profile
+        item, boundary, connectors_by_coord_key, connections_index, emit_connectivity, profile,
+        polylines
     )
     add_timing("summarize-linear-base.build-visible-segments", time.perf_counter() - build_visible_segments_start)
 
-    length = _compute_line_length(item)
+    length = _compute_line_length(item, polylines)
 
     summary = {
         "osmId": item.get("osmId"),
@@ -1865,7 +1927,7 @@ def _summarize_linear_base(item: Dict[str, Any],
     return summary
 
 
-def _connected_road_names(item: Dict[str, Any], road_names_by_coord: Dict[str, List[str]]) -> List[str]:
+def _connected_road_names(item: Dict[str, Any], road_names_by_coord: Dict[CoordKey, List[str]]) -> List[str]:
     # Resolve road names touching a node by coordinate.
     coords = item.get("geometry", {}).get("coordinates")
     if not isinstance(coords, list):
@@ -1875,7 +1937,7 @@ def _connected_road_names(item: Dict[str, Any], road_names_by_coord: Dict[str, L
 
 
 def _summarize_connectivity_base(item: Dict[str, Any],
-                                 road_names_by_coord: Dict[str, List[str]]) -> Dict[str, Any]:
+                                 road_names_by_coord: Dict[CoordKey, List[str]]) -> Dict[str, Any]:
     # Summary for junction/connector/crossing nodes.
     role = item.get("_classification", {}).get("role") or "node"
     names = _connected_road_names(item, road_names_by_coord)
@@ -2039,23 +2101,25 @@ def _summarize_area_base(item: Dict[str, Any]) -> Dict[str, Any]:
 
 def _summarize_boundary_base(item: Dict[str, Any],
                              boundary: Optional[Boundary],
-                             connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                             connections_index: Dict[str, List[Dict[str, Any]]],
+                             connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                             connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                              emit_connectivity: bool) -> Dict[str, Any]:
     # Summary for boundary/edge features with length and visible segment metadata.
     subtype = item.get("_classification", {}).get("subClass")
     label = _area_type_label(subtype)
     name = _get_name(item.get("tags"))
     summary = label + ": " + name if name else label
+    polylines = _item_polylines(item)
     summary = {
         "osmId": item.get("osmId"),
         "osmType": item.get("osmType"),
         "label": name if name else None,
         "displayLabel": summary,
         "visibleSegments": _build_visible_segments(
-            item, boundary, connectors_by_coord_key, connections_index, emit_connectivity
+            item, boundary, connectors_by_coord_key, connections_index, emit_connectivity,
+            polylines=polylines
         ),
-        "length": _compute_line_length(item)
+        "length": _compute_line_length(item, polylines)
     }
     _attach_semantics(summary, item)
     return summary
@@ -2091,8 +2155,8 @@ def _group_count(group: Dict[str, Any]) -> int:
 
 def _build_way_groups(items: List[Dict[str, Any]],
                       boundary: Optional[Boundary],
-                      connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                      connections_index: Dict[str, List[Dict[str, Any]]],
+                      connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                      connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                       emit_connectivity: bool,
                       profile: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
     # Ways are grouped by displayLabel to keep one top-level entry per logical way.
@@ -2158,10 +2222,10 @@ def _build_way_groups(items: List[Dict[str, Any]],
 
 
 def _build_groups(items: List[Dict[str, Any]], kind: str,
-                  road_names_by_coord: Dict[str, List[str]],
+                  road_names_by_coord: Dict[CoordKey, List[str]],
                   boundary: Optional[Boundary],
-                  connectors_by_coord_key: Optional[Dict[str, List[Dict[str, Any]]]],
-                  connections_index: Dict[str, List[Dict[str, Any]]],
+                  connectors_by_coord_key: Optional[Dict[CoordKey, List[Dict[str, Any]]]],
+                  connections_index: Dict[CoordKey, List[Dict[str, Any]]],
                   emit_connectivity: bool) -> List[Dict[str, Any]]:
     # Collapse repeated items into grouped summaries for compact output.
     groups = OrderedDict()
@@ -2276,13 +2340,15 @@ def build_intermediate(grouped: Dict[str, Any], spec: Dict[str, Any],
             return
         profile[name] = profile.get(name, 0.0) + elapsed
 
-    road_names_by_coord = _build_road_names_by_coord(map_data or grouped)
+    # One index for every coordinate lookup below; only output gets formatted coordinates.
+    coord_index = CoordIndex()
+    road_names_by_coord = _build_road_names_by_coord(coord_index, map_data or grouped)
 
     options = _resolve_options(spec, options_override)
     emit_connectivity = bool(options.get("emitConnectivityNodes", True))
     boundary = _coerce_boundary((map_data or {}).get("meta", {}).get("boundary"))
 
-    connections_index = _build_connections_index(grouped) if emit_connectivity else {}
+    connections_index = _build_connections_index(coord_index, grouped) if emit_connectivity else {}
 
     connectors = _collect_connectors(grouped) if emit_connectivity else []
 
@@ -2292,7 +2358,7 @@ def build_intermediate(grouped: Dict[str, Any], spec: Dict[str, Any],
             _collect_inferred_named_connectors(connections_index)
         )
 
-    connectors_by_coord_key = _build_connectors_by_coord_key(connectors) if emit_connectivity else {}
+    connectors_by_coord_key = _build_connectors_by_coord_key(coord_index, connectors) if emit_connectivity else {}
 
     classes = spec.get("classes") or OrderedDict()
     main_keys = sorted(classes.keys())
@@ -2453,8 +2519,7 @@ def write_map_content(grouped: Dict[str, Any], spec: Dict[str, Any],
 
 def _load_json(path: str) -> OrderedDict:
     # Read JSON with stable key ordering for deterministic output.
-    with open(path, "r") as handle:
-        return json.load(handle, object_pairs_hook=OrderedDict)
+    return fast_json.load_file(path, ordered=True)
 
 
 def _parse_env_bool(name: str) -> Optional[bool]:
@@ -2480,24 +2545,7 @@ def _pretty_json_enabled(pretty_json: Optional[bool] = None) -> bool:
 
 def _write_json_fast(path: str, value: Any, pretty_json: Optional[bool] = None) -> None:
     use_pretty = _pretty_json_enabled(pretty_json)
-    with open(path, "w") as handle:
-        if use_pretty:
-            json.dump(
-                value,
-                handle,
-                indent=2,
-                ensure_ascii=False,
-                check_circular=False
-            )
-            handle.write("\n")
-            return
-        json.dump(
-            value,
-            handle,
-            separators=(",", ":"),
-            ensure_ascii=False,
-            check_circular=False
-        )
+    fast_json.dump_file(path, value, pretty=use_pretty)
 
 
 def run_standalone(args: List[str]) -> str:
@@ -1,7 +1,12 @@
 # Python 3.5
 from __future__ import division
 
-from typing import List, Optional, Tuple, TYPE_CHECKING
+from typing import Any, List, Optional, Tuple, TYPE_CHECKING
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
 
 if TYPE_CHECKING:
     from typing_extensions import TypedDict  # type: ignore[import-not-found]
@@ -16,6 +21,11 @@ else:  # pragma: no cover - blender python may not have typing_extensions
 BBox = TypedDict("BBox", {"minX": float, "minY": float, "maxX": float, "maxY": float})
 
 
+# Clip all line strings of a map as flat arrays with NumPy when available. The per line
+# clip_line_string gives identical results and is used as the fallback.
+USE_NUMPY = np is not None
+
+
 Point = Tuple[float, float]
 Coord = List[float]
 Segment = List[Coord]
@@ -121,3 +131,107 @@ def clip_line_string(coords: List[Coord], bbox: BBox) -> List[Segment]:
         segments.append(current)
 
     return segments
+
+
+def _clip_segments_np(x0: Any, y0: Any, x1: Any, y1: Any, bbox: BBox) -> Tuple[Any, Any, Any, Any, Any]:
+    # _clip_segment for arrays of segments. The boundaries are applied in the same order and
+    # with the same comparisons, so the clipped points are identical. Returns the clipped
+    # endpoints and a mask of visible segments.
+    dx = x1 - x0
+    dy = y1 - y0
+    u1 = np.zeros(len(x0))
+    u2 = np.ones(len(x0))
+    rejected = np.zeros(len(x0), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for pi, qi in ((-dx, x0 - bbox["minX"]), (dx, bbox["maxX"] - x0),
+                       (-dy, y0 - bbox["minY"]), (dy, bbox["maxY"] - y0)):
+            parallel = pi == 0
+            rejected |= parallel & (qi < 0)
+            t = qi / pi
+            entering = ~parallel & (pi < 0)
+            leaving = ~parallel & ~(pi < 0)
+            rejected |= entering & (t > u2)
+            rejected |= leaving & (t < u1)
+            u1 = np.where(entering & (t > u1), t, u1)
+            u2 = np.where(leaving & (t < u2), t, u2)
+    rejected |= u1 > u2
+    cx0 = x0 + u1 * dx
+    cy0 = y0 + u1 * dy
+    cx1 = x0 + u2 * dx
+    cy1 = y0 + u2 * dy
+    rejected |= (cx0 == cx1) & (cy0 == cy1)
+    return cx0, cy0, cx1, cy1, ~rejected
+
+
+def clip_line_strings(lines: List[List[Coord]], bbox: BBox) -> List[List[Segment]]:
+    # clip_line_string for every line: the segments of all lines are clipped at once, then
+    # the visible runs of each line are rebuilt in order.
+    if not USE_NUMPY:
+        return [clip_line_string(coords, bbox) for coords in lines]
+
+    # Invalid points end a run like in clip_line_string, so each line becomes runs of valid
+    # points: flat coordinates plus run offsets, and the line each run belongs to.
+    xs = []  # type: List[float]
+    ys = []  # type: List[float]
+    run_starts = []  # type: List[int]
+    run_lines = []  # type: List[int]
+    for line_index, coords in enumerate(lines):
+        run_start = len(xs)
+        for coord in coords:
+            point = _coerce_point(coord)
+            if point is None:
+                if len(xs) - run_start >= 2:
+                    run_starts.append(run_start)
+                    run_lines.append(line_index)
+                else:
+                    del xs[run_start:]
+                    del ys[run_start:]
+                run_start = len(xs)
+                continue
+            xs.append(point[0])
+            ys.append(point[1])
+        if len(xs) - run_start >= 2:
+            run_starts.append(run_start)
+            run_lines.append(line_index)
+        else:
+            del xs[run_start:]
+            del ys[run_start:]
+
+    results = [[] for _ in lines]  # type: List[List[Segment]]
+    if not run_starts:
+        return results
+    x = np.array(xs, dtype=np.float64)
+    y = np.array(ys, dtype=np.float64)
+    # Segment i goes from point i to point i + 1; the segments that would join two runs
+    # (the last point of a run to the next run's first) are skipped below.
+    cx0, cy0, cx1, cy1, visible = _clip_segments_np(x[:-1], y[:-1], x[1:], y[1:], bbox)
+    cx0 = cx0.tolist()
+    cy0 = cy0.tolist()
+    cx1 = cx1.tolist()
+    cy1 = cy1.tolist()
+    visible = visible.tolist()
+
+    run_ends = run_starts[1:] + [len(xs)]
+    for run_start, run_end, line_index in zip(run_starts, run_ends, run_lines):
+        segments = results[line_index]
+        current = []  # type: Segment
+        for i in range(run_start, run_end - 1):
+            if not visible[i]:
+                if len(current) >= 2:
+                    segments.append(current)
+                current = []
+                continue
+            c0_list = [cx0[i], cy0[i]]
+            c1_list = [cx1[i], cy1[i]]
+            if not current:
+                current = [c0_list, c1_list]
+            elif _points_close(current[-1], c0_list):
+                if not _points_close(current[-1], c1_list):
+                    current.append(c1_list)
+            else:
+                if len(current) >= 2:
+                    segments.append(current)
+                current = [c0_list, c1_list]
+        if len(current) >= 2:
+            segments.append(current)
+    return results
@@ -0,0 +1,133 @@
+# NumPy versions of the Blender edit mode operators that obj-to-tactile.py uses to turn flat
+# map features into solids: mesh.extrude_region_move of a fully selected mesh,
+# mesh.normals_make_consistent on the extruded result, and transform.shrink_fatten.
+#
+# Meshes are plain arrays, as Blender's foreach_get returns them:
+#   co            (V, 3) float vertex coordinates
+#   corner_verts  vertex index of each polygon corner, polygon after polygon
+#   totals        number of corners of each polygon
+# Results keep Blender's polygon vertex orders (so that Blender triangulates them the same way
+# when exporting STL) and its vertex order (originals first, then their extruded copies).
+#
+# This module must not import bpy, so that it can be used outside Blender, and it must stay
+# runnable on the Python 3.5 bundled with Blender 2.78.
+
+import numpy as np
+
+
+def polygon_starts(totals):
+    # Index of the first corner of each polygon
+    return np.cumsum(totals) - totals
+
+
+def polygon_corner_loops(loop_starts, totals):
+    # Loop indices of every polygon corner, polygon after polygon, for Blender's
+    # MeshPolygon.loop_start / loop_total arrays
+    corner_starts = np.repeat(polygon_starts(totals), totals)
+    return np.repeat(loop_starts, totals) + (np.arange(len(corner_starts)) - corner_starts)
+
+
+def _neighbour_corners(totals, step):
+    starts = np.repeat(polygon_starts(totals), totals)
+    sizes = np.repeat(totals, totals)
+    offsets = np.arange(len(starts)) - starts
+    return starts + (offsets + step) % sizes
+
+
+def _normalized(vectors):
+    lengths = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+    result = np.zeros_like(vectors)
+    nonzero = lengths > 0
+    result[nonzero] = vectors[nonzero] / lengths[nonzero, None]
+    return result
+
+
+def polygon_normals(co, corner_verts, totals):
+    # Unit normal of each polygon (Newell's method, as Blender uses for n-gons)
+    if len(totals) == 0:
+        return np.zeros((0, 3))
+    corner_co = co[corner_verts]
+    next_co = corner_co[_neighbour_corners(totals, 1)]
+    sums = np.add.reduceat(np.cross(corner_co, next_co), polygon_starts(totals), axis=0)
+    return _normalized(sums)
+
+
+def vertex_normals(co, corner_verts, totals):
+    # Unit vertex normals, the polygon normals weighted by corner angle like Blender's. Vertices
+    # without polygons point away from the origin, also like Blender's.
+    corner_co = co[corner_verts]
+    to_next = _normalized(corner_co[_neighbour_corners(totals, 1)] - corner_co)
+    to_previous = _normalized(corner_co[_neighbour_corners(totals, -1)] - corner_co)
+    angles = np.arccos(np.clip(np.einsum('ij,ij->i', to_next, to_previous), -1.0, 1.0))
+    weighted = np.repeat(polygon_normals(co, corner_verts, totals), totals, axis=0) * angles[:, None]
+    sums = np.column_stack([
+        np.bincount(corner_verts, weights=weighted[:, axis], minlength=len(co)) for axis in range(3)
+    ])
+    normals = _normalized(sums)
+    unused = ~normals.any(axis=1)
+    normals[unused] = _normalized(co[unused])
+    return normals
+
+
+def flip_polygons(corner_verts, totals, flip):
+    # Reverse the winding of the polygons where flip is true like Blender does: the first
+    # corner stays, [v0, v1, ..., vn-1] becomes [v0, vn-1, ..., v1]
+    starts = np.repeat(polygon_starts(totals), totals)
+    sizes = np.repeat(totals, totals)
+    own = np.arange(len(starts))
+    reversed_corners = starts + (sizes - (own - starts)) % sizes
+    return corner_verts[np.where(np.repeat(flip, totals), reversed_corners, own)]
+
+
+def extrude(co, corner_verts, totals, offset, outward_normals=False):
+    """
+    Extrude all polygons by offset, like extrude_region_move with everything selected.
+
+    The original polygons stay as the bottom, copies moved by offset become the top, and every
+    edge that only one polygon uses gets a side quad, wound like the top polygon. With
+    outward_normals, polygons are also flipped so that the normals of each extruded polygon
+    point out of its prism, like normals_make_consistent afterwards. Loose vertices and edges
+    are left out; the map meshes have none.
+
+    Returns (co, corner_verts, totals, sources), where sources is the index of the original
+    polygon each result polygon was made from (for material indices).
+    """
+    co = np.asarray(co, dtype=np.float64)
+    corner_verts = np.asarray(corner_verts, dtype=np.int64)
+    totals = np.asarray(totals, dtype=np.int64)
+    vertex_count = len(co)
+    polygon_count = len(totals)
+
+    # Corner i of a polygon starts its edge to corner i + 1; boundary edges belong to one polygon
+    edge_starts = corner_verts
+    edge_ends = corner_verts[_neighbour_corners(totals, 1)]
+    edge_keys = np.minimum(edge_starts, edge_ends) * vertex_count + np.maximum(edge_starts, edge_ends)
+    _unique_keys, edge_ids, edge_users = np.unique(edge_keys, return_inverse=True, return_counts=True)
+    boundary = edge_users[edge_ids] == 1
+
+    side_polygons = np.repeat(np.arange(polygon_count), totals)[boundary]
+    side_starts = edge_starts[boundary]
+    side_ends = edge_ends[boundary]
+    side_corners = np.column_stack([
+        side_starts, side_ends, side_ends + vertex_count, side_starts + vertex_count
+    ])
+
+    bottom_corners = corner_verts
+    top_corners = corner_verts + vertex_count
+    if outward_normals:
+        # A polygon facing along the offset already points out of the prism's top
+        facing = polygon_normals(co, corner_verts, totals).dot(np.asarray(offset, dtype=np.float64)) >= 0
+        bottom_corners = flip_polygons(bottom_corners, totals, facing)
+        top_corners = flip_polygons(top_corners, totals, ~facing)
+        side_corners[~facing[side_polygons]] = side_corners[~facing[side_polygons]][:, [0, 3, 2, 1]]
+
+    result_co = np.concatenate([co, co + np.asarray(offset, dtype=np.float64)])
+    result_corners = np.concatenate([bottom_corners, top_corners, side_corners.ravel()])
+    result_totals = np.concatenate([totals, totals, np.full(len(side_polygons), 4, dtype=np.int64)])
+    sources = np.concatenate([np.arange(polygon_count), np.arange(polygon_count), side_polygons])
+    return (result_co, result_corners, result_totals, sources)
+
+
+def fatten(co, corner_verts, totals, distance):
+    # Move every vertex by distance along its normal, like shrink_fatten with value -distance
+    return np.asarray(co, dtype=np.float64) + vertex_normals(co, corner_verts, totals) * distance
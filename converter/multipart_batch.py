@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+
+# Multipart batch mode. A multipart print is a grid of tiles that arrive as separate requests
+# with the same centre, scale and size and different multipartXpc/multipartYpc offsets. With
+# TOUCH_MAPPER_MULTIPART_BATCH=true the first tile fetches and converts (OSM2World) a union area
+# of the requested tile and TOUCH_MAPPER_MULTIPART_BATCH_RADIUS tiles around it. The union OBJ and
+# raw meta are cached on disk, shared by all workers; each tile then runs clip-2d and Blender on
+# its own boundary inside the union, and sibling tiles inside a cached union skip the OSM fetch
+# and OSM2World entirely.
+#
+# Tile boundaries in the union's OSM2World coordinates are exact: OSM2World projects with a
+# scaled spherical Mercator, which is affine in lon and in Mercator y. Only the projection's
+# scale factor differs from a per-tile run (it is taken at the union centre instead of the tile
+# centre), by a few parts in ten thousand for neighbouring tiles.
+
+import contextlib
+import fcntl
+import json
+import math
+import os
+import shutil
+import time
+
+
+ENABLED_ENV_VAR = 'TOUCH_MAPPER_MULTIPART_BATCH'
+RADIUS_ENV_VAR = 'TOUCH_MAPPER_MULTIPART_BATCH_RADIUS'
+CACHE_DIR_ENV_VAR = 'TOUCH_MAPPER_MULTIPART_CACHE_DIR'
+CACHE_TTL_ENV_VAR = 'TOUCH_MAPPER_MULTIPART_CACHE_TTL_SECONDS'
+CACHE_MAX_MIB_ENV_VAR = 'TOUCH_MAPPER_MULTIPART_CACHE_MAX_MIB'
+DEFAULT_RADIUS_TILES = 1
+# Same freshness as the OSM cache: users who just edited OSM expect to see their edits.
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_MIB = 2048
+# Content modes whose OSM2World output for a tile only depends on the tile's area. The
+# only-big-roads pruner picks roads by density over the whole fetched area, so a union would
+# keep different roads than the tile alone.
+BATCH_CONTENT_MODES = ('normal', 'no-buildings')
+OBJ_FILE_NAME = 'map.obj'
+UNION_META_FILE_NAME = 'map-meta-union.json'
+INDEX_FILE_NAME = 'index.json'
+LOCK_FILE_NAME = 'index.lock'
+AREA_NAMES = ('latMin', 'lonMin', 'latMax', 'lonMax')
+# About 0.1 mm; a sibling tile's edge on the union's edge may differ by float noise.
+AREA_EPSILON_DEGREES = 1e-9
+
+
+def _env_bool(name):
+    return (os.environ.get(name) or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_number(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except Exception:
+        return default
+    return value if value >= 0 else default
+
+
+def applies_to(request_body):
+    return bool(request_body.get('multipartMode')) and \
+        request_body.get('contentMode', 'normal') in BATCH_CONTENT_MODES
+
+
+def radius_tiles():
+    return max(1, int(_env_number(RADIUS_ENV_VAR, DEFAULT_RADIUS_TILES)))
+
+
+def set_key(request_body):
+    # Tiles whose upstream output is interchangeable: same content and same OSM2World scale
+    # (road widths depend on it).
+    return '{}-{}'.format(request_body.get('contentMode', 'normal'), int(request_body['scale']))
+
+
+def union_area(eff_area, radius_tiles):
+    # eff_area grown by radius_tiles tile widths on every side. A 100 % multipart step moves the
+    # tile by its own width, so this covers the surrounding grid of tiles.
+    lon_span = (eff_area['lonMax'] - eff_area['lonMin']) * radius_tiles
+    lat_span = (eff_area['latMax'] - eff_area['latMin']) * radius_tiles
+    return {
+        'latMin': eff_area['latMin'] - lat_span,
+        'lonMin': eff_area['lonMin'] - lon_span,
+        'latMax': eff_area['latMax'] + lat_span,
+        'lonMax': eff_area['lonMax'] + lon_span,
+    }
+
+
+def area_contains(outer, inner):
+    return (
+        outer['latMin'] - AREA_EPSILON_DEGREES <= inner['latMin'] and
+        outer['lonMin'] - AREA_EPSILON_DEGREES <= inner['lonMin'] and
+        outer['latMax'] + AREA_EPSILON_DEGREES >= inner['latMax'] and
+        outer['lonMax'] + AREA_EPSILON_DEGREES >= inner['lonMax']
+    )
+
+
+def _mercator_y(lat):
+    # MercatorProjection.latToY without the constant offset and scale.
+    sin_lat = math.sin(math.radians(lat))
+    return math.log((1.0 + sin_lat) / (1.0 - sin_lat))
+
+
+def tile_boundary(union_eff_area, union_bounds, tile_eff_area):
+    # Boundary of tile_eff_area in the coordinates of an OSM2World run over union_eff_area,
+    # whose meta.boundary is union_bounds.
+    def x_at(lon):
+        fraction = (lon - union_eff_area['lonMin']) / (union_eff_area['lonMax'] - union_eff_area['lonMin'])
+        return union_bounds['minX'] + fraction * (union_bounds['maxX'] - union_bounds['minX'])
+
+    y_min = _mercator_y(union_eff_area['latMin'])
+    y_max = _mercator_y(union_eff_area['latMax'])
+
+    def y_at(lat):
+        fraction = (_mercator_y(lat) - y_min) / (y_max - y_min)
+        return union_bounds['minY'] + fraction * (union_bounds['maxY'] - union_bounds['minY'])
+
+    return {
+        'minX': x_at(tile_eff_area['lonMin']),
+        'minY': y_at(tile_eff_area['latMin']),
+        'maxX': x_at(tile_eff_area['lonMax']),
+        'maxY': y_at(tile_eff_area['latMax']),
+    }
+
+
+def _bounds_intersect(a, b):
+    return (
+        a['minX'] <= b['maxX'] and a['maxX'] >= b['minX'] and
+        a['minY'] <= b['maxY'] and a['maxY'] >= b['minY']
+    )
+
+
+def tile_meta(union_meta, boundary):
+    # Raw meta for one tile: union nodes, ways and areas whose bounds touch the tile boundary,
+    # and meta.boundary / meta.dataBoundary for the tile. Entries are shared with union_meta.
+    meta = dict(union_meta.get('meta') or {})
+    meta['boundary'] = dict(boundary)
+    data_boundary = meta.get('dataBoundary')
+    if data_boundary and _bounds_intersect(data_boundary, boundary):
+        meta['dataBoundary'] = {
+            'minX': max(data_boundary['minX'], boundary['minX']),
+            'minY': max(data_boundary['minY'], boundary['minY']),
+            'maxX': min(data_boundary['maxX'], boundary['maxX']),
+            'maxY': min(data_boundary['maxY'], boundary['maxY']),
+        }
+    result = {'meta': meta}
+    for key in ('nodes', 'ways', 'areas'):
+        result[key] = [
+            entry for entry in union_meta.get(key) or []
+            if not entry.get('bounds') or _bounds_intersect(entry['bounds'], boundary)
+        ]
+    for key, value in union_meta.items():
+        if key not in result:
+            result[key] = value
+    return result
+
+
+class MultipartCache(object):
+    # On-disk cache of union OSM2World outputs (map.obj and the union raw meta), one directory
+    # per entry, with an index of entry areas like osm_cache.OsmCache.
+    def __init__(self, root_dir, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_MIB * 1024 * 1024):
+        self.root_dir = root_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    # Build a cache from TOUCH_MAPPER_MULTIPART_* env vars. Return None unless batch mode is
+    # enabled, or when disabled by a zero TTL or size budget.
+    @classmethod
+    def from_env(cls, default_root_dir):
+        if not _env_bool(ENABLED_ENV_VAR):
+            return None
+        ttl_seconds = _env_number(CACHE_TTL_ENV_VAR, DEFAULT_TTL_SECONDS)
+        max_mib = _env_number(CACHE_MAX_MIB_ENV_VAR, DEFAULT_MAX_MIB)
+        if ttl_seconds == 0 or max_mib == 0:
+            return None
+        root_dir = os.environ.get(CACHE_DIR_ENV_VAR) or default_root_dir
+        return cls(root_dir, ttl_seconds=ttl_seconds, max_bytes=int(max_mib * 1024 * 1024))
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root_dir, key)
+
+    @contextlib.contextmanager
+    def _locked_index(self):
+        if not os.path.isdir(self.root_dir):
+            os.makedirs(self.root_dir, exist_ok=True)
+        with open(os.path.join(self.root_dir, LOCK_FILE_NAME), 'a+') as lock_handle:
+            fcntl.flock(lock_handle.fileno(), fcntl.LOCK_EX)
+            try:
+                index = self._read_index()
+                yield index
+                self._write_index(index)
+            finally:
+                fcntl.flock(lock_handle.fileno(), fcntl.LOCK_UN)
+
+    def _read_index(self):
+        path = os.path.join(self.root_dir, INDEX_FILE_NAME)
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                index = json.load(f)
+        except Exception:
+            index = {}
+        if not isinstance(index, dict) or not isinstance(index.get('entries'), dict):
+            index = {'entries': {}}
+        return index
+
+    def _write_index(self, index):
+        path = os.path.join(self.root_dir, INDEX_FILE_NAME)
+        tmp_path = path + '.tmp-{}'.format(os.getpid())
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _drop_entry(self, index, key):
+        index['entries'].pop(key, None)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _drop_expired(self, index, now):
+        for key, entry in list(index['entries'].items()):
+            if now - entry['created'] > self.ttl_seconds:
+                self._drop_entry(index, key)
+
+    # Copy the union output of the freshest entry for set_key_value containing tile_eff_area to
+    # obj_path and union_meta_path. Return the entry's union area, or None on a miss. Copying
+    # happens under the index lock, so the entry can't be evicted meanwhile.
+    def serve(self, set_key_value, tile_eff_area, obj_path, union_meta_path):
+        now = time.time()
+        with self._locked_index() as index:
+            self._drop_expired(index, now)
+            best_key = None
+            for key, entry in index['entries'].items():
+                if entry['set'] != set_key_value or not area_contains(entry['area'], tile_eff_area):
+                    continue
+                if best_key is None or entry['created'] > index['entries'][best_key]['created']:
+                    best_key = key
+            if best_key is None:
+                return None
+            entry_dir = self._entry_dir(best_key)
+            try:
+                shutil.copyfile(os.path.join(entry_dir, OBJ_FILE_NAME), obj_path)
+                shutil.copyfile(os.path.join(entry_dir, UNION_META_FILE_NAME), union_meta_path)
+            except OSError as e:
+                print("multipart cache: can't read entry {}: {}".format(best_key, e))
+                self._drop_entry(index, best_key)
+                return None
+            index['entries'][best_key]['last_used'] = now
+            return dict(index['entries'][best_key]['area'])
+
+    # Add the union output of a batch conversion and evict entries until the cache fits its
+    # size budget again.
+    def store(self, set_key_value, union_eff_area, obj_path, union_meta_path):
+        area = dict((name, union_eff_area[name]) for name in AREA_NAMES)
+        key = '{}-{}'.format(set_key_value, '_'.join('{:.7f}'.format(area[name]) for name in AREA_NAMES))
+        tmp_dir = self._entry_dir(key) + '.tmp-{}'.format(os.getpid())
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        shutil.copyfile(obj_path, os.path.join(tmp_dir, OBJ_FILE_NAME))
+        shutil.copyfile(union_meta_path, os.path.join(tmp_dir, UNION_META_FILE_NAME))
+        size_bytes = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+        now = time.time()
+        with self._locked_index() as index:
+            self._drop_entry(index, key)
+            os.replace(tmp_dir, self._entry_dir(key))
+            index['entries'][key] = {
+                'set': set_key_value,
+                'area': area,
+                'bytes': size_bytes,
+                'created': now,
+                'last_used': now,
+            }
+            self._drop_expired(index, now)
+            total_bytes = sum(entry['bytes'] for entry in index['entries'].values())
+            by_last_use = sorted(index['entries'].items(), key=lambda item: item[1]['last_used'])
+            for old_key, old_entry in by_last_use:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._drop_entry(index, old_key)
+                total_bytes -= old_entry['bytes']
@@ -9,19 +9,41 @@ import bmesh
 import json
 import math
 import time
+import resource
+import socket
+import traceback
 
 script_dir = os.path.dirname(__file__)
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
 import tactile_constants as tc
+try:
+    import numpy as np
+    import mesh_arrays
+    import stl_writer
+except ImportError:
+    np = None
+    mesh_arrays = None
+    stl_writer = None
 
 perf_clock = getattr(time, 'perf_counter', time.time)
 
 sys.path.insert(1, "%s/blender/2.78/python/lib/python3.5/svgwrite" % (script_dir,))
 # These modules imported at the site of use
 
+# With this set to true, extrusion and fattening run on NumPy arrays (mesh_arrays.py) instead of
+# edit mode operators, which iterate through every object in the scene.
+NUMPY_MESH_ENV_VAR = 'TOUCH_MAPPER_BLENDER_NUMPY_MESH'
+FATTEN_UNITS = 0.05 # less than this and programs start to "remove double vertices"
+# STL files are written by bpy.ops.export_mesh.stl, or with 'numpy' by stl_writer.py in one pass
+STL_WRITER_ENV_VAR = 'TOUCH_MAPPER_BLENDER_STL_WRITER'
+STL_SUFFIXES = ('', '-ways', '-rest')
 
-def do_cmdline():
+
+def script_argv():
+    return sys.argv[sys.argv.index("--") + 1:]
+
+def do_cmdline(argv):
     parser = argparse.ArgumentParser(description='''Read OSM map meshes, modify to tactile map, and export as .stl''')
     parser.add_argument('--min-x', metavar='FLOAT', type=float, help='minimum X bound')
     parser.add_argument('--min-y', metavar='FLOAT', type=float, help='minimum Y bound')
@@ -36,9 +58,16 @@ def do_cmdline():
     parser.add_argument('--export-wireframe-png', action='store_true', help="export orthographic top-view wireframe PNG")
     parser.add_argument('--base-path', help='base output path (without extension), defaults to first input path')
     parser.add_argument('mesh_paths', metavar='PATHS', nargs='+', help='.obj/.ply files to use as input')
-    args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:])
+    args = parser.parse_args(argv)
     return args
 
+def do_service_cmdline(argv):
+    parser = argparse.ArgumentParser(description='''Run obj-to-tactile jobs received from a Unix socket in this Blender process''')
+    parser.add_argument('--serve', metavar='SOCKET', required=True, help='Unix socket path to listen on')
+    parser.add_argument('--max-jobs', metavar='N', type=int, default=25, help='exit after N jobs to limit leaks')
+    parser.add_argument('--idle-timeout', metavar='SECONDS', type=float, default=900, help='exit after SECONDS without jobs')
+    return parser.parse_args(argv)
+
 def print_verts(ob):
     for v in ob.data.vertices:
         print(ob.name, ob.matrix_world * mathutils.Vector(v.co))
@@ -200,6 +229,9 @@ def _export_stl(stl_path, scale):
     bpy.ops.export_mesh.stl(filepath=stl_path, check_existing=False, \
                             axis_forward='Y', axis_up='Z', global_scale=(1000 / scale))
 
+def is_ways_object(ob):
+    return ob.name.endswith('Roads') or ob.name.endswith('RoadAreas') or ob.name.endswith('Rails')
+
 def export_stl(base_path, scale):
     bpy.ops.object.select_all(action='SELECT')
     _export_stl(base_path + '.stl', scale)
@@ -207,11 +239,78 @@ def export_stl(base_path, scale):
 def export_stl_separate(base_path, scale):
     bpy.ops.object.select_all(action='DESELECT')
     for ob in bpy.context.scene.objects:
-        ob.select = ob.name.endswith('Roads') or ob.name.endswith('RoadAreas') or ob.name.endswith('Rails')
+        ob.select = is_ways_object(ob)
     _export_stl(base_path + '-ways.stl', scale)
     bpy.ops.object.select_all(action='INVERT')
     _export_stl(base_path + '-rest.stl', scale)
 
+def stl_writer_enabled():
+    if stl_writer is None:
+        return False
+    return (os.environ.get(STL_WRITER_ENV_VAR) or '').strip().lower() == 'numpy'
+
+# Triangles of an object's evaluated mesh transformed by matrix * matrix_world, as an (N, 3, 3)
+# float32 array, triangulated and rounded like bpy.ops.export_mesh.stl does (which also keeps the
+# winding of objects with a negative scale). None for objects without geometry.
+def object_triangles(ob, matrix):
+    try:
+        mesh = ob.to_mesh(bpy.context.scene, True, 'PREVIEW')
+    except RuntimeError:
+        return None
+    try:
+        mesh.calc_tessface()
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        vertices_raw = np.empty(len(mesh.tessfaces) * 4, dtype=np.int32)
+        mesh.tessfaces.foreach_get('vertices_raw', vertices_raw)
+    finally:
+        bpy.data.meshes.remove(mesh)
+    co = stl_writer.transform_vertices(co, matrix * ob.matrix_world)
+    return co[stl_writer.tessface_triangles(vertices_raw)]
+
+# Write the full, -ways and -rest STL files in one pass over the scene: every object is
+# triangulated and transformed once and streamed to the full file and its split file.
+# Returns triangle counts by file name.
+def write_stl_files(base_path, scale):
+    paths = [base_path + suffix + '.stl' for suffix in STL_SUFFIXES]
+    (full_path, ways_path, rest_path) = paths
+    print("creating {}...".format(", ".join(paths)))
+    matrix = mathutils.Matrix.Scale(1000 / scale, 4)
+    header = ('Exported from Blender-' + bpy.app.version_string).encode('ascii', 'replace')
+    scene = bpy.context.scene
+    with stl_writer.MultiStlWriter(paths, header) as writer:
+        # The export operator writes the selected objects, and only visible ones get selected
+        for ob in scene.objects:
+            if not ob.is_visible(scene):
+                continue
+            triangles = object_triangles(ob, matrix)
+            if triangles is None:
+                continue
+            writer.write((full_path, ways_path if is_ways_object(ob) else rest_path), triangles)
+        counts = dict((os.path.basename(path), writer.counts[path]) for path in paths)
+    return counts
+
+# Export the STL files and write <base path>-stl-report.json with the time and triangle counts
+# for osm-to-tactile.py's telemetry
+def export_stl_files(base_path, scale):
+    t = perf_clock()
+    if stl_writer_enabled():
+        writer = 'numpy'
+        counts = write_stl_files(base_path, scale)
+    else:
+        writer = 'operator'
+        export_stl(base_path, scale)
+        export_stl_separate(base_path, scale)
+        counts = {}
+        if stl_writer is not None:
+            for suffix in STL_SUFFIXES:
+                path = base_path + suffix + '.stl'
+                counts[os.path.basename(path)] = stl_writer.triangle_count(path)
+    seconds = perf_clock() - t
+    print("creating STL files ({}) took {:.2f}: {}".format(writer, seconds, counts))
+    with open(base_path + '-stl-report.json', 'w') as f:
+        json.dump({'writer': writer, 'seconds': seconds, 'triangles': counts}, f)
+
 def export_blend_file(base_path):
     blend_path = base_path + '.blend'
     bpy.ops.object.select_all(action='SELECT') # it's handy to have everything selected initially
@@ -387,6 +486,20 @@ def remove_everything():
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.object.delete()
 
+# Remove data blocks no object uses any more, so that a service process starts every job
+# from the same empty data as a fresh Blender.
+def purge_orphan_data():
+    collections = (bpy.data.meshes, bpy.data.materials, bpy.data.textures, bpy.data.images,
+                   bpy.data.curves, bpy.data.cameras, bpy.data.lamps)
+    removed = True
+    while removed:
+        removed = False
+        for collection in collections:
+            for block in list(collection):
+                if block.users == 0:
+                    collection.remove(block)
+                    removed = True
+
 def mesh_name_for_path(mesh_path):
     basename = os.path.basename(mesh_path).lower()
     if 'road-areas-ped' in basename:
@@ -442,8 +555,55 @@ def import_mesh_file(mesh_path):
         else:
             ob.name = target_name + ('_%03d' % i)
 
+def numpy_mesh_enabled():
+    if mesh_arrays is None:
+        return False
+    return (os.environ.get(NUMPY_MESH_ENV_VAR) or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Read an object mode mesh into mesh_arrays' arrays: (co, corner_verts, totals, material_indices)
+def read_mesh_arrays(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', totals)
+    material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', material_indices)
+    corner_verts = loop_verts[mesh_arrays.polygon_corner_loops(loop_starts, totals)]
+    return (co.reshape(-1, 3).astype(np.float64), corner_verts, totals, material_indices)
+
+# Replace the geometry of a mesh, keeping its materials
+def write_mesh_arrays(mesh, co, corner_verts, totals, material_indices):
+    empty = bmesh.new()
+    empty.to_mesh(mesh)
+    empty.free()
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(co, dtype=np.float32).ravel())
+    mesh.loops.add(len(corner_verts))
+    mesh.loops.foreach_set('vertex_index', np.ascontiguousarray(corner_verts, dtype=np.int32))
+    mesh.polygons.add(len(totals))
+    mesh.polygons.foreach_set('loop_start', mesh_arrays.polygon_starts(totals).astype(np.int32))
+    mesh.polygons.foreach_set('loop_total', np.ascontiguousarray(totals, dtype=np.int32))
+    mesh.polygons.foreach_set('material_index', np.ascontiguousarray(material_indices, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+# Operator-free extrude_region_move of the whole object by height along world Z
+def extrude_mesh_arrays(ob, height, outward_normals):
+    (co, corner_verts, totals, material_indices) = read_mesh_arrays(ob.data)
+    if len(totals) == 0:
+        return
+    offset = ob.matrix_world.to_3x3().inverted() * mathutils.Vector((0.0, 0.0, height))
+    (co, corner_verts, totals, sources) = mesh_arrays.extrude(co, corner_verts, totals, tuple(offset), outward_normals)
+    write_mesh_arrays(ob.data, co, corner_verts, totals, material_indices[sources])
+
 # Extrude floor to a flat-roofed building
 def extrude_building(ob, height):
+    if numpy_mesh_enabled():
+        extrude_mesh_arrays(ob, height, outward_normals=True)
+        return
     bpy.ops.object.mode_set(mode = 'EDIT')
     bpy.ops.mesh.select_all(action='SELECT')
     bpy.ops.mesh.extrude_region_move(TRANSFORM_OT_translate={ "value": (0.0, 0.0, height) })
@@ -473,6 +633,9 @@ def join_objects(objects, name):
     return join_selected(name)
 
 def raise_ob(objs, height):
+    if numpy_mesh_enabled():
+        extrude_mesh_arrays(objs, height, outward_normals=False)
+        return
     bpy.ops.object.select_all(action='DESELECT')
     bpy.context.scene.objects.active = objs
     bpy.ops.object.mode_set(mode = 'EDIT')
@@ -483,11 +646,14 @@ def raise_ob(objs, height):
 def water_remesh_and_extrude(object, extrude_height):
     # Extrude just enough that remeshing works
     bpy.context.scene.objects.active = object
-    bpy.ops.object.mode_set(mode = 'EDIT')
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.mesh.extrude_region_move(TRANSFORM_OT_translate={ "value": (0.0, 0.0, extrude_height) })
-    bpy.ops.mesh.normals_make_consistent()
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    if numpy_mesh_enabled():
+        extrude_mesh_arrays(object, extrude_height, outward_normals=True)
+    else:
+        bpy.ops.object.mode_set(mode = 'EDIT')
+        bpy.ops.mesh.select_all(action='SELECT')
+        bpy.ops.mesh.extrude_region_move(TRANSFORM_OT_translate={ "value": (0.0, 0.0, extrude_height) })
+        bpy.ops.mesh.normals_make_consistent()
+        bpy.ops.object.mode_set(mode = 'OBJECT')
 
     # Remesh
     max_dimension = max(object.dimensions[0], object.dimensions[1])
@@ -685,10 +851,16 @@ def decimate(ob):
 
 # Fatten slightly to cause overlap and avoid faces too close to each other
 def fatten(ob):
+    if numpy_mesh_enabled():
+        (co, corner_verts, totals, _material_indices) = read_mesh_arrays(ob.data)
+        co = mesh_arrays.fatten(co, corner_verts, totals, FATTEN_UNITS)
+        ob.data.vertices.foreach_set('co', co.astype(np.float32).ravel())
+        ob.data.update()
+        return
     bpy.context.scene.objects.active = ob
     bpy.ops.object.mode_set(mode = 'EDIT')
     bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.transform.shrink_fatten(value=-0.05) # less than this and programs start to "remove double vertices"
+    bpy.ops.transform.shrink_fatten(value=-FATTEN_UNITS)
     bpy.ops.object.mode_set(mode = 'OBJECT')
 
 def do_ways(ways, height, min_x, min_y, max_x, max_y):
@@ -818,8 +990,8 @@ def make_tactile_map(args):
 
     return base_cube
 
-def main():
-    args = do_cmdline()
+def main(argv):
+    args = do_cmdline(argv)
     remove_everything()
 
     for mesh_path in args.mesh_paths:
@@ -835,13 +1007,136 @@ def main():
     base_cube = make_tactile_map(args)
     move_everything([-c for c in get_minimum_coordinate(base_cube)])
     if not args.no_stl_export:
-        export_stl(base_path, args.scale)
-        export_stl_separate(base_path, args.scale)
+        export_stl_files(base_path, args.scale)
         export_blend_file(base_path)
     if args.export_wireframe_png:
         final_min_x, final_min_y, _final_min_z, final_max_x, final_max_y, _final_max_z = get_object_world_bounds(base_cube)
         export_wireframe_png(base_path, 'wireframe', final_min_x, final_min_y, final_max_x, final_max_y)
     bpy.ops.object.select_all(action='SELECT') # it's handy to have everything selected when getting into UI
 
+def reset_peak_rss():
+    # Reset the kernel's peak RSS (VmHWM) of this process to its current RSS, so that
+    # peak_rss_kib() covers only what runs after this. Needs Linux 4.0 or later.
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+def peak_rss_kib(since_reset):
+    # Peak RSS in KiB since reset_peak_rss() if that succeeded, else over the process lifetime
+    # (ru_maxrss is in KiB on Linux).
+    if since_reset:
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])
+        except (IOError, OSError, ValueError):
+            pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def read_service_job(conn):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data.decode('utf8'))
+
+def send_service_reply(conn, reply):
+    try:
+        conn.sendall((json.dumps(reply) + '\n').encode('utf8'))
+    except socket.error:
+        pass
+
+# Service mode: keep this Blender process (with its addons) alive and run one job per
+# connection. A job is {"argv": [...]} with the same arguments as a one-shot run; the reply is
+# {"ok": ..., "seconds": ..., "maxRssKiB": ..., "jobs": ..., "recycling": ...}, where maxRssKiB
+# is the peak RSS during the job. The scene is emptied before and after every job. The service
+# exits after --max-jobs jobs, after a failed job (its scene state is unknown), or when idle for
+# --idle-timeout seconds.
+def serve(service_args):
+    socket_path = service_args.serve
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(1)
+    listener.settimeout(service_args.idle_timeout)
+    # Identifies our socket file: once we stop listening, the client may start a new service
+    # on the same path, whose socket must not be removed.
+    bound = os.stat(socket_path)
+    listening = [True]
+    print("blender service: listening on {} max_jobs={}".format(socket_path, service_args.max_jobs))
+
+    def stop_listening():
+        # Before the last reply, so that the client's next job starts a new service instead of
+        # connecting to this exiting one. Runs once.
+        if not listening[0]:
+            return
+        listening[0] = False
+        listener.close()
+        try:
+            current = os.stat(socket_path)
+        except OSError:
+            return
+        if (current.st_dev, current.st_ino) == (bound.st_dev, bound.st_ino):
+            os.remove(socket_path)
+
+    jobs = 0
+    try:
+        while jobs < service_args.max_jobs:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                print("blender service: idle, exiting")
+                return
+            conn.settimeout(None)
+            try:
+                job = read_service_job(conn)
+                if job is None:
+                    continue
+                jobs += 1
+                t = perf_clock()
+                rss_reset = reset_peak_rss()
+                try:
+                    remove_everything()
+                    purge_orphan_data()
+                    main(job['argv'])
+                    remove_everything()
+                    purge_orphan_data()
+                except Exception:
+                    traceback.print_exc()
+                    stop_listening()
+                    send_service_reply(conn, {
+                        'ok': False,
+                        'error': traceback.format_exc(),
+                        'jobs': jobs,
+                    })
+                    return
+                recycling = jobs >= service_args.max_jobs
+                if recycling:
+                    stop_listening()
+                print("blender service: job {} took {:.3f}s".format(jobs, perf_clock() - t))
+                send_service_reply(conn, {
+                    'ok': True,
+                    'seconds': perf_clock() - t,
+                    'maxRssKiB': peak_rss_kib(rss_reset),
+                    'jobs': jobs,
+                    'recycling': recycling,
+                })
+            finally:
+                conn.close()
+        print("blender service: {} jobs done, exiting to be recycled".format(jobs))
+    finally:
+        stop_listening()
+
 if __name__ == "__main__":
-    main()
+    argv = script_argv()
+    if '--serve' in argv:
+        serve(do_service_cmdline(argv))
+    else:
+        main(argv)
@@ -1,18 +1,51 @@
 #!/usr/bin/python3 -u
 
 import argparse
+import hashlib
 import os
+import signal
+import socket
+import struct
 import sys
 import subprocess
 import json
+import tempfile
+import time
 
 script_dir = os.path.dirname(os.path.realpath(__file__))
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
+import fast_json
+import multipart_batch
 from tactile_constants import BORDER_WIDTH_MM, BORDER_HORIZONTAL_OVERLAP_MM
 from telemetry import TelemetryLogger
 
 
+# TOUCH_MAPPER_BLENDER_SERVICE=true runs Blender jobs in a warm obj-to-tactile.py service
+# process (one per work directory) instead of starting Blender for every map.
+BLENDER_SERVICE_ENV_VAR = 'TOUCH_MAPPER_BLENDER_SERVICE'
+BLENDER_SERVICE_MAX_JOBS_ENV_VAR = 'TOUCH_MAPPER_BLENDER_SERVICE_MAX_JOBS'
+BLENDER_SERVICE_JOB_TIMEOUT_ENV_VAR = 'TOUCH_MAPPER_BLENDER_SERVICE_JOB_TIMEOUT'
+BLENDER_SERVICE_MAX_JOBS = 25
+BLENDER_SERVICE_IDLE_SECONDS = 900
+BLENDER_SERVICE_START_SECONDS = 60
+BLENDER_SERVICE_JOB_SECONDS = 300
+BLENDER_SERVICE_POLL_SECONDS = 0.1
+
+# TOUCH_MAPPER_OSM2WORLD_SERVER=true runs OSM2World conversions in a warm job server JVM (one
+# per work directory) instead of starting java for every map.
+OSM2WORLD_SERVER_ENV_VAR = 'TOUCH_MAPPER_OSM2WORLD_SERVER'
+OSM2WORLD_SERVER_MAX_JOBS_ENV_VAR = 'TOUCH_MAPPER_OSM2WORLD_SERVER_MAX_JOBS'
+OSM2WORLD_SERVER_JOB_TIMEOUT_ENV_VAR = 'TOUCH_MAPPER_OSM2WORLD_SERVER_JOB_TIMEOUT'
+OSM2WORLD_SERVER_ARGUMENT = '--touch-mapper-job-server'
+OSM2WORLD_SERVER_MAX_JOBS = 50
+OSM2WORLD_SERVER_IDLE_SECONDS = 900
+OSM2WORLD_SERVER_START_SECONDS = 60
+OSM2WORLD_SERVER_PING_SECONDS = 5
+OSM2WORLD_SERVER_JOB_SECONDS = 300
+OSM2WORLD_SERVER_POLL_SECONDS = 0.1
+
+
 def parse_env_bool(name):
     raw = os.environ.get(name)
     if raw is None:
@@ -33,12 +66,7 @@ def pretty_json_enabled():
 
 
 def write_json_file(path, value, pretty_json):
-    with open(path, 'w') as handle:
-        if pretty_json:
-            json.dump(value, handle, indent=2, ensure_ascii=False)
-            handle.write("\n")
-            return
-        json.dump(value, handle, separators=(',', ':'), ensure_ascii=False)
+    fast_json.dump_file(path, value, pretty=pretty_json)
 
 
 def compute_clip_bounds(boundary, scale, no_borders):
@@ -72,7 +100,15 @@ def do_cmdline():
     parser.add_argument('--size', metavar='CM', type=float, required=True, help="print size in cm")
     parser.add_argument('--no-borders', action='store_true', help="don't draw borders around the edges")
     parser.add_argument('--exclude-buildings', action='store_true', help="don't include buildings")
+    parser.add_argument('--meta-ready-file', metavar='PATH', help="create this file once map-meta-raw.json is final, before clip-2d and Blender run")
+    parser.add_argument('--union-area', metavar='JSON', help="multipart batch: lat/lon area of the input, a union of tiles; only the --tile-area part is printed")
+    parser.add_argument('--tile-area', metavar='JSON', help="multipart batch: lat/lon area of the tile to print")
+    parser.add_argument('--reuse-union', action='store_true', help="multipart batch: skip OSM2World, the union OBJ and meta are already in the input directory")
     args = parser.parse_args()
+    if (args.union_area is None) != (args.tile_area is None):
+        parser.error("--union-area and --tile-area go together")
+    if args.reuse_union and args.union_area is None:
+        parser.error("--reuse-union needs --union-area and --tile-area")
     return args
 
 def _parse_int_env(name, fallback):
@@ -85,39 +121,182 @@ def _parse_int_env(name, fallback):
         return fallback
 
 
+def osm2world_server_port_path(work_dir):
+    digest = hashlib.sha1(os.path.realpath(work_dir).encode('utf8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), 'touch-mapper-osm2world-{}.json'.format(digest))
+
+
+def read_osm2world_server_state(port_path):
+    # The server writes {"port", "token", "pid"} once it listens.
+    try:
+        state = fast_json.load_file(port_path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or 'port' not in state or 'token' not in state:
+        return None
+    return state
+
+
+def osm2world_server_request(state, message, timeout):
+    # Send one JSON line request and return the reply, or None if the server closed the
+    # connection without replying. Connection errors and timeouts raise OSError.
+    message = dict(message, token=state['token'])
+    with socket.create_connection(('127.0.0.1', state['port']), timeout=timeout) as conn:
+        conn.sendall((json.dumps(message) + '\n').encode('utf8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    if not data.endswith(b'\n'):
+        return None
+    return json.loads(data.decode('utf8'))
+
+
+def ping_osm2world_server(state):
+    try:
+        reply = osm2world_server_request(state, {'ping': True}, OSM2WORLD_SERVER_PING_SECONDS)
+    except OSError:
+        return False
+    return bool(reply and reply.get('ok'))
+
+
+def kill_osm2world_server(port_path, state):
+    # Kill a stuck server with everything it started, and remove its port file unless a new
+    # server has already replaced it. The server was started in a new session, so its pid is
+    # also its process group id. The next job starts a new server.
+    try:
+        os.killpg(state['pid'], signal.SIGKILL)
+    except (KeyError, TypeError, OSError):
+        pass
+    current = read_osm2world_server_state(port_path)
+    if current is not None and current.get('token') == state.get('token'):
+        try:
+            os.remove(port_path)
+        except OSError:
+            pass
+
+
+def start_osm2world_server(port_path, osm2world_path, telemetry):
+    # Start a detached server and wait until it answers a ping. Return its state, or None if
+    # it didn't come up.
+    if os.path.exists(port_path):
+        os.remove(port_path)  # left behind by a crashed server
+    max_jobs = _parse_int_env(OSM2WORLD_SERVER_MAX_JOBS_ENV_VAR, OSM2WORLD_SERVER_MAX_JOBS)
+    cmd = ['java', '-Xmx1G', '-jar', osm2world_path, OSM2WORLD_SERVER_ARGUMENT, port_path,
+           str(max_jobs), str(OSM2WORLD_SERVER_IDLE_SECONDS)]
+    telemetry.log("starting OSM2World server: " + " ".join(cmd))
+    with open(os.path.splitext(port_path)[0] + '.log', 'a') as log_handle:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log_handle,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.time() + OSM2WORLD_SERVER_START_SECONDS
+    while time.time() < deadline:
+        state = read_osm2world_server_state(port_path)
+        if state is not None and ping_osm2world_server(state):
+            return state
+        if process.poll() is not None:
+            return None
+        time.sleep(OSM2WORLD_SERVER_POLL_SECONDS)
+    process.kill()
+    return None
+
+
+def run_osm2world_server_job(job, osm2world_path, work_dir, telemetry):
+    # Run one conversion in the warm server, (re)starting it if it doesn't answer a ping.
+    # Return the server reply, or None if the server failed and the job should run one-shot.
+    port_path = osm2world_server_port_path(work_dir)
+    state = read_osm2world_server_state(port_path)
+    warm = state is not None and ping_osm2world_server(state)
+    if not warm:
+        state = start_osm2world_server(port_path, osm2world_path, telemetry)
+    if state is None:
+        telemetry.log("OSM2World server did not start")
+        return None
+    timeout = _parse_int_env(OSM2WORLD_SERVER_JOB_TIMEOUT_ENV_VAR, OSM2WORLD_SERVER_JOB_SECONDS)
+    try:
+        reply = osm2world_server_request(state, job, timeout)
+    except socket.timeout:
+        telemetry.log("OSM2World server job timed out after {}s, killing the server".format(timeout))
+        kill_osm2world_server(port_path, state)
+        return None
+    except OSError as e:
+        telemetry.log("OSM2World server connection failed: " + str(e))
+        return None
+    if reply is None:
+        telemetry.log("OSM2World server exited during the job, see " +
+                      os.path.splitext(port_path)[0] + '.log')
+        return None
+    if not reply.get('ok'):
+        telemetry.log("OSM2World server job failed: " + str(reply.get('error')))
+        return None
+    reply['warm'] = warm
+    telemetry.log("OSM2World server job {} ({}) took {:.3f}s, heap peak {:.0f} MiB{}".format(
+        reply.get('jobs'),
+        'warm' if warm else 'cold',
+        reply.get('seconds', 0.0),
+        reply.get('heapPeakBytes', 0) / (1024.0 * 1024.0),
+        ', server exiting' if reply.get('exiting') else ''
+    ))
+    return reply
+
+
 def run_osm2world(input_path, output_path, scale, exclude_buildings, telemetry):
+    # Return (meta, maxRssKiB, server reply or None).
     # Code below creates stage "OSM2World raw meta" data.
     osm2world_path = os.path.join(script_dir, 'OSM2World', 'build', 'OSM2World.jar')
     #print(osm2world_path + " " + input_path + " " + output_path)
-    cmd = [
-        'java', '-Xmx1G',
-        '-jar', osm2world_path,
-        '-i', input_path,
-        '-o', output_path]
     output_basename = os.path.splitext(os.path.basename(output_path))[0]
     osm2world_log_path = os.path.join(
         os.path.dirname(output_path),
         output_basename + '-osm2world.log'
     )
-    run_result = telemetry.run_subprocess(
-        cmd,
-        env={
-            'TOUCH_MAPPER_SCALE': str(scale),
-            'TOUCH_MAPPER_EXTRUDER_WIDTH': '0.5',
-            'TOUCH_MAPPER_EXCLUDE_BUILDINGS': ('true' if exclude_buildings else 'false')
-        },
-        output_log_path=osm2world_log_path,
-        depth_offset=0
-    )
+
+    server_reply = None
+    max_rss_kib = None
+    if parse_env_bool(OSM2WORLD_SERVER_ENV_VAR):
+        # The server may run in another directory, so all paths are absolute.
+        server_reply = run_osm2world_server_job(
+            {
+                'input': os.path.abspath(input_path),
+                'output': os.path.abspath(output_path),
+                'scale': scale,
+                'extruderWidth': 0.5,
+                'excludeBuildings': bool(exclude_buildings),
+                'logPath': os.path.abspath(osm2world_log_path),
+            },
+            osm2world_path,
+            os.path.dirname(os.path.abspath(output_path)),
+            telemetry
+        )
+        if server_reply is None:
+            telemetry.log("running OSM2World one-shot instead")
+
+    if server_reply is None:
+        cmd = [
+            'java', '-Xmx1G',
+            '-jar', osm2world_path,
+            '-i', input_path,
+            '-o', output_path]
+        run_result = telemetry.run_subprocess(
+            cmd,
+            env={
+                'TOUCH_MAPPER_SCALE': str(scale),
+                'TOUCH_MAPPER_EXTRUDER_WIDTH': '0.5',
+                'TOUCH_MAPPER_EXCLUDE_BUILDINGS': ('true' if exclude_buildings else 'false')
+            },
+            output_log_path=osm2world_log_path,
+            depth_offset=0
+        )
+        max_rss_kib = run_result.get('maxRssKiB')
 
     meta_path = os.path.join(os.path.dirname(output_path), 'map-meta-raw.json')
     if not os.path.exists(meta_path):
         raise Exception("Couldn't find map-meta-raw.json from OSM2World output")
-    with open(meta_path, 'r') as f:
-        meta = json.load(f)
+    meta = fast_json.load_file(meta_path)
     write_json_file(meta_path, meta, pretty_json_enabled())
 
-    return meta, run_result.get('maxRssKiB')
+    return meta, max_rss_kib, server_reply
 
 def run_clip_2d(obj_path, clip_bounds, telemetry):
     out_dir = os.path.dirname(obj_path)
@@ -159,6 +338,125 @@ def run_clip_2d(obj_path, clip_bounds, telemetry):
     return mesh_paths, report, run_result.get('maxRssKiB')
 
 
+def blender_service_socket_path(work_dir):
+    # Unix socket paths are limited to about 100 bytes, so key the path by a hash of work_dir.
+    digest = hashlib.sha1(os.path.realpath(work_dir).encode('utf8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), 'touch-mapper-blender-{}.sock'.format(digest))
+
+
+def connect_blender_service(socket_path):
+    if not os.path.exists(socket_path):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+
+def blender_service_pid(conn):
+    # Pid of the service at the other end of conn. It was started in a new session, so this is
+    # also its process group id.
+    try:
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    except (AttributeError, OSError):
+        return None
+    pid = struct.unpack('3i', creds)[0]
+    return pid if pid > 0 else None
+
+
+def kill_blender_service(pid):
+    # Kill a stuck or crashed service with everything it started. The next job finds its
+    # socket dead and starts a new service.
+    if pid is None:
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def start_blender_service(socket_path, blender_cmd_prefix, blender_env, obj_to_tactile_path, telemetry):
+    # Start a detached service and wait until it listens. Return a connection, or None if it
+    # didn't come up.
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # left behind by a crashed service
+    max_jobs = _parse_int_env(BLENDER_SERVICE_MAX_JOBS_ENV_VAR, BLENDER_SERVICE_MAX_JOBS)
+    cmd = blender_cmd_prefix + ['--background', '--python', obj_to_tactile_path, '--',
+                                '--serve', socket_path,
+                                '--max-jobs', str(max_jobs),
+                                '--idle-timeout', str(BLENDER_SERVICE_IDLE_SECONDS)]
+    run_env = os.environ.copy()
+    run_env.update(blender_env)
+    telemetry.log("starting blender service: " + " ".join(cmd))
+    with open(socket_path + '.log', 'a') as log_handle:
+        process = subprocess.Popen(cmd, env=run_env, stdin=subprocess.DEVNULL, stdout=log_handle,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.time() + BLENDER_SERVICE_START_SECONDS
+    while time.time() < deadline:
+        conn = connect_blender_service(socket_path)
+        if conn is not None:
+            return conn
+        if process.poll() is not None:
+            return None
+        time.sleep(BLENDER_SERVICE_POLL_SECONDS)
+    process.kill()
+    return None
+
+
+def run_blender_service_job(script_args, blender_cmd_prefix, blender_env, obj_to_tactile_path,
+                            work_dir, telemetry):
+    # Run one obj-to-tactile job in the warm service, starting it if needed. Return the
+    # service reply, or None if the service failed and the job should run one-shot.
+    socket_path = blender_service_socket_path(work_dir)
+    conn = connect_blender_service(socket_path)
+    warm = conn is not None
+    if conn is None:
+        conn = start_blender_service(socket_path, blender_cmd_prefix, blender_env, obj_to_tactile_path, telemetry)
+    if conn is None:
+        telemetry.log("blender service did not start")
+        return None
+    pid = blender_service_pid(conn)
+    # The service runs one job at a time, so a stuck job would block every later one.
+    timeout = _parse_int_env(BLENDER_SERVICE_JOB_TIMEOUT_ENV_VAR, BLENDER_SERVICE_JOB_SECONDS)
+    conn.settimeout(timeout)
+    try:
+        conn.sendall((json.dumps({'argv': script_args}) + '\n').encode('utf8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    except socket.timeout:
+        telemetry.log("blender service job timed out after {}s, killing the service".format(timeout))
+        kill_blender_service(pid)
+        return None
+    except OSError as e:
+        telemetry.log("blender service connection failed: " + str(e))
+        return None
+    finally:
+        conn.close()
+    if not data.endswith(b'\n'):
+        telemetry.log("blender service exited during the job, see " + socket_path + '.log')
+        kill_blender_service(pid)
+        return None
+    reply = json.loads(data.decode('utf8'))
+    if not reply.get('ok'):
+        telemetry.log("blender service job failed: " + str(reply.get('error')))
+        return None
+    reply['warm'] = warm
+    telemetry.log("blender service job {} ({}) took {:.3f}s{}".format(
+        reply.get('jobs'),
+        'warm' if warm else 'cold',
+        reply.get('seconds', 0.0),
+        ', service recycling' if reply.get('recycling') else ''
+    ))
+    return reply
+
+
 def run_blender(mesh_paths, boundary, args, output_base_path, telemetry):
     blender_dir = os.path.join(script_dir, 'blender')
     blender_env = {
@@ -181,14 +479,28 @@ def run_blender(mesh_paths, boundary, args, output_base_path, telemetry):
         '--size', str(args.size),
         '--base-path', output_base_path,
     ]
-    if args.foreground:
-        script_args.append('--no-stl-export')
-    else:
-        blender_args.append('--background')
     if args.no_borders:
         script_args.append('--no-borders')
     if args.marker1:
         script_args.extend(('--marker1', args.marker1))
+
+    if not args.foreground and parse_env_bool(BLENDER_SERVICE_ENV_VAR):
+        reply = run_blender_service_job(
+            script_args + mesh_paths,
+            [blender_path] + blender_args,
+            blender_env,
+            obj_to_tactile_path,
+            os.path.dirname(output_base_path),
+            telemetry
+        )
+        if reply is not None:
+            return reply.get('maxRssKiB')
+        telemetry.log("running Blender one-shot instead")
+
+    if args.foreground:
+        script_args.append('--no-stl-export')
+    else:
+        blender_args.append('--background')
     cmd = [blender_path] + blender_args + ['--python', obj_to_tactile_path, '--'] + script_args + mesh_paths
     run_result = telemetry.run_subprocess(
         cmd,
@@ -198,6 +510,48 @@ def run_blender(mesh_paths, boundary, args, output_base_path, telemetry):
 
     return run_result.get('maxRssKiB')
 
+def run_osm2world_stage(osm_path, obj_path, args, telemetry):
+    osm2world_stage = telemetry.start_stage('run-osm2world', component='run-osm2world')
+    meta, osm2world_rss_kib, osm2world_job = run_osm2world(
+        osm_path, obj_path, args.scale, args.exclude_buildings, telemetry)
+    if osm2world_job is not None:
+        job_seconds = float(osm2world_job.get('seconds', 0.0))
+        telemetry.attach_external_child(
+            osm2world_stage,
+            {
+                'name': 'osm2world-server.job',
+                'component': 'osm2world-server',
+                'totalSec': job_seconds,
+                'selfSec': job_seconds,
+                'childSec': 0.0,
+                'maxRssKiB': osm2world_job.get('maxRssKiB'),
+                'children': [],
+                'warm': osm2world_job.get('warm'),
+                'heapUsedBytes': osm2world_job.get('heapUsedBytes'),
+                'heapPeakBytes': osm2world_job.get('heapPeakBytes'),
+                'heapMaxBytes': osm2world_job.get('heapMaxBytes'),
+            }
+        )
+    telemetry.end_stage(osm2world_stage, own_max_rss_kib=osm2world_rss_kib)
+    return meta
+
+def write_multipart_tile_meta(input_dir, union_area, tile_area, union_meta):
+    # Keep the union raw meta next to map.obj and replace map-meta-raw.json with the tile's
+    # part of it. union_meta is None when the union output came from the multipart cache.
+    union_meta_path = os.path.join(input_dir, multipart_batch.UNION_META_FILE_NAME)
+    raw_meta_path = os.path.join(input_dir, 'map-meta-raw.json')
+    if union_meta is None:
+        union_meta = fast_json.load_file(union_meta_path)
+    else:
+        os.replace(raw_meta_path, union_meta_path)
+    union_bounds = union_meta.get('meta', {}).get('boundary')
+    if union_bounds is None:
+        raise Exception("union meta missing meta.boundary")
+    boundary = multipart_batch.tile_boundary(union_area, union_bounds, tile_area)
+    meta = multipart_batch.tile_meta(union_meta, boundary)
+    write_json_file(raw_meta_path, meta, pretty_json_enabled())
+    return meta
+
 def print_size(scale, boundary, telemetry):
     sizeX = boundary['maxX'] - boundary['minX']
     sizeY = boundary['maxY'] - boundary['minY']
@@ -224,15 +578,35 @@ def main():
 
     # Run OSM2World
     obj_path = input_basename + '.obj'
-    osm2world_stage = telemetry.start_stage('run-osm2world', component='run-osm2world')
-    meta, osm2world_rss_kib = run_osm2world(osm_path, obj_path, args.scale, args.exclude_buildings, telemetry)
-    telemetry.end_stage(osm2world_stage, own_max_rss_kib=osm2world_rss_kib)
+    meta = None
+    if args.reuse_union:
+        telemetry.log("reusing cached multipart union output, OSM2World skipped")
+    else:
+        meta = run_osm2world_stage(osm_path, obj_path, args, telemetry)
+
+    # Multipart batch: the OSM2World output covers a union of tiles, print only this tile
+    if args.union_area is not None:
+        tile_stage = telemetry.start_stage('multipart-tile-meta', component='multipart-tile-meta')
+        meta = write_multipart_tile_meta(
+            input_dir, json.loads(args.union_area), json.loads(args.tile_area), meta)
+        telemetry.end_stage(tile_stage, own_max_rss_kib=None)
+
     boundary = meta.get('meta', {}).get('boundary')
     if boundary is None:
         raise Exception("map-meta-raw.json missing meta.boundary")
 
     print_size(args.scale, boundary, telemetry)
 
+    # Written before the ready signal: map_desc may then run concurrently with Blender and
+    # overwrites map-meta.json with its grouped output.
+    meta_path = input_basename + '-meta.json'
+    write_meta_stage = telemetry.start_stage('write-map-meta', component='write-map-meta')
+    write_json_file(meta_path, meta, pretty_json_enabled())
+    telemetry.end_stage(write_meta_stage, own_max_rss_kib=None)
+    if args.meta_ready_file:
+        with open(args.meta_ready_file, 'w'):
+            pass
+
     # Run clip-2d
     clip_bounds = compute_clip_bounds(boundary, args.scale, args.no_borders)
     clip_stage = telemetry.start_stage('run-clip-2d', component='run-clip-2d')
@@ -257,14 +631,30 @@ def main():
 
     # Run Blender
     blender_stage = telemetry.start_stage('run-blender', component='run-blender')
-    meta_path = input_basename + '-meta.json'
+    stl_report_path = input_basename + '-stl-report.json'
+    if os.path.exists(stl_report_path):
+        os.remove(stl_report_path)
     blender_rss_kib = run_blender(mesh_paths, boundary, args, input_basename, telemetry)
+    if os.path.exists(stl_report_path):
+        with open(stl_report_path, 'r') as f:
+            stl_report = json.load(f)
+        stl_seconds = float(stl_report.get('seconds', 0.0))
+        telemetry.attach_external_child(
+            blender_stage,
+            {
+                'name': 'blender.export-stl',
+                'component': 'blender',
+                'totalSec': stl_seconds,
+                'selfSec': stl_seconds,
+                'childSec': 0.0,
+                'maxRssKiB': None,
+                'children': [],
+                'writer': stl_report.get('writer'),
+                'triangles': stl_report.get('triangles'),
+            }
+        )
     telemetry.end_stage(blender_stage, own_max_rss_kib=blender_rss_kib)
 
-    write_meta_stage = telemetry.start_stage('write-map-meta', component='write-map-meta')
-    write_json_file(meta_path, meta, pretty_json_enabled())
-    telemetry.end_stage(write_meta_stage, own_max_rss_kib=None)
-
     timings_path = os.path.join(os.path.dirname(osm_path), 'osm-to-tactile-timings.json')
     telemetry.write_json(timings_path, extra={'metaPath': meta_path})
     telemetry.log('timings-json: ' + timings_path)
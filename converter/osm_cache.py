@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+
+# On-disk cache of fetched OSM data, shared by all workers of an environment. Entries are raw
+# fetch results (before content mode pruning) keyed by their content and quantized bounding box.
+# Content is 'full' for complete map data, or a content mode name for data downloaded with that
+# mode's reduced query. A request is served from any fresh entry with usable content whose area
+# contains the requested area; entries over the size budget are evicted least recently used
+# first.
+
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import time
+
+import osm_xml
+
+
+CACHE_DIR_ENV_VAR = 'TOUCH_MAPPER_OSM_CACHE_DIR'
+CACHE_TTL_ENV_VAR = 'TOUCH_MAPPER_OSM_CACHE_TTL_SECONDS'
+CACHE_MAX_MIB_ENV_VAR = 'TOUCH_MAPPER_OSM_CACHE_MAX_MIB'
+# Short TTL: users who just edited OSM expect to see their edits after a few minutes.
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_MIB = 1024
+# About 1 cm; only absorbs float noise in effectiveArea so the same area maps to one key.
+KEY_QUANTUM_DEGREES = 1e-7
+INDEX_FILE_NAME = 'index.json'
+LOCK_FILE_NAME = 'index.lock'
+COPY_CHUNK_BYTES = 256 * 1024
+
+
+def area_key(eff_area):
+    return '{}_{}_{}_{}'.format(*[
+        int(round(eff_area[name] / KEY_QUANTUM_DEGREES))
+        for name in ('latMin', 'lonMin', 'latMax', 'lonMax')
+    ])
+
+
+def entry_key(content, eff_area):
+    return content + '-' + area_key(eff_area)
+
+
+def area_contains(outer, inner):
+    return (
+        outer['latMin'] <= inner['latMin'] and
+        outer['lonMin'] <= inner['lonMin'] and
+        outer['latMax'] >= inner['latMax'] and
+        outer['lonMax'] >= inner['lonMax']
+    )
+
+
+def _area_size(eff_area):
+    return (eff_area['latMax'] - eff_area['latMin']) * (eff_area['lonMax'] - eff_area['lonMin'])
+
+
+def _env_number(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except Exception:
+        return default
+    return value if value >= 0 else default
+
+
+class OsmCache(object):
+    def __init__(self, root_dir, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_MIB * 1024 * 1024):
+        self.root_dir = root_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    # Build a cache from TOUCH_MAPPER_OSM_CACHE_* env vars. Return None when disabled by a
+    # zero TTL or size budget.
+    @classmethod
+    def from_env(cls, default_root_dir):
+        ttl_seconds = _env_number(CACHE_TTL_ENV_VAR, DEFAULT_TTL_SECONDS)
+        max_mib = _env_number(CACHE_MAX_MIB_ENV_VAR, DEFAULT_MAX_MIB)
+        if ttl_seconds == 0 or max_mib == 0:
+            return None
+        root_dir = os.environ.get(CACHE_DIR_ENV_VAR) or default_root_dir
+        return cls(root_dir, ttl_seconds=ttl_seconds, max_bytes=int(max_mib * 1024 * 1024))
+
+    def _entry_path(self, key):
+        return os.path.join(self.root_dir, key + '.osm')
+
+    @contextlib.contextmanager
+    def _locked_index(self):
+        if not os.path.isdir(self.root_dir):
+            os.makedirs(self.root_dir, exist_ok=True)
+        with open(os.path.join(self.root_dir, LOCK_FILE_NAME), 'a+') as lock_handle:
+            fcntl.flock(lock_handle.fileno(), fcntl.LOCK_EX)
+            try:
+                index = self._read_index()
+                yield index
+                self._write_index(index)
+            finally:
+                fcntl.flock(lock_handle.fileno(), fcntl.LOCK_UN)
+
+    def _read_index(self):
+        path = os.path.join(self.root_dir, INDEX_FILE_NAME)
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                index = json.load(f)
+        except Exception:
+            index = {}
+        if not isinstance(index, dict) or not isinstance(index.get('entries'), dict):
+            index = {'entries': {}}
+        index.setdefault('hits', 0)
+        index.setdefault('misses', 0)
+        return index
+
+    def _write_index(self, index):
+        path = os.path.join(self.root_dir, INDEX_FILE_NAME)
+        tmp_path = path + '.tmp-{}'.format(os.getpid())
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _drop_entry(self, index, key):
+        index['entries'].pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _drop_expired(self, index, now):
+        for key, entry in list(index['entries'].items()):
+            if now - entry['created'] > self.ttl_seconds:
+                self._drop_entry(index, key)
+
+    # Pick the smallest fresh entry containing eff_area that has all data content_mode needs,
+    # preferring data fetched for that mode, and mark it used. Return its key and entry, or
+    # (None, None) on a miss.
+    def _lookup(self, eff_area, content_mode):
+        now = time.time()
+        with self._locked_index() as index:
+            self._drop_expired(index, now)
+            best_key = None
+            best_rank = None
+            for key, entry in index['entries'].items():
+                content = entry.get('content', 'full')
+                if content != 'full' and content != content_mode:
+                    continue
+                if not area_contains(entry['area'], eff_area):
+                    continue
+                rank = (_area_size(entry['area']), 0 if content == content_mode else 1)
+                if best_rank is None or rank < best_rank:
+                    best_key = key
+                    best_rank = rank
+            if best_key is None:
+                index['misses'] += 1
+                return None, None
+            index['hits'] += 1
+            index['entries'][best_key]['last_used'] = now
+            return best_key, dict(index['entries'][best_key])
+
+    # Write OSM data for eff_area and content_mode to osm_path from the cache. Return 'hit' when
+    # an entry for the same area was copied, 'superset_hit' when a larger entry was clipped, or
+    # 'miss'.
+    def serve(self, eff_area, osm_path, content_mode):
+        key, entry = self._lookup(eff_area, content_mode)
+        if key is None:
+            return 'miss'
+        entry_path = self._entry_path(key)
+        try:
+            if area_key(entry['area']) == area_key(eff_area):
+                self._copy_with_bounds(entry_path, osm_path, eff_area)
+                return 'hit'
+            osm_xml.clip_osm_file_to_area(entry_path, osm_path, eff_area)
+            return 'superset_hit'
+        except Exception as e:
+            # Entry may have been evicted by another worker after lookup.
+            print("OSM cache: can't read entry {}: {}".format(key, e))
+            if os.path.exists(osm_path):
+                os.remove(osm_path)
+            return 'miss'
+
+    def _copy_with_bounds(self, src_path, dst_path, eff_area):
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            writer = osm_xml.OsmStreamWriter(dst, eff_area=eff_area)
+            while True:
+                chunk = src.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                writer.write(chunk)
+            writer.close()
+
+    # Add a freshly fetched OSM file for eff_area with the given content ('full' or a content
+    # mode) and evict entries until the cache fits its size budget again.
+    def store(self, osm_path, eff_area, content):
+        key = entry_key(content, eff_area)
+        entry_path = self._entry_path(key)
+        if not os.path.isdir(self.root_dir):
+            os.makedirs(self.root_dir, exist_ok=True)
+        tmp_path = entry_path + '.tmp-{}'.format(os.getpid())
+        shutil.copyfile(osm_path, tmp_path)
+        size_bytes = os.path.getsize(tmp_path)
+        now = time.time()
+        with self._locked_index() as index:
+            os.replace(tmp_path, entry_path)
+            index['entries'][key] = {
+                'area': dict((name, eff_area[name]) for name in ('latMin', 'lonMin', 'latMax', 'lonMax')),
+                'content': content,
+                'bytes': size_bytes,
+                'created': now,
+                'last_used': now,
+            }
+            self._drop_expired(index, now)
+            total_bytes = sum(entry['bytes'] for entry in index['entries'].values())
+            by_last_use = sorted(index['entries'].items(), key=lambda item: item[1]['last_used'])
+            for old_key, old_entry in by_last_use:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._drop_entry(index, old_key)
+                total_bytes -= old_entry['bytes']
+
+    # Return cumulative (hits, misses) of the shared cache.
+    def counters(self):
+        with self._locked_index() as index:
+            return index['hits'], index['misses']
@@ -0,0 +1,377 @@
+#!/usr/bin/python3
+
+# Streaming helpers for OSM XML files. Files are read one top-level element at a time with
+# iterparse, so memory use does not grow with the size of the file.
+
+import bisect
+import re
+from array import array
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+
+STREAM_HEAD_MAX_BYTES = 1024 * 1024
+FIRST_ELEMENT_RE = re.compile(br'<(node|way|relation)[\s>/]')
+ATTRIB_ESCAPES = (('"', '&quot;'), ('\r', '&#13;'), ('\n', '&#10;'), ('\t', '&#09;'))
+
+
+def bounds_tag(eff_area):
+    return '<bounds minlat="{}" minlon="{}" maxlat="{}" maxlon="{}"/>'.format(
+        eff_area['latMin'],
+        eff_area['lonMin'],
+        eff_area['latMax'],
+        eff_area['lonMax']
+    )
+
+
+def add_or_replace_bounds(osm_data, eff_area):
+    if isinstance(osm_data, bytes):
+        osm_text = osm_data.decode('utf8')
+    else:
+        osm_text = str(osm_data)
+    bounds_line = '  ' + bounds_tag(eff_area)
+    if re.search(r'<bounds [^>]+/>\s*', osm_text):
+        return re.sub(r'<bounds [^>]+/>\s*', bounds_line + '\n', osm_text, count=1)
+    if re.search(r'<meta [^>]+/>\s*', osm_text):
+        return re.sub(r'(<meta [^>]+/>\s*)', r'\1' + bounds_line + '\n', osm_text, count=1)
+    return re.sub(r'(<osm[^>]*>\s*)', r'\1' + bounds_line + '\n', osm_text, count=1)
+
+
+class OsmStreamWriter(object):
+    # Writes an OSM document arriving in chunks to disk. When eff_area is given, the document
+    # head (everything before the first node/way/relation) is buffered and gets <bounds> for
+    # eff_area spliced in exactly like add_or_replace_bounds does for a whole document.
+    def __init__(self, handle, eff_area=None):
+        self.handle = handle
+        self.eff_area = eff_area
+        self.head = b'' if eff_area is not None else None
+        self.bytes_written = 0
+
+    def _write(self, data):
+        self.handle.write(data)
+        self.bytes_written += len(data)
+
+    def _flush_head(self, cut_index):
+        head = self.head
+        self.head = None
+        self._write(add_or_replace_bounds(head[:cut_index], self.eff_area).encode('utf8'))
+        if cut_index < len(head):
+            self._write(head[cut_index:])
+
+    def write(self, chunk):
+        if self.head is None:
+            self._write(chunk)
+            return
+        self.head += chunk
+        match = FIRST_ELEMENT_RE.search(self.head)
+        if match is not None:
+            self._flush_head(match.start())
+        elif len(self.head) > STREAM_HEAD_MAX_BYTES:
+            # No elements yet in an unusually long head; cut at a tag end, a safe UTF-8 boundary.
+            self._flush_head(self.head.rfind(b'>') + 1)
+
+    def close(self):
+        if self.head is not None:
+            self._flush_head(len(self.head))
+
+
+# Yield (root_attrib, element) for each direct child of <osm>. The element and everything
+# parsed before it is dropped once the caller moves on to the next one.
+def iter_osm_elements(osm_path):
+    depth = 0
+    root = None
+    root_attrib = None
+    try:
+        for event, elem in ET.iterparse(osm_path, events=('start', 'end')):
+            if event == 'start':
+                if depth == 0:
+                    root = elem
+                    root_attrib = dict(elem.attrib)
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                yield root_attrib, elem
+                root.clear()
+    except ET.ParseError as e:
+        raise Exception("Can't parse OSM XML at {}: {}".format(osm_path, e))
+
+
+def _escape_text(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _escape_attrib(value):
+    value = _escape_text(value)
+    for char, entity in ATTRIB_ESCAPES:
+        if char in value:
+            value = value.replace(char, entity)
+    return value
+
+
+# Append the XML text of elem (without its tail) to parts. Same output as ET.tostring for the
+# plain elements of OSM files, without its per-call namespace bookkeeping.
+def _serialize_element(elem, parts):
+    parts.append('<' + elem.tag)
+    for key, value in elem.attrib.items():
+        parts.append(' {}="{}"'.format(key, _escape_attrib(value)))
+    if elem.text or len(elem):
+        parts.append('>')
+        if elem.text:
+            parts.append(_escape_text(elem.text))
+        for child in elem:
+            _serialize_element(child, parts)
+            if child.tail:
+                parts.append(_escape_text(child.tail))
+        parts.append('</' + elem.tag + '>')
+    else:
+        parts.append(' />')
+
+
+class OsmXmlWriter(object):
+    # Writes an <osm> document element by element. Elements come from iter_osm_elements. When
+    # eff_area is given, <bounds> for it is written after note/meta, before the first node.
+    def __init__(self, handle, root_attrib, eff_area=None):
+        self.handle = handle
+        self.pending_bounds = eff_area
+        attrs = ''.join(' {}={}'.format(key, quoteattr(value)) for key, value in root_attrib.items())
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm{}>\n'.format(attrs))
+
+    def _flush_bounds(self):
+        if self.pending_bounds is not None:
+            self.handle.write('  ' + bounds_tag(self.pending_bounds) + '\n')
+            self.pending_bounds = None
+
+    def write_element(self, elem):
+        if elem.tag not in ('note', 'meta'):
+            self._flush_bounds()
+        parts = ['  ']
+        _serialize_element(elem, parts)
+        parts.append('\n')
+        self.handle.write(''.join(parts))
+
+    def close(self):
+        self._flush_bounds()
+        self.handle.write('</osm>\n')
+
+
+def _node_in_area(elem, eff_area):
+    try:
+        lat = float(elem.get('lat'))
+        lon = float(elem.get('lon'))
+    except (TypeError, ValueError):
+        return False
+    return (
+        eff_area['latMin'] <= lat <= eff_area['latMax'] and
+        eff_area['lonMin'] <= lon <= eff_area['lonMax']
+    )
+
+
+# Cut an OSM file down to eff_area with the same selection as an OSM "map?bbox=" call: nodes
+# inside the area, ways using any of them together with all their nodes, and relations that
+# have any selected node or way as a member. Output gets eff_area as its <bounds>.
+def clip_osm_file_to_area(src_path, dst_path, eff_area):
+    inside_node_ids = set()
+    keep_way_ids = set()
+    way_node_ids = set()
+    for _, elem in iter_osm_elements(src_path):
+        if elem.tag == 'node':
+            if _node_in_area(elem, eff_area):
+                inside_node_ids.add(elem.get('id'))
+        elif elem.tag == 'way':
+            refs = [nd.get('ref') for nd in elem.iter('nd')]
+            if any(ref in inside_node_ids for ref in refs):
+                keep_way_ids.add(elem.get('id'))
+                way_node_ids.update(refs)
+    keep_node_ids = inside_node_ids | way_node_ids
+    del inside_node_ids, way_node_ids
+
+    with open(dst_path, 'w', encoding='utf8') as handle:
+        writer = None
+        for root_attrib, elem in iter_osm_elements(src_path):
+            if writer is None:
+                writer = OsmXmlWriter(handle, root_attrib, eff_area=eff_area)
+            if elem.tag in ('note', 'meta'):
+                writer.write_element(elem)
+            elif elem.tag == 'bounds':
+                continue
+            elif elem.tag == 'node':
+                if elem.get('id') in keep_node_ids:
+                    writer.write_element(elem)
+            elif elem.tag == 'way':
+                if elem.get('id') in keep_way_ids:
+                    writer.write_element(elem)
+            elif elem.tag == 'relation':
+                for member in elem.iter('member'):
+                    member_type = member.get('type')
+                    member_ref = member.get('ref')
+                    if ((member_type == 'node' and member_ref in keep_node_ids) or
+                            (member_type == 'way' and member_ref in keep_way_ids)):
+                        writer.write_element(elem)
+                        break
+        if writer is None:
+            raise Exception("Can't clip OSM XML at {}: no <osm> element".format(src_path))
+        writer.close()
+
+
+def element_tags(elem):
+    tags = {}
+    for child in list(elem):
+        if child.tag != 'tag':
+            continue
+        key = child.get('k')
+        if key is None:
+            continue
+        tags[key] = child.get('v')
+    return tags
+
+
+def has_building_tags(tags):
+    def is_active_building_value(value):
+        if value is None:
+            return False
+        normalized = str(value).strip().lower()
+        return normalized != '' and normalized != 'no'
+    return (
+        is_active_building_value(tags.get('building')) or
+        is_active_building_value(tags.get('building:part'))
+    )
+
+
+def _int_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class IdSet(object):
+    # Read-only set of OSM ids stored as a sorted array of 64-bit ints, a fraction of the
+    # memory of a Python set.
+    def __init__(self, ids):
+        self._ids = array('q', sorted(set(ids)))
+
+    def __contains__(self, value):
+        if value is None:
+            return False
+        index = bisect.bisect_left(self._ids, value)
+        return index < len(self._ids) and self._ids[index] == value
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# Remove buildings from an OSM file: ways and relations tagged as buildings, ways and relations
+# that are members of building relations, building nodes, and untagged nodes no longer used by
+# a kept way or relation. Members pointing to removed ways/relations are dropped from kept
+# relations. Output gets eff_area as its <bounds>.
+#
+# First pass collects ids into compact arrays; relations are kept in memory since building
+# relations can name later relations as members. Second pass streams the output.
+def filter_osm_file_for_no_buildings(src_path, dst_path, eff_area):
+    building_way_ids = set()
+    candidate_way_ids = array('q')
+    candidate_ref_ends = array('q')
+    candidate_refs = array('q')
+    relations = []
+    for _, elem in iter_osm_elements(src_path):
+        if elem.tag == 'way':
+            elem_id = _int_id(elem.get('id'))
+            if elem_id is None:
+                continue
+            if has_building_tags(element_tags(elem)):
+                building_way_ids.add(elem_id)
+                continue
+            candidate_way_ids.append(elem_id)
+            for nd in elem.iter('nd'):
+                ref = _int_id(nd.get('ref'))
+                if ref is not None:
+                    candidate_refs.append(ref)
+            candidate_ref_ends.append(len(candidate_refs))
+        elif elem.tag == 'relation':
+            elem_id = _int_id(elem.get('id'))
+            if elem_id is None:
+                continue
+            members = []
+            for member in elem.iter('member'):
+                ref = _int_id(member.get('ref'))
+                if ref is not None:
+                    members.append((member.get('type'), ref))
+            relations.append((elem_id, has_building_tags(element_tags(elem)), members))
+
+    members_by_relation = dict((rel_id, members) for rel_id, _, members in relations)
+    building_relation_ids = set(rel_id for rel_id, is_building, _ in relations if is_building)
+    pending_building_relations = list(building_relation_ids)
+    seen_building_relations = set()
+    while pending_building_relations:
+        rel_id = pending_building_relations.pop()
+        if rel_id in seen_building_relations:
+            continue
+        seen_building_relations.add(rel_id)
+        for member_type, member_ref in members_by_relation.get(rel_id, ()):
+            if member_type == 'way':
+                building_way_ids.add(member_ref)
+            elif member_type == 'relation' and member_ref not in seen_building_relations:
+                building_relation_ids.add(member_ref)
+                pending_building_relations.append(member_ref)
+
+    keep_way_ids = []
+    keep_node_ids = array('q')
+    ref_start = 0
+    for way_id, ref_end in zip(candidate_way_ids, candidate_ref_ends):
+        if way_id not in building_way_ids:
+            keep_way_ids.append(way_id)
+            keep_node_ids.extend(candidate_refs[ref_start:ref_end])
+        ref_start = ref_end
+    del candidate_way_ids, candidate_ref_ends, candidate_refs
+    keep_relation_ids = set()
+    for rel_id, _, members in relations:
+        if rel_id in building_relation_ids:
+            continue
+        keep_relation_ids.add(rel_id)
+        keep_node_ids.extend(ref for member_type, ref in members if member_type == 'node')
+    del relations, members_by_relation
+    keep_way_ids = IdSet(keep_way_ids)
+    keep_node_ids = IdSet(keep_node_ids)
+
+    with open(dst_path, 'w', encoding='utf8') as handle:
+        writer = None
+        for root_attrib, elem in iter_osm_elements(src_path):
+            if writer is None:
+                writer = OsmXmlWriter(handle, root_attrib, eff_area=eff_area)
+            if elem.tag in ('note', 'meta'):
+                writer.write_element(elem)
+            elif elem.tag == 'node':
+                tags = element_tags(elem)
+                if has_building_tags(tags):
+                    continue
+                if len(tags) == 0 and _int_id(elem.get('id')) not in keep_node_ids:
+                    continue
+                writer.write_element(elem)
+            elif elem.tag == 'way':
+                if _int_id(elem.get('id')) in keep_way_ids:
+                    writer.write_element(elem)
+            elif elem.tag == 'relation':
+                if _int_id(elem.get('id')) not in keep_relation_ids:
+                    continue
+                for member in list(elem):
+                    if member.tag != 'member':
+                        continue
+                    member_type = member.get('type')
+                    member_ref = _int_id(member.get('ref'))
+                    if member_ref is None:
+                        continue
+                    if member_type == 'way' and member_ref in building_way_ids:
+                        elem.remove(member)
+                    elif member_type == 'relation' and member_ref in building_relation_ids:
+                        elem.remove(member)
+                writer.write_element(elem)
+        if writer is None:
+            raise Exception("Can't filter OSM XML at {}: no <osm> element".format(src_path))
+        writer.close()
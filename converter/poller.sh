@@ -14,6 +14,9 @@ fi
 
 environment="$1"
 worker_name="$2"
+# TOUCH_MAPPER_DAEMON_WORKER=true keeps one process-request.py alive for many requests;
+# it enforces the 10 minute limit per request itself and exits to be recycled.
+daemon_worker="${TOUCH_MAPPER_DAEMON_WORKER:-false}"
 work_dir="$(cd $dirname/../runtime; pwd)/$worker_name"
 
 if [[ ! -d "$work_dir" ]]; then
@@ -27,12 +30,16 @@ cd $dirname
 (
   flock --exclusive --nonblock 200 || exit 1
   echo $$ >&200
-  echo "Starting at $(date --utc --rfc-3339=seconds) as worker $worker_name with environment=$environment"
+  echo "Starting at $(date --utc --rfc-3339=seconds) as worker $worker_name with environment=$environment daemon=$daemon_worker"
 
   # Keep the loop as simple as possible to minimize chance of this process ever exiting
   while true; do
       cd .  # "dist" may have just been replaced due to version update
-      PYTHONUNBUFFERED=true TM_ENVIRONMENT=$environment timeout --kill-after=1s 10m ./process-request.py --poll-time 300 --work-dir "$work_dir" &> "$work_dir/request.log"
+      if [[ "$daemon_worker" == "true" ]]; then
+        PYTHONUNBUFFERED=true TM_ENVIRONMENT=$environment ./process-request.py --daemon --request-timeout 600 --poll-time 300 --work-dir "$work_dir" &> "$work_dir/request.log"
+      else
+        PYTHONUNBUFFERED=true TM_ENVIRONMENT=$environment timeout --kill-after=1s 10m ./process-request.py --poll-time 300 --work-dir "$work_dir" &> "$work_dir/request.log"
+      fi
       exit_code=$?
 
       last_progress_line="$(grep -E 'PROGRESS ' "$work_dir/request.log" | tail -n 1 || true)"
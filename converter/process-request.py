@@ -7,24 +7,36 @@ sys.path.insert(1, script_dir)
 
 import re
 import boto3  # type: ignore[import-not-found]
+from boto3.s3.transfer import TransferConfig  # type: ignore[import-not-found]
 import json
 import argparse
 import urllib.request
+import urllib.parse
 import random
 import subprocess
 import functools
 import time
 import datetime
-import gzip
+import zlib
 import copy
-import io
 import math
 import signal
 import atexit
-import xml.etree.ElementTree as ET
+import shutil
+import threading
+import queue
+import collections
+import multiprocessing
+import concurrent.futures
 from typing import Any, Dict, Optional
 
 import stats_pipeline
+import request_admission
+import osm_xml
+import osm_cache
+import multipart_batch
+import artifact_store
+import fast_json
 
 STORE_AGE = 8640000
 # Use wall-clock timing for stage durations.
@@ -40,11 +52,35 @@ TOP_RAM_STAGE_TO_FIELD = {
 MAX_RSS_KIB_RE = re.compile(r'^\s*Maximum resident set size \(kbytes\):\s*([0-9]+)\s*$')
 MAX_OSM_BYTES_GENERAL = 25 * 1024 * 1024
 MAX_OSM_BYTES_ONLY_BIG_ROADS_BEFORE_PRUNE = 70 * 1024 * 1024
+OSM_FETCH_HEDGE_DELAY_ENV_VAR = 'TOUCH_MAPPER_OSM_HEDGE_DELAY_SECONDS'
+OSM_FETCH_DEFAULT_HEDGE_DELAY_SECONDS = 8.0
+OSM_FETCH_CHUNK_BYTES = 256 * 1024
 STATUS_PROGRESS_SEEN = 20
 STATUS_PROGRESS_CONVERTING = 60
 STATUS_PROGRESS_UPLOADING_PRIMARY = 80
 STATUS_PROGRESS_DONE = 100
 NO_GEOMETRY_ERROR_DESCRIPTION = 'Map would contain no geometry in selected area.'
+DAEMON_DEFAULT_MAX_REQUESTS = 50
+DAEMON_DEFAULT_MAX_RSS_MIB = 768
+DAEMON_DEFAULT_REQUEST_TIMEOUT_SECONDS = 600
+DAEMON_REQUEST_WORK_DIR_NAME = 'request'
+DAEMON_DEFAULT_CONCURRENCY = 1
+DAEMON_DEFAULT_MEMORY_RESERVE_MIB = 256
+SQS_MAX_MESSAGES_PER_RECEIVE = 10
+CONCURRENT_IDLE_WAIT_SECONDS = 20
+CONCURRENT_BUSY_WAIT_SECONDS = 1
+CONCURRENT_KILL_GRACE_SECONDS = 30
+RSS_PREDICTOR_REFRESH_INTERVAL = 10
+REQUEST_TIMEOUT_EXIT_CODE = 124
+OSM_TO_TACTILE_POLL_SECONDS = 0.1
+GZIP_READ_CHUNK_BYTES = 1024 * 1024
+SECONDARY_UPLOAD_WORKERS = 3
+# Synchronous multipart uploads in each worker: memory per upload stays at about one part.
+SECONDARY_UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    use_threads=False
+)
 
 
 def parse_env_bool(name):
@@ -105,6 +141,13 @@ def log_progress(stage, status=None, request_id=None, detail=None):
     print(" ".join(parts))
 
 
+def reset_progress_state():
+    progress_state['status'] = 'starting'
+    progress_state['stage'] = 'bootstrap'
+    progress_state['request_id'] = None
+    progress_state['termination_signal'] = None
+
+
 def log_exit_progress():
     if not INSTRUMENTATION_ENABLED:
         return
@@ -132,6 +175,14 @@ def handle_termination_signal(signum, frame):
     raise SystemExit(128 + signum)
 
 
+def handle_request_timeout_signal(signum, frame):
+    # Daemon mode replaces poller.sh's per-process `timeout 10m` with a per-request alarm.
+    if progress_state.get('termination_signal') is None:
+        progress_state['termination_signal'] = signum
+    log_progress('request-timeout', status='terminated', detail='signal={}'.format(signum))
+    raise SystemExit(REQUEST_TIMEOUT_EXIT_CODE)
+
+
 if INSTRUMENTATION_ENABLED:
     atexit.register(log_exit_progress)
     signal.signal(signal.SIGTERM, handle_termination_signal)
@@ -209,6 +260,14 @@ def stats_root_dir_from_work_dir(work_dir):
     return os.path.join(os.path.dirname(script_dir), 'stats')
 
 
+def osm_cache_dir_from_work_dir(work_dir):
+    return os.path.join(os.path.dirname(stats_root_dir_from_work_dir(work_dir)), 'osm-cache')
+
+
+def multipart_cache_dir_from_work_dir(work_dir):
+    return os.path.join(os.path.dirname(stats_root_dir_from_work_dir(work_dir)), 'multipart-cache')
+
+
 def duration_since(start_time):
     if start_time is None:
         return None
@@ -268,7 +327,21 @@ def do_cmdline():
     parser = argparse.ArgumentParser(description='''Create STL and put into S3 based on a SQS request''')
     parser.add_argument('--poll-time', metavar='SECONDS', type=int, help="poll for a request at most this long")
     parser.add_argument('--work-dir', metavar='PATH', help="write all files into this directory")
+    parser.add_argument('--daemon', action='store_true', help="keep polling and processing requests in one long-lived process")
+    parser.add_argument('--max-requests', metavar='N', type=int, default=DAEMON_DEFAULT_MAX_REQUESTS,
+                        help="daemon mode: exit after handling this many requests, default {}".format(DAEMON_DEFAULT_MAX_REQUESTS))
+    parser.add_argument('--max-rss-mib', metavar='MIB', type=int, default=DAEMON_DEFAULT_MAX_RSS_MIB,
+                        help="daemon mode: exit after a request if own RSS exceeds this, default {}".format(DAEMON_DEFAULT_MAX_RSS_MIB))
+    parser.add_argument('--request-timeout', metavar='SECONDS', type=int, default=DAEMON_DEFAULT_REQUEST_TIMEOUT_SECONDS,
+                        help="daemon mode: hard time limit for processing one request, default {}".format(DAEMON_DEFAULT_REQUEST_TIMEOUT_SECONDS))
+    parser.add_argument('--concurrency', metavar='N', type=int, default=DAEMON_DEFAULT_CONCURRENCY,
+                        help="daemon mode: run up to N requests at once, default {}".format(DAEMON_DEFAULT_CONCURRENCY))
+    parser.add_argument('--memory-reserve-mib', metavar='MIB', type=int, default=DAEMON_DEFAULT_MEMORY_RESERVE_MIB,
+                        help="daemon mode with --concurrency: keep this much RAM unclaimed when admitting requests, default {}".format(DAEMON_DEFAULT_MEMORY_RESERVE_MIB))
     args = parser.parse_args()
+    if args.daemon and not args.work_dir:
+        # Each request gets a directory under it, and the OSM cache sits next to it
+        parser.error("--daemon requires --work-dir")
     return args
 
 
@@ -361,186 +434,11 @@ def ensure_request_target_road_density(request_body):
     request_body['targetRoadDensity'] = density
     return density
 
-def add_or_replace_bounds(osm_data, request_body):
-    if isinstance(osm_data, bytes):
-        osm_text = osm_data.decode('utf8')
-    else:
-        osm_text = str(osm_data)
-    eff_area = request_body['effectiveArea']
-    bounds_line = '  <bounds minlat="{}" minlon="{}" maxlat="{}" maxlon="{}"/>'.format(
-        eff_area['latMin'],
-        eff_area['lonMin'],
-        eff_area['latMax'],
-        eff_area['lonMax']
-    )
-    if re.search(r'<bounds [^>]+/>\s*', osm_text):
-        return re.sub(r'<bounds [^>]+/>\s*', bounds_line + '\n', osm_text, count=1)
-    if re.search(r'<meta [^>]+/>\s*', osm_text):
-        return re.sub(r'(<meta [^>]+/>\s*)', r'\1' + bounds_line + '\n', osm_text, count=1)
-    return re.sub(r'(<osm[^>]*>\s*)', r'\1' + bounds_line + '\n', osm_text, count=1)
-
-def write_osm_with_bounds(osm_data, request_body, osm_path):
-    with open(osm_path, 'wb') as f:
-        f.write(add_or_replace_bounds(osm_data, request_body).encode('utf8'))
-
-def element_tags(elem):
-    tags = {}
-    for child in list(elem):
-        if child.tag != 'tag':
-            continue
-        key = child.get('k')
-        if key is None:
-            continue
-        tags[key] = child.get('v')
-    return tags
-
-def has_building_tags(tags):
-    def is_active_building_value(value):
-        if value is None:
-            return False
-        normalized = str(value).strip().lower()
-        return normalized != '' and normalized != 'no'
-    return (
-        is_active_building_value(tags.get('building')) or
-        is_active_building_value(tags.get('building:part'))
-    )
-
-def parse_osm_tree(osm_path):
-    try:
-        tree = ET.parse(osm_path)
-        return tree
-    except Exception as e:
-        raise Exception("Can't parse OSM XML at {}: {}".format(osm_path, e))
-
-def set_bounds_on_tree(root, request_body):
-    eff_area = request_body['effectiveArea']
-    bounds_attrs = {
-        'minlat': str(eff_area['latMin']),
-        'minlon': str(eff_area['lonMin']),
-        'maxlat': str(eff_area['latMax']),
-        'maxlon': str(eff_area['lonMax']),
-    }
-    for child in list(root):
-        if child.tag == 'bounds':
-            child.attrib = bounds_attrs
-            return
-    bounds_elem = ET.Element('bounds', bounds_attrs)
-    insert_index = 0
-    for i, child in enumerate(list(root)):
-        if child.tag in ('note', 'meta'):
-            insert_index = i + 1
-            continue
-        if child.tag in ('node', 'way', 'relation'):
-            break
-        insert_index = i + 1
-    root.insert(insert_index, bounds_elem)
-
+# Drop buildings from the OSM file in place (see osm_xml.filter_osm_file_for_no_buildings).
 def filter_osm_file_for_no_buildings(osm_path, request_body):
-    tree = parse_osm_tree(osm_path)
-    root = tree.getroot()
-    ways = {}
-    relations = {}
-    for child in list(root):
-        elem_id = child.get('id')
-        if elem_id is None:
-            continue
-        if child.tag == 'way':
-            ways[elem_id] = child
-        elif child.tag == 'relation':
-            relations[elem_id] = child
-
-    building_way_ids = set()
-    building_relation_ids = set()
-    for way_id, way_elem in ways.items():
-        if has_building_tags(element_tags(way_elem)):
-            building_way_ids.add(way_id)
-    for rel_id, rel_elem in relations.items():
-        if has_building_tags(element_tags(rel_elem)):
-            building_relation_ids.add(rel_id)
-
-    pending_building_relations = list(building_relation_ids)
-    seen_building_relations = set()
-    while pending_building_relations:
-        rel_id = pending_building_relations.pop()
-        if rel_id in seen_building_relations:
-            continue
-        seen_building_relations.add(rel_id)
-        rel_elem = relations.get(rel_id)
-        if rel_elem is None:
-            continue
-        for member in rel_elem.findall('member'):
-            member_type = member.get('type')
-            member_ref = member.get('ref')
-            if member_ref is None:
-                continue
-            if member_type == 'way':
-                building_way_ids.add(member_ref)
-            elif member_type == 'relation' and member_ref not in seen_building_relations:
-                building_relation_ids.add(member_ref)
-                pending_building_relations.append(member_ref)
-
-    keep_way_ids = set(ways.keys()) - building_way_ids
-    keep_relation_ids = set(relations.keys()) - building_relation_ids
-
-    keep_node_ids = set()
-    for way_id in keep_way_ids:
-        way_elem = ways.get(way_id)
-        if way_elem is None:
-            continue
-        for nd in way_elem.findall('nd'):
-            ref = nd.get('ref')
-            if ref is not None:
-                keep_node_ids.add(ref)
-
-    for rel_id in keep_relation_ids:
-        rel_elem = relations.get(rel_id)
-        if rel_elem is None:
-            continue
-        for member in rel_elem.findall('member'):
-            member_type = member.get('type')
-            member_ref = member.get('ref')
-            if member_ref is None:
-                continue
-            if member_type == 'node':
-                keep_node_ids.add(member_ref)
-
-    new_root = ET.Element(root.tag, root.attrib)
-    for child in list(root):
-        elem_id = child.get('id')
-        if child.tag in ('note', 'meta'):
-            new_root.append(copy.deepcopy(child))
-            continue
-        if child.tag == 'node':
-            tags = element_tags(child)
-            if has_building_tags(tags):
-                continue
-            if len(tags) == 0 and elem_id not in keep_node_ids:
-                continue
-            new_root.append(copy.deepcopy(child))
-            continue
-        if child.tag == 'way':
-            if elem_id in keep_way_ids:
-                new_root.append(copy.deepcopy(child))
-            continue
-        if child.tag == 'relation' and elem_id in keep_relation_ids:
-            rel_copy = copy.deepcopy(child)
-            for member in list(rel_copy):
-                if member.tag != 'member':
-                    continue
-                member_type = member.get('type')
-                member_ref = member.get('ref')
-                if member_ref is None:
-                    continue
-                if member_type == 'way' and member_ref in building_way_ids:
-                    rel_copy.remove(member)
-                elif member_type == 'relation' and member_ref in building_relation_ids:
-                    rel_copy.remove(member)
-            new_root.append(rel_copy)
-
-    set_bounds_on_tree(new_root, request_body)
-    filtered_tree = ET.ElementTree(new_root)
-    with open(osm_path, 'wb') as f:
-        filtered_tree.write(f, encoding='UTF-8', xml_declaration=True)
+    filtered_path = osm_path + '.no-buildings'
+    osm_xml.filter_osm_file_for_no_buildings(osm_path, filtered_path, request_body['effectiveArea'])
+    os.replace(filtered_path, osm_path)
 
 def run_subprocess_with_max_rss_kib(cmd):
     timed_cmd = list(cmd)
@@ -599,104 +497,369 @@ def prune_osm_file_for_only_big_roads_with_node(osm_path, request_body):
     print("running: " + " ".join(cmd))
     return run_subprocess_with_max_rss_kib(cmd)
 
-def get_osm(request_body, work_dir):
-    # TODO: verify the requested region isn't too large
-    content_mode = ensure_request_content_mode(request_body)
-    ensure_request_target_road_density(request_body)
-    osm_path = '{}/map.osm'.format(work_dir)
+class OsmFetchCancelled(Exception):
+    pass
+
+
+def osm_fetch_hedge_delay_seconds():
+    raw = os.environ.get(OSM_FETCH_HEDGE_DELAY_ENV_VAR)
+    if raw is None:
+        return OSM_FETCH_DEFAULT_HEDGE_DELAY_SECONDS
+    try:
+        value = float(raw)
+    except Exception:
+        return OSM_FETCH_DEFAULT_HEDGE_DELAY_SECONDS
+    if not math.isfinite(value) or value < 0:
+        return OSM_FETCH_DEFAULT_HEDGE_DELAY_SECONDS
+    return value
+
+
+# Run fetch attempts as hedged requests: start the first one right away, and start the next one
+# when the hedge delay passes without a result or when a running attempt fails. The first attempt
+# to complete wins and the rest are cancelled. Attempts with 'hedge': False are only started when
+# nothing else is in flight. Return (winning attempt, per-attempt report list).
+# Attempts that fail or are cancelled remove their own file when they stop, since a slow one
+# may still be writing after the caller has cleaned up.
+def fetch_osm_hedged(attempts, hedge_delay_seconds):
+    results = queue.Queue()
+    cancel_event = threading.Event()
+    fetch_start_time = time_clock()
+    reports = []
+    in_flight = set()
+    next_index = 0
+    last_error_message = None
+
+    def remove_attempt_file(attempt):
+        try:
+            os.remove(attempt['path'])
+        except FileNotFoundError:
+            pass
+
+    def run_attempt(index, attempt):
+        attempt_start_time = time_clock()
+        try:
+            attempt['method'](attempt['url'], attempt['path'], cancel_event)
+        except BaseException as e:
+            remove_attempt_file(attempt)
+            results.put((index, e, duration_since(attempt_start_time)))
+            return
+        if cancel_event.is_set():
+            # Finished after another attempt won
+            remove_attempt_file(attempt)
+        results.put((index, None, duration_since(attempt_start_time)))
+
+    def launch_next():
+        index = next_index
+        attempt = attempts[index]
+        reports.append({
+            'provider': attempt.get('provider'),
+            'endpoint': attempt['url'],
+            'outcome': 'running',
+            'started_after_seconds': duration_since(fetch_start_time),
+            'seconds': None,
+        })
+        thread = threading.Thread(target=run_attempt, args=(index, attempt))
+        thread.daemon = True
+        thread.start()
+        in_flight.add(index)
+        return index + 1
+
+    def can_launch_next(only_when_idle):
+        if next_index >= len(attempts):
+            return False
+        if attempts[next_index].get('hedge', True):
+            return True
+        return not in_flight if only_when_idle else False
+
+    try:
+        while True:
+            if not in_flight and can_launch_next(only_when_idle=True):
+                next_index = launch_next()
+            if not in_flight:
+                raise Exception(last_error_message or "no OSM fetch attempts")
+            try:
+                index, error, seconds = results.get(timeout=hedge_delay_seconds)
+            except queue.Empty:
+                if can_launch_next(only_when_idle=False):
+                    print("OSM fetch still running after {:.1f}s, hedging with next endpoint".format(hedge_delay_seconds))
+                    next_index = launch_next()
+                continue
+            in_flight.discard(index)
+            reports[index]['seconds'] = seconds
+            if error is None:
+                reports[index]['outcome'] = 'won'
+                return attempts[index], reports
+            reports[index]['outcome'] = 'failed'
+            if isinstance(error, RequestProcessingError):
+                raise error
+            last_error_message = "Can't read map data from " + attempts[index]['url'] + ": " + str(error)
+            print(last_error_message)
+            if can_launch_next(only_when_idle=not in_flight):
+                next_index = launch_next()
+    finally:
+        cancel_event.set()
+        for index in in_flight:
+            reports[index]['outcome'] = 'cancelled'
+            reports[index]['seconds'] = duration_since(fetch_start_time) - reports[index]['started_after_seconds']
+
+
+# Fetch OSM data for the request's area into osm_path over the network.
+# Return (winning attempt, per-attempt report list, seconds taken by the winning attempt).
+def fetch_osm_from_network(request_body, osm_path, content_mode):
     eff_area = request_body['effectiveArea']
     bbox = "{},{},{},{}".format( eff_area['lonMin'], eff_area['latMin'], eff_area['lonMax'], eff_area['latMax'] )
+    # Downloads abort as soon as they cross the limit that applies before pruning.
+    if content_mode == 'only-big-roads':
+        max_fetch_bytes = MAX_OSM_BYTES_ONLY_BIG_ROADS_BEFORE_PRUNE
+    else:
+        max_fetch_bytes = MAX_OSM_BYTES_GENERAL
     overpass_map_attempts = [
         { 'url': "http://www.overpass-api.de/api/xapi?map?bbox=" + bbox,
           'provider': 'overpass',
-          'method': lambda url: get_osm_overpass_api(url=url, timeout=20, request_body=request_body, osm_path=osm_path),
+          'method': lambda url, path, cancel_event: get_osm_overpass_api(url=url, timeout=20, request_body=request_body, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
         },
         { 'url': "http://overpass.osm.rambler.ru/cgi/xapi?map?bbox=" + bbox,
           'provider': 'overpass',
-          'method': lambda url: get_osm_overpass_api(url=url, timeout=60, request_body=request_body, osm_path=osm_path),
+          'method': lambda url, path, cancel_event: get_osm_overpass_api(url=url, timeout=60, request_body=request_body, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
         },
         { 'url': "http://www.overpass-api.de/api/xapi?map?bbox=" + bbox,
           'provider': 'overpass',
-          'method': lambda url: get_osm_overpass_api(url=url, timeout=60, request_body=request_body, osm_path=osm_path),
+          'method': lambda url, path, cancel_event: get_osm_overpass_api(url=url, timeout=60, request_body=request_body, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
         },
     ]
-    # All content modes share the same fetch strategy:
-    # randomized Overpass endpoint order first, then OSM main API fallback.
-    attempts = list(overpass_map_attempts)
-    random.shuffle(attempts)
+    for attempt in overpass_map_attempts:
+        attempt['content'] = 'full'
+    random.shuffle(overpass_map_attempts)
+    # Modes that drop content locally first try an Overpass QL query that leaves it out.
+    overpass_ql_attempts = []
+    if overpass_ql_query(content_mode, eff_area, timeout=60) is not None:
+        overpass_ql_attempts = [
+            { 'url': "http://www.overpass-api.de/api/interpreter",
+              'provider': 'overpass_ql',
+              'content': content_mode,
+              'method': lambda url, path, cancel_event: get_osm_overpass_ql(url=url, timeout=60, request_body=request_body, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
+            },
+            { 'url': "http://overpass.osm.rambler.ru/cgi/interpreter",
+              'provider': 'overpass_ql',
+              'content': content_mode,
+              'method': lambda url, path, cancel_event: get_osm_overpass_ql(url=url, timeout=60, request_body=request_body, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
+            },
+        ]
+        random.shuffle(overpass_ql_attempts)
+    # Fetch strategy: mode-specific Overpass QL queries (if any), then full-map Overpass
+    # attempts, each group in randomized endpoint order and all hedged, then OSM main API
+    # fallback once all of them failed.
+    attempts = overpass_ql_attempts + overpass_map_attempts
     attempts.append(
         { 'url': "http://api.openstreetmap.org/api/0.6/map?bbox=" + bbox,
           'provider': 'main_api',
-          'method': lambda url: get_osm_main_api(url=url, timeout=120, osm_path=osm_path),
+          'content': 'full',
+          'hedge': False,
+          'method': lambda url, path, cancel_event: get_osm_main_api(url=url, timeout=120, osm_path=path, cancel_event=cancel_event, max_bytes=max_fetch_bytes),
         }
     )
+    # Parallel attempts write to their own files; the winner is renamed to map.osm. Names are
+    # unique per fetch, so that a cancelled attempt still running when the next daemon request
+    # reuses the work directory can't touch that request's files.
+    fetch_id = '{:08x}'.format(random.getrandbits(32))
     for i, attempt in enumerate(attempts):
+        attempt['path'] = '{}.fetch-{}-{}'.format(osm_path, fetch_id, i)
+
+    try:
+        winner, fetch_reports = fetch_osm_hedged(attempts, osm_fetch_hedge_delay_seconds())
+        os.replace(winner['path'], osm_path)
+    finally:
+        for attempt in attempts:
+            if os.path.exists(attempt['path']):
+                os.remove(attempt['path'])
+    return winner, fetch_reports, fetch_reports[attempts.index(winner)]['seconds']
+
+
+def get_osm(request_body, work_dir, cache=None):
+    # TODO: verify the requested region isn't too large
+    content_mode = ensure_request_content_mode(request_body)
+    ensure_request_target_road_density(request_body)
+    osm_path = '{}/map.osm'.format(work_dir)
+    eff_area = request_body['effectiveArea']
+
+    cache_outcome = None
+    if cache is not None:
+        cache_start_time = time_clock()
         try:
-            fetch_start_time = time_clock()
-            attempt['method'](attempt['url'])
-            fetch_attempt_seconds = duration_since(fetch_start_time)
-            fetched_osm_bytes = os.path.getsize(osm_path)
-            prune_rss_kib = None
-            prune_only_big_roads_seconds = None
-            if content_mode == 'only-big-roads':
-                ensure_osm_size_limit(
-                    actual_bytes=fetched_osm_bytes,
-                    threshold_bytes=MAX_OSM_BYTES_ONLY_BIG_ROADS_BEFORE_PRUNE,
-                    phase_text='before pruning'
-                )
-                prune_start_time = time_clock()
-                prune_rss_kib = prune_osm_file_for_only_big_roads_with_node(osm_path, request_body)
-                prune_only_big_roads_seconds = duration_since(prune_start_time)
-                pruned_osm_bytes = os.path.getsize(osm_path)
-                ensure_osm_size_limit(
-                    actual_bytes=pruned_osm_bytes,
-                    threshold_bytes=MAX_OSM_BYTES_GENERAL,
-                    phase_text='after pruning'
-                )
-            elif content_mode == 'no-buildings':
-                ensure_osm_size_limit(
-                    actual_bytes=fetched_osm_bytes,
-                    threshold_bytes=MAX_OSM_BYTES_GENERAL,
-                    phase_text='before pruning'
-                )
-                filter_osm_file_for_no_buildings(osm_path, request_body)
-                pruned_osm_bytes = os.path.getsize(osm_path)
-            else:
-                ensure_osm_size_limit(
-                    actual_bytes=fetched_osm_bytes,
-                    threshold_bytes=MAX_OSM_BYTES_GENERAL,
-                    phase_text='before pruning'
-                )
-                pruned_osm_bytes = fetched_osm_bytes
-            return (
-                osm_path,
-                fetched_osm_bytes,
-                pruned_osm_bytes,
-                prune_rss_kib,
-                fetch_attempt_seconds,
-                prune_only_big_roads_seconds,
-                attempt.get('provider'),
-                attempt['url']
-            )
+            cache_outcome = cache.serve(eff_area, osm_path, content_mode)
         except Exception as e:
-            if isinstance(e, RequestProcessingError):
-                raise
-            msg = "Can't read map data from " + attempt['url'] + ": " + str(e)
-            if i == len(attempts) - 1:
-                raise Exception(msg)
-            else:
-                print(msg)
+            print("OSM cache: lookup failed: " + str(e))
+            cache_outcome = 'error'
+    if cache_outcome in ('hit', 'superset_hit'):
+        print("OSM data served from local cache ({})".format(cache_outcome))
+        winner = {'provider': 'cache', 'url': None}
+        fetch_reports = []
+        fetch_attempt_seconds = duration_since(cache_start_time)
+    else:
+        winner, fetch_reports, fetch_attempt_seconds = fetch_osm_from_network(request_body, osm_path, content_mode)
+        if cache is not None:
+            try:
+                cache.store(osm_path, eff_area, winner['content'])
+            except Exception as e:
+                print("OSM cache: can't store fetched data: " + str(e))
+
+    fetched_osm_bytes = os.path.getsize(osm_path)
+    prune_rss_kib = None
+    prune_only_big_roads_seconds = None
+    if content_mode == 'only-big-roads':
+        ensure_osm_size_limit(
+            actual_bytes=fetched_osm_bytes,
+            threshold_bytes=MAX_OSM_BYTES_ONLY_BIG_ROADS_BEFORE_PRUNE,
+            phase_text='before pruning'
+        )
+        prune_start_time = time_clock()
+        prune_rss_kib = prune_osm_file_for_only_big_roads_with_node(osm_path, request_body)
+        prune_only_big_roads_seconds = duration_since(prune_start_time)
+        pruned_osm_bytes = os.path.getsize(osm_path)
+        ensure_osm_size_limit(
+            actual_bytes=pruned_osm_bytes,
+            threshold_bytes=MAX_OSM_BYTES_GENERAL,
+            phase_text='after pruning'
+        )
+    elif content_mode == 'no-buildings':
+        ensure_osm_size_limit(
+            actual_bytes=fetched_osm_bytes,
+            threshold_bytes=MAX_OSM_BYTES_GENERAL,
+            phase_text='before pruning'
+        )
+        filter_osm_file_for_no_buildings(osm_path, request_body)
+        pruned_osm_bytes = os.path.getsize(osm_path)
+    else:
+        ensure_osm_size_limit(
+            actual_bytes=fetched_osm_bytes,
+            threshold_bytes=MAX_OSM_BYTES_GENERAL,
+            phase_text='before pruning'
+        )
+        pruned_osm_bytes = fetched_osm_bytes
+    return (
+        osm_path,
+        fetched_osm_bytes,
+        pruned_osm_bytes,
+        prune_rss_kib,
+        fetch_attempt_seconds,
+        prune_only_big_roads_seconds,
+        winner.get('provider'),
+        winner['url'],
+        fetch_reports,
+        cache_outcome
+    )
 
-def get_osm_overpass_api(url, timeout, request_body, osm_path):
+# Multipart batch mode (see converter/multipart_batch.py). Copy a cached union conversion that
+# contains the tile into work_dir. Return a get_osm-like result and the union area, or
+# (None, None) on a miss.
+def get_osm_from_multipart_cache(request_body, work_dir, multipart_cache):
+    start_time = time_clock()
+    osm_path = '{}/map.osm'.format(work_dir)
+    try:
+        union_area = multipart_cache.serve(
+            multipart_batch.set_key(request_body),
+            request_body['effectiveArea'],
+            '{}/map.obj'.format(work_dir),
+            os.path.join(work_dir, multipart_batch.UNION_META_FILE_NAME)
+        )
+    except Exception as e:
+        print("multipart cache: lookup failed: " + str(e))
+        union_area = None
+    if union_area is None:
+        return None, None
+    print("OSM2World output served from multipart cache")
+    osm_result = (osm_path, 0, 0, None, duration_since(start_time), None, 'multipart-cache', None, [], 'multipart_hit')
+    return osm_result, union_area
+
+# Fetch OSM data for the union of a multipart tile and its neighbours. Return the get_osm result
+# and the union area, or (None, None) when the union is over the size limits and the tile
+# should be converted alone.
+def get_multipart_union_osm(request_body, work_dir, cache=None):
+    union_area = multipart_batch.union_area(
+        request_body['effectiveArea'],
+        multipart_batch.radius_tiles()
+    )
+    union_body = dict(request_body, effectiveArea=union_area)
+    try:
+        return get_osm(union_body, work_dir, cache=cache), union_area
+    except RequestProcessingError as e:
+        print("multipart batch: converting the tile alone, union area unusable: " + e.description)
+        return None, None
+
+# Download url straight into osm_path. Abort as soon as the file would grow past max_bytes, or
+# when cancel_event is set. Return the number of bytes written.
+def stream_osm_to_file(url, timeout, osm_path, cancel_event, max_bytes, eff_area=None):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and content_length.isdigit():
+            ensure_osm_size_limit(int(content_length), max_bytes, 'before pruning')
+        with open(osm_path, 'wb') as f:
+            writer = osm_xml.OsmStreamWriter(f, eff_area=eff_area)
+            while True:
+                if cancel_event.is_set():
+                    raise OsmFetchCancelled("cancelled, another endpoint answered first")
+                chunk = response.read(OSM_FETCH_CHUNK_BYTES)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                ensure_osm_size_limit(writer.bytes_written, max_bytes, 'before pruning')
+            writer.close()
+    ensure_osm_size_limit(writer.bytes_written, max_bytes, 'before pruning')
+    if cancel_event.is_set():
+        os.remove(osm_path)
+        raise OsmFetchCancelled("cancelled, another endpoint answered first")
+    return writer.bytes_written
+
+OVERPASS_QL_BUILDING_VALUE_FILTER = '!~"^[[:space:]]*(no)?[[:space:]]*$",i'
+
+# Overpass QL query that downloads only what a content mode can use, or None for modes that
+# need the full map data. Results are supersets of what the local filter/pruner keeps:
+# - no-buildings: everything except ways and relations tagged as buildings, and untagged
+#   nodes only used by them
+# - only-big-roads: highways, railways and water areas with their nodes, water relations
+#   with all their members, and relations that reference those ways
+def overpass_ql_query(content_mode, eff_area, timeout):
+    header = '[out:xml][timeout:{}][bbox:{},{},{},{}];'.format(
+        int(timeout), eff_area['latMin'], eff_area['lonMin'], eff_area['latMax'], eff_area['lonMax']
+    )
+    if content_mode == 'no-buildings':
+        building = '["building"]["building"{0}]'.format(OVERPASS_QL_BUILDING_VALUE_FILTER)
+        building_part = '["building:part"]["building:part"{0}]'.format(OVERPASS_QL_BUILDING_VALUE_FILTER)
+        body = (
+            '(way{0};way{1};)->.building_ways;'
+            '(rel{0};rel{1};)->.building_rels;'
+            '(way; - .building_ways;)->.ways;'
+            '(rel; - .building_rels;)->.rels;'
+            '(node[~"."~"."];.ways;.ways >;.rels;node(r.rels););'
+        ).format(building, building_part)
+    elif content_mode == 'only-big-roads':
+        water_tags = ['["natural"="water"]', '["water"]', '["landuse"="reservoir"]', '["waterway"="riverbank"]']
+        body = (
+            '(way["highway"];way["railway"];{0})->.kept_ways;'
+            '({1})->.water_rels;'
+            'rel(bw.kept_ways)->.way_rels;'
+            '(.kept_ways;.kept_ways >;.water_rels;.water_rels >>;.way_rels;node(r.way_rels););'
+        ).format(
+            ''.join('way' + tag + ';' for tag in water_tags),
+            ''.join('rel' + tag + ';' for tag in water_tags)
+        )
+    else:
+        return None
+    return header + body + 'out meta;'
+
+def get_osm_overpass_ql(url, timeout, request_body, osm_path, cancel_event, max_bytes):
+    query = overpass_ql_query(request_body['contentMode'], request_body['effectiveArea'], timeout)
+    print("getting {} with {} query".format(url, request_body['contentMode']))
+    full_url = url + '?' + urllib.parse.urlencode({'data': query})
+    stream_osm_to_file(full_url, timeout, osm_path, cancel_event, max_bytes, eff_area=request_body['effectiveArea'])
+
+def get_osm_overpass_api(url, timeout, request_body, osm_path, cancel_event, max_bytes):
     print("getting " + url)
-    osm_data = urllib.request.urlopen(url, timeout=timeout).read()
-    write_osm_with_bounds(osm_data, request_body, osm_path)
+    stream_osm_to_file(url, timeout, osm_path, cancel_event, max_bytes, eff_area=request_body['effectiveArea'])
 
-def get_osm_main_api(url, timeout, osm_path):
+def get_osm_main_api(url, timeout, osm_path, cancel_event, max_bytes):
     print("getting " + url)
-    osm_data = urllib.request.urlopen(url, timeout=timeout).read()
-    with open(osm_path, 'wb') as f:
-        f.write(osm_data)
+    stream_osm_to_file(url, timeout, osm_path, cancel_event, max_bytes)
 
 def read_osm_to_tactile_rss_kib(output_dir):
     fields = {}  # type: Dict[str, Optional[int]]
@@ -747,12 +910,16 @@ def has_empty_clip_report(output_dir):
             return False
     return True
 
-def run_osm_to_tactile(osm_path, request_body):
+# Start osm-to-tactile.py for osm_path. Returns a handle for wait_for_osm_to_tactile_meta,
+# finish_osm_to_tactile and kill_osm_to_tactile.
+def start_osm_to_tactile(osm_path, request_body, multipart_union_area=None, multipart_reuse=False):
     output_dir = os.path.dirname(osm_path)
     clip_report_path = os.path.join(output_dir, 'map-clip-report.json')
+    meta_ready_path = os.path.join(output_dir, 'map-meta-raw.ready')
     try:
-        if os.path.exists(clip_report_path):
-            os.remove(clip_report_path)
+        for stale_path in (clip_report_path, meta_ready_path):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
         stl_path = output_dir + '/map.stl'
         if os.path.exists(stl_path):
             os.rename(stl_path, stl_path + ".old")
@@ -765,9 +932,43 @@ def run_osm_to_tactile(osm_path, request_body):
             marker1y = (request_body['marker1']['lat'] - eff_area['latMin']) / (eff_area['latMax'] - eff_area['latMin'])
             if 0.04 < marker1x < 0.96 and 0.04 < marker1y < 0.96:
                 args.extend([ '--marker1', json.dumps({ 'x': marker1x, 'y': marker1y }) ])
+        if multipart_union_area is not None:
+            args.extend([
+                '--union-area', json.dumps(multipart_union_area),
+                '--tile-area', json.dumps(request_body['effectiveArea']),
+            ])
+            if multipart_reuse:
+                args.append('--reuse-union')
+        args.extend(['--meta-ready-file', meta_ready_path])
         cmd = ['./osm-to-tactile.py'] + args + [osm_path]
         print("running: " + " ".join(cmd))
-        subprocess.check_call(cmd)
+        process = subprocess.Popen(cmd)
+    except Exception as e:
+        raise Exception("Can't convert map data to STL: " + str(e))
+    return {
+        'process': process,
+        'cmd': cmd,
+        'osm_path': osm_path,
+        'meta_ready_path': meta_ready_path,
+    }
+
+# Block until osm-to-tactile.py reports map-meta-raw.json final. Return False if it exited
+# without doing so.
+def wait_for_osm_to_tactile_meta(osm_to_tactile):
+    while not os.path.exists(osm_to_tactile['meta_ready_path']):
+        if osm_to_tactile['process'].poll() is not None:
+            return os.path.exists(osm_to_tactile['meta_ready_path'])
+        time.sleep(OSM_TO_TACTILE_POLL_SECONDS)
+    return True
+
+# Wait for osm-to-tactile.py to exit and return (artifact paths, raw meta, stage RSS fields).
+def finish_osm_to_tactile(osm_to_tactile):
+    osm_path = osm_to_tactile['osm_path']
+    output_dir = os.path.dirname(osm_path)
+    try:
+        returncode = osm_to_tactile['process'].wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, osm_to_tactile['cmd'])
         artifact_paths = {
             'stl_path': os.path.join(output_dir, 'map.stl'),
             'stl_ways_path': os.path.join(output_dir, 'map-ways.stl'),
@@ -776,8 +977,7 @@ def run_osm_to_tactile(osm_path, request_body):
             'blend_path': os.path.join(output_dir, 'map.blend'),
             'meta_raw_path': os.path.join(output_dir, 'map-meta-raw.json'),
         }
-        with open(artifact_paths['meta_raw_path'], 'r') as f:
-            meta = json.load(f)
+        meta = fast_json.load_file(artifact_paths['meta_raw_path'])
 
         rss_kib = read_osm_to_tactile_rss_kib(os.path.dirname(osm_path))
         return artifact_paths, meta, rss_kib
@@ -786,31 +986,64 @@ def run_osm_to_tactile(osm_path, request_body):
             raise RequestProcessingError(code='unknown', description=NO_GEOMETRY_ERROR_DESCRIPTION)
         raise Exception("Can't convert map data to STL: " + str(e)) # let's not reveal too much, error msg likely contains paths
 
+# Kill osm-to-tactile.py if it is still running, together with the OSM2World, clip-2d or
+# Blender process it is waiting for.
+def kill_osm_to_tactile(osm_to_tactile):
+    process = osm_to_tactile['process']
+    if process.poll() is not None:
+        return
+    for pid in [process.pid] + request_admission.descendant_pids(process.pid):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    process.wait()
+
+def resolve_sqs_queue(queue_name):
+    sqs = boto3.resource('sqs')
+    return sqs.get_queue_by_name(QueueName = queue_name)
+
+def delete_and_parse_sqs_msg(queue, message):
+    print(message.body)
+
+    # Delete message immediately so we won't start looping on it if processing fails
+    response = queue.delete_messages(Entries=[{
+        'Id': 'dummy',
+        'ReceiptHandle': message.receipt_handle,
+    }]) # ignore errors
+
+    # Parse
+    request = json.loads(message.body)
+    # TODO: validate request -- its contents are untrusted
+    return request
+
 # Receive a message from SQS and delete it. Poll up to "poll_time" seconds. Return parsed request, or None if no msg received.
-def receive_sqs_msg(queue_name, poll_time):
+def receive_sqs_msg(queue_name, poll_time, queue=None):
     end = time_clock() + poll_time
-    sqs = boto3.resource('sqs')
-    queue = sqs.get_queue_by_name(QueueName = queue_name)
+    if queue is None:
+        queue = resolve_sqs_queue(queue_name)
     while end - time_clock() > 20:
         messages = queue.receive_messages(
             WaitTimeSeconds = 20
         )
         if len(messages) > 0:
-            message = messages[0]
-            print(message.body)
-
-            # Delete message immediately so we won't start looping on it if processing fails
-            response = queue.delete_messages(Entries=[{
-                'Id': 'dummy',
-                'ReceiptHandle': message.receipt_handle,
-            }]) # ignore errors
-
-            # Parse
-            request = json.loads(message.body)
-            # TODO: validate request -- its contents are untrusted
-            return request
+            return delete_and_parse_sqs_msg(queue, messages[0])
     return None
 
+# Receive up to "max_messages" messages in one SQS call and delete them. Return parsed requests.
+def receive_sqs_msgs(queue, max_messages, wait_seconds):
+    messages = queue.receive_messages(
+        MaxNumberOfMessages = max(1, min(SQS_MAX_MESSAGES_PER_RECEIVE, max_messages)),
+        WaitTimeSeconds = wait_seconds
+    )
+    requests = []
+    for message in messages:
+        try:
+            requests.append(delete_and_parse_sqs_msg(queue, message))
+        except Exception as e:
+            print("can't parse SQS message: " + str(e))
+    return requests
+
 def svg_to_pdf(svg_path, pdf_path):
     try:
         # Run conversion in a short-lived subprocess so Cairo/Pango allocations
@@ -827,24 +1060,67 @@ def svg_to_pdf(svg_path, pdf_path):
         raise Exception("Can't convert SVG to PDF: " + str(e))
 
 
-def gzip_file_to_bytes(path, compresslevel=5, rss_tracker=None):
-    out = io.BytesIO()
-    with open(path, 'rb') as src:
-        with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compresslevel) as gz:
-            while True:
-                chunk = src.read(1024 * 1024)
-                if not chunk:
-                    break
-                gz.write(chunk)
-                if rss_tracker is not None:
-                    rss_tracker()
-    if rss_tracker is not None:
-        rss_tracker()
-    return out.getvalue()
+# Readable file object returning the gzip compression of the file at path, compressed
+# incrementally as it is read. read(size) returns exactly size bytes until the end, as
+# multipart uploads expect full-size parts.
+class GzipFileReader(object):
+    def __init__(self, path, compresslevel=5, rss_tracker=None):
+        self._src = open(path, 'rb')
+        self._compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._eof = False
+        self._rss_tracker = rss_tracker
+
+    def _fill(self, size):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._src.read(GZIP_READ_CHUNK_BYTES)
+            if chunk:
+                self._buffer += self._compressor.compress(chunk)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+            if self._rss_tracker is not None:
+                self._rss_tracker()
+
+    def read(self, size=-1):
+        if size is None:
+            size = -1
+        self._fill(size)
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            del self._buffer[:]
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._src.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Gzip the file at path into S3 without holding the whole compressed file in memory.
+def upload_gzipped_file(bucket, key, path, content_type, common_args, rss_tracker=None):
+    extra_args = dict(common_args)
+    extra_args['ContentType'] = content_type
+    with GzipFileReader(path, compresslevel=5, rss_tracker=rss_tracker) as body:
+        bucket.meta.client.upload_fileobj(
+            body, bucket.name, key,
+            ExtraArgs=extra_args,
+            Config=SECONDARY_UPLOAD_TRANSFER_CONFIG
+        )
 
 
 def upload_primary_assets(bucket, json_object_name, info, name_base,
-                          map_object_name, map_content, stl_path, common_args,
+                          map_object_name, compressed, common_args,
                           rss_tracker=None,
                           progress_logger=None):
     # Put the augmented request to S3
@@ -863,12 +1139,13 @@ def upload_primary_assets(bucket, json_object_name, info, name_base,
     map_content_key = name_base + '.map-content.json'
     if progress_logger is not None:
         progress_logger('upload-primary-map-content-start', detail='key={}'.format(map_content_key))
-    bucket.put_object(
-        Key=map_content_key,
-        Body=gzip.compress(map_content, compresslevel=5),
-        **common_args,
-        ContentType='application/json'
-    )
+    with compressed.get('map-content').open_gzip() as body:
+        bucket.put_object(
+            Key=map_content_key,
+            Body=body,
+            **common_args,
+            ContentType='application/json'
+        )
     if rss_tracker is not None:
         rss_tracker()
     if progress_logger is not None:
@@ -877,26 +1154,39 @@ def upload_primary_assets(bucket, json_object_name, info, name_base,
     # Put full STL file to S3. Completion of this upload makes UI consider the STL creation complete.
     if progress_logger is not None:
         progress_logger('upload-primary-stl-start', detail='key={}'.format(map_object_name))
-    bucket.put_object(
-        Key=map_object_name,
-        Body=gzip_file_to_bytes(stl_path, compresslevel=5, rss_tracker=rss_tracker),
-        **common_args,
-        ContentType='application/sla'
-    )
+    with compressed.get('stl').open_gzip() as body:
+        bucket.put_object(
+            Key=map_object_name,
+            Body=body,
+            **common_args,
+            ContentType='application/sla'
+        )
     if rss_tracker is not None:
         rss_tracker()
     if progress_logger is not None:
         progress_logger('upload-primary-stl-done', detail='key={}'.format(map_object_name))
 
+
+# Wait for compression of the primary artifacts and copy their sizes and compression times into ctx.
+def record_compression_stats(ctx, compressed):
+    stl = compressed.get('stl')
+    ctx['stl_gzip_bytes'] = stl.gzip_bytes
+    ctx['timing_gzip_stl_seconds'] = stl.compress_seconds
+    map_content = compressed.get('map-content')
+    ctx['map_content_bytes'] = map_content.raw_bytes
+    ctx['map_content_gzip_bytes'] = map_content.gzip_bytes
+    ctx['timing_gzip_map_content_seconds'] = map_content.compress_seconds
+
+
 def attach_request_metadata_to_map_content(map_content, request_body):
     try:
-        map_content_json = json.loads(map_content.decode('utf8'))
+        map_content_json = fast_json.loads(map_content)
     except Exception as e:
         raise Exception("Can't parse map-content.json: " + str(e))
     map_content_json['metadata'] = {
         'requestBody': copy.deepcopy(request_body)
     }
-    return json.dumps(map_content_json, ensure_ascii=False, separators=(',', ':')).encode('utf8')
+    return fast_json.dumps(map_content_json)
 
 
 def build_info_payload(request_body, meta, status_payload=None):
@@ -911,17 +1201,15 @@ def build_info_payload(request_body, meta, status_payload=None):
     return info
 
 
-def upload_secondary_assets(bucket, name_base, svg_path, pdf_path, stl_ways_path, stl_rest_path, blend_path, common_args, rss_tracker=None, progress_logger=None):
+# Upload SVG, split STLs, .blend and PDF. SVG and STL uploads start right away on a small
+# thread pool; make_pdf() runs in the calling thread meanwhile and the PDF is queued once it
+# returns. A failed upload is logged and does not fail the request.
+def upload_secondary_assets(bucket, name_base, svg_path, pdf_path, stl_ways_path, stl_rest_path, blend_path, common_args, make_pdf, rss_tracker=None, progress_logger=None):
     def upload_blob_from_path(key, path, content_type):
         try:
             if progress_logger is not None:
                 progress_logger('upload-secondary-item-start', detail='key={}'.format(key))
-            bucket.put_object(
-                Key=key,
-                Body=gzip_file_to_bytes(path, compresslevel=5, rss_tracker=rss_tracker),
-                **common_args,
-                ContentType=content_type
-            )
+            upload_gzipped_file(bucket, key, path, content_type, common_args, rss_tracker=rss_tracker)
             if rss_tracker is not None:
                 rss_tracker()
             if progress_logger is not None:
@@ -933,20 +1221,37 @@ def upload_secondary_assets(bucket, name_base, svg_path, pdf_path, stl_ways_path
 
     uploads = [
         (name_base + '.svg', svg_path, 'image/svg+xml'),
-        (name_base + '.pdf', pdf_path, 'application/pdf'),
         (name_base + '-ways.stl', stl_ways_path, 'application/sla'),
         (name_base + '-rest.stl', stl_rest_path, 'application/sla'),
         (name_base + '.blend', blend_path, 'application/binary')
     ]
 
-    # Upload sequentially to avoid keeping multiple large gzip blobs in memory at once.
-    for key, path, content_type in uploads:
-        upload_blob_from_path(key, path, content_type)
+    # Leaving the with block waits for started uploads, also when make_pdf() raises.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=SECONDARY_UPLOAD_WORKERS) as executor:
+        futures = [
+            executor.submit(upload_blob_from_path, key, path, content_type)
+            for key, path, content_type in uploads
+        ]
+        make_pdf()
+        futures.append(executor.submit(upload_blob_from_path, name_base + '.pdf', pdf_path, 'application/pdf'))
+        concurrent.futures.wait(futures)
 
 def run_map_desc(raw_meta_path, profile=None):
     import map_desc
     map_desc.run_map_desc(raw_meta_path, profile=profile)
 
+# Enrich map-meta.json and write map-content.json. Return (start, end) times of the stage.
+def run_map_desc_stage(ctx, raw_meta_path):
+    ctx['current_stage'] = 'map-desc'
+    map_desc_start_time = time_clock()
+    log_progress('map-desc-start')
+    run_map_desc(raw_meta_path, profile={})
+    map_desc_end_time = time_clock()
+    ctx['timing_map_desc_seconds'] = map_desc_end_time - map_desc_start_time
+    log_progress('map-desc-done')
+    track_process_rss_kib(ctx)
+    return map_desc_start_time, map_desc_end_time
+
 
 def init_main_context():
     return {
@@ -955,6 +1260,7 @@ def init_main_context():
         'map_bucket_name': None,
         'stats_bucket_name': None,
         'queue_name': None,
+        'sqs_queue': None,
         'map_object_name': None,
         'info_object_name': None,
         'map_content_key': None,
@@ -963,6 +1269,7 @@ def init_main_context():
         'request_id': None,
         'map_id': None,
         'args': None,
+        'request_work_dir': None,
         'stats_root_dir': None,
         'environment': None,
         'worker_name': 'unknown',
@@ -982,12 +1289,22 @@ def init_main_context():
         'timing_get_osm_seconds': None,
         'timing_prune_only_big_roads_seconds': None,
         'timing_map_desc_seconds': None,
+        'timing_osm_to_tactile_seconds': None,
+        'timing_map_desc_overlap_seconds': None,
         'timing_upload_primary_seconds': None,
         'timing_svg_to_pdf_seconds': None,
+        'timing_upload_secondary_seconds': None,
+        'timing_gzip_stl_seconds': None,
+        'timing_gzip_map_content_seconds': None,
         'osm_fetch_provider': None,
         'osm_fetch_endpoint': None,
+        'osm_fetch_attempts': None,
+        'osm_cache_outcome': None,
+        'osm_cache_hits': None,
+        'osm_cache_misses': None,
         'stl_bytes': None,
         'stl_gzip_bytes': None,
+        'map_content_bytes': None,
         'map_content_gzip_bytes': None,
         'osm_fetched_bytes': None,
         'osm_pruned_bytes': None,
@@ -998,6 +1315,8 @@ def init_main_context():
         'rss_svg_to_pdf_kib': None,
         'rss_process_request_last_kib': None,
         'rss_process_request_peak_kib': None,
+        'rss_predicted_peak_kib': None,
+        'timing_admission_wait_seconds': None,
     }
 
 
@@ -1022,20 +1341,60 @@ def init_stats_services(ctx):
         return
     try:
         ctx['stats_s3'] = boto3.resource('s3')
-        if not STATS_QUICKTIME_MODE:
-            try:
-                stats_pipeline.run_daily_upload_if_due(
-                    stats_root_dir=ctx['stats_root_dir'],
-                    s3_resource=ctx['stats_s3'],
-                    stats_bucket_name=ctx['stats_bucket_name']
-                )
-            except Exception as e:
-                print("stats daily upload failed: " + str(e))
+        run_stats_maintenance(ctx)
     except Exception as e:
         print("stats init failed: " + str(e))
         ctx['stats_s3'] = None
 
 
+def run_stats_maintenance(ctx):
+    if not STATS_ENABLED or STATS_QUICKTIME_MODE or ctx['stats_s3'] is None:
+        return
+    try:
+        stats_pipeline.run_daily_upload_if_due(
+            stats_root_dir=ctx['stats_root_dir'],
+            s3_resource=ctx['stats_s3'],
+            stats_bucket_name=ctx['stats_bucket_name']
+        )
+    except Exception as e:
+        print("stats daily upload failed: " + str(e))
+
+
+# Fields that are resolved once per process and shared by every request a daemon handles.
+WORKER_SHARED_CONTEXT_KEYS = (
+    's3',
+    'stats_s3',
+    'map_bucket_name',
+    'stats_bucket_name',
+    'queue_name',
+    'sqs_queue',
+    'args',
+    'stats_root_dir',
+    'environment',
+    'worker_name',
+    'code_version_fields',
+    'progress_logger',
+)
+
+
+def init_request_context(worker_ctx):
+    ctx = init_main_context()
+    for key in WORKER_SHARED_CONTEXT_KEYS:
+        ctx[key] = worker_ctx[key]
+    ctx['main_start_time'] = time_clock()
+    ctx['status'] = 'running'
+    return ctx
+
+
+def prepare_request_work_dir(base_dir, name):
+    # Give each daemon request an empty directory so artifacts of the previous map can't leak in.
+    path = os.path.join(base_dir, name)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    return path
+
+
 def handle_main_exception(ctx, e):
     ctx['failure_exception'] = e
     ctx['failure_stage'] = ctx['current_stage']
@@ -1106,15 +1465,25 @@ def build_stats_record(ctx):
         'advanced_mode': interpreted_request_bool(request_body, 'advancedMode', False),
         'osm_fetch_provider': ctx['osm_fetch_provider'],
         'osm_fetch_endpoint': ctx['osm_fetch_endpoint'],
+        'osm_fetch_attempts': ctx['osm_fetch_attempts'],
+        'osm_cache_outcome': ctx['osm_cache_outcome'],
+        'osm_cache_hits': ctx['osm_cache_hits'],
+        'osm_cache_misses': ctx['osm_cache_misses'],
         'timing_get_osm_seconds': ctx['timing_get_osm_seconds'],
         'timing_prune_only_big_roads_seconds': ctx['timing_prune_only_big_roads_seconds'],
         'timing_map_desc_seconds': ctx['timing_map_desc_seconds'],
+        'timing_osm_to_tactile_seconds': ctx['timing_osm_to_tactile_seconds'],
+        'timing_map_desc_overlap_seconds': ctx['timing_map_desc_overlap_seconds'],
         'timing_upload_primary_seconds': ctx['timing_upload_primary_seconds'],
         'timing_svg_to_pdf_seconds': ctx['timing_svg_to_pdf_seconds'],
+        'timing_upload_secondary_seconds': ctx['timing_upload_secondary_seconds'],
+        'timing_gzip_stl_seconds': ctx['timing_gzip_stl_seconds'],
+        'timing_gzip_map_content_seconds': ctx['timing_gzip_map_content_seconds'],
         'timing_total_seconds': total_elapsed,
         'timing_failed_after_seconds': (total_elapsed if ctx['status'] == 'failed' else None),
         'stl_bytes': ctx['stl_bytes'],
         'stl_gzip_bytes': ctx['stl_gzip_bytes'],
+        'map_content_bytes': ctx['map_content_bytes'],
         'map_content_gzip_bytes': ctx['map_content_gzip_bytes'],
         'osm_fetched_bytes': ctx['osm_fetched_bytes'],
         'osm_pruned_bytes': ctx['osm_pruned_bytes'],
@@ -1124,6 +1493,8 @@ def build_stats_record(ctx):
         'rss_prune_only_big_roads_kib': ctx['rss_prune_only_big_roads_kib'],
         'rss_svg_to_pdf_kib': ctx['rss_svg_to_pdf_kib'],
         'rss_process_request_peak_kib': ctx['rss_process_request_peak_kib'],
+        'rss_predicted_peak_kib': ctx['rss_predicted_peak_kib'],
+        'timing_admission_wait_seconds': ctx['timing_admission_wait_seconds'],
     }
 
 
@@ -1163,162 +1534,233 @@ def rethrow_failure_if_needed(ctx):
     sys.exit(1)
 
 
-def main():
-    # TODO: if output S3 object already exists, exit immediately
-    ctx = init_main_context()
+# Run one request's stages; failures are recorded in ctx and the stats record instead of raised.
+def run_request_with_failure_handling(ctx, request_fn):
     try:
-        bootstrap_runtime(ctx)
-        track_process_rss_kib(ctx)
-        init_stats_services(ctx)
+        request_fn(ctx)
+    except BaseException as e:
         track_process_rss_kib(ctx)
+        handle_main_exception(ctx, e)
+    finally:
+        if ctx['args'] is not None and ctx['args'].daemon:
+            signal.alarm(0)
+        write_final_stats_if_possible(ctx)
 
-        # Receive SQS msg
-        ctx['current_stage'] = 'poll'
-        log_progress('poll-start')
-        print("\n\n============= STARTING TO POLL AT %s ===========" % (datetime.datetime.now().isoformat()))
-        ctx['request_body'] = receive_sqs_msg(ctx['queue_name'], ctx['args'].poll_time)
-        if ctx['request_body'] == None:
-            log_progress('poll-empty', status='idle')
-            ctx['status'] = 'idle'
-            return
-        ctx['request_body']['contentMode'] = normalize_content_mode(ctx['request_body'].get('contentMode'))
-        ctx['request_body']['targetRoadDensity'] = normalize_target_road_density_ui(
-            ctx['request_body'].get('targetRoadDensity')
-        )
-        ctx['request_id'] = ctx['request_body'].get('requestId')
-        ctx['map_id'] = stats_pipeline.map_id_from_request_id(ctx['request_id'])
-        ctx['processing_start_time'] = time_clock()
-        log_progress('poll-returned', request_id=ctx['request_id'])
-        print("Poll returned at %s" % (datetime.datetime.now().isoformat()))
-        track_process_rss_kib(ctx)
 
-        # Get OSM data
-        ctx['current_stage'] = 'get-osm'
-        log_progress('get-osm-start')
-        ctx['s3'] = ctx['stats_s3'] if ctx['stats_s3'] is not None else boto3.resource('s3')
-        ctx['map_object_name'] = 'map/data/' + ctx['request_body']['requestId'] + '.stl'
-        ctx['info_object_name'] = map_info_object_name_from_request_id(ctx['request_body']['requestId'])
-        ctx['name_base'] = ctx['map_object_name'][:-4]
-        bucket = ctx['s3'].Bucket(ctx['map_bucket_name'])
-        write_status_info_json(ctx, STATUS_PROGRESS_SEEN)
-        osm_result = get_osm(ctx['request_body'], ctx['args'].work_dir)
-        if osm_result is None:
-            raise Exception("OSM path not available")
-        (
-            osm_path,
-            fetched_osm_bytes,
-            pruned_osm_bytes,
-            prune_rss_kib,
-            fetch_attempt_seconds,
-            prune_only_big_roads_seconds,
-            osm_fetch_provider,
-            osm_fetch_endpoint
-        ) = osm_result
-        ctx['osm_fetched_bytes'] = fetched_osm_bytes
-        ctx['osm_pruned_bytes'] = pruned_osm_bytes
-        ctx['rss_prune_only_big_roads_kib'] = prune_rss_kib
-        ctx['timing_get_osm_seconds'] = fetch_attempt_seconds
-        ctx['timing_prune_only_big_roads_seconds'] = prune_only_big_roads_seconds
-        ctx['osm_fetch_provider'] = osm_fetch_provider
-        ctx['osm_fetch_endpoint'] = osm_fetch_endpoint
-        log_progress('get-osm-done')
-        track_process_rss_kib(ctx)
+def poll_and_process_request(ctx):
+    # Receive SQS msg
+    ctx['current_stage'] = 'poll'
+    log_progress('poll-start')
+    print("\n\n============= STARTING TO POLL AT %s ===========" % (datetime.datetime.now().isoformat()))
+    ctx['request_body'] = receive_sqs_msg(ctx['queue_name'], ctx['args'].poll_time, queue=ctx['sqs_queue'])
+    if ctx['request_body'] == None:
+        log_progress('poll-empty', status='idle')
+        ctx['status'] = 'idle'
+        return
+    process_request_body(ctx)
 
-        # Convert OSM => STL
-        ctx['current_stage'] = 'osm-to-tactile'
-        log_progress('osm-to-tactile-start')
-        write_status_info_json(ctx, STATUS_PROGRESS_CONVERTING)
-        artifacts, meta, rss_kib = run_osm_to_tactile(osm_path, ctx['request_body'])
-        ctx['rss_osm2world_kib'] = rss_kib.get('rss_osm2world_kib')
-        ctx['rss_blender_kib'] = rss_kib.get('rss_blender_kib')
-        ctx['rss_clip_2d_kib'] = rss_kib.get('rss_clip_2d_kib')
-        ctx['stl_bytes'] = os.path.getsize(artifacts['stl_path'])
-        log_progress('osm-to-tactile-done')
-        track_process_rss_kib(ctx)
-        raw_meta_path = artifacts['meta_raw_path']
-
-        # Enrich map-meta.json
-        ctx['current_stage'] = 'map-desc'
-        map_desc_start_time = time_clock()
-        log_progress('map-desc-start')
-        run_map_desc(raw_meta_path, profile={})
-        ctx['timing_map_desc_seconds'] = duration_since(map_desc_start_time)
-        log_progress('map-desc-done')
-        track_process_rss_kib(ctx)
 
-        ctx['current_stage'] = 'map-content-read'
-        map_content_path = os.path.join(os.path.dirname(osm_path), 'map-content.json')
-        log_progress('map-content-read-start', detail='path={}'.format(map_content_path))
-        with open(map_content_path, 'rb') as f:
-            map_content = f.read()
-        map_content = attach_request_metadata_to_map_content(map_content, ctx['request_body'])
-        ctx['map_content_gzip_bytes'] = len(gzip.compress(map_content, compresslevel=5))
-        log_progress('map-content-read-done')
-        track_process_rss_kib(ctx)
+# Convert and upload the map for ctx['request_body'].
+def process_request_body(ctx):
+    ctx['request_body']['contentMode'] = normalize_content_mode(ctx['request_body'].get('contentMode'))
+    ctx['request_body']['targetRoadDensity'] = normalize_target_road_density_ui(
+        ctx['request_body'].get('targetRoadDensity')
+    )
+    ctx['request_id'] = ctx['request_body'].get('requestId')
+    ctx['map_id'] = stats_pipeline.map_id_from_request_id(ctx['request_id'])
+    ctx['processing_start_time'] = time_clock()
+    if ctx['args'].daemon:
+        signal.alarm(ctx['args'].request_timeout)
+    log_progress('poll-returned', request_id=ctx['request_id'])
+    print("Poll returned at %s" % (datetime.datetime.now().isoformat()))
+    track_process_rss_kib(ctx)
+
+    # Get OSM data
+    ctx['current_stage'] = 'get-osm'
+    log_progress('get-osm-start')
+    if ctx['s3'] is None:
+        ctx['s3'] = ctx['stats_s3'] if ctx['stats_s3'] is not None else boto3.resource('s3')
+    ctx['map_object_name'] = 'map/data/' + ctx['request_body']['requestId'] + '.stl'
+    ctx['info_object_name'] = map_info_object_name_from_request_id(ctx['request_body']['requestId'])
+    ctx['name_base'] = ctx['map_object_name'][:-4]
+    bucket = ctx['s3'].Bucket(ctx['map_bucket_name'])
+    write_status_info_json(ctx, STATUS_PROGRESS_SEEN)
+    cache = osm_cache.OsmCache.from_env(osm_cache_dir_from_work_dir(ctx['args'].work_dir))
+    multipart_cache = None
+    if multipart_batch.applies_to(ctx['request_body']):
+        multipart_cache = multipart_batch.MultipartCache.from_env(
+            multipart_cache_dir_from_work_dir(ctx['args'].work_dir))
+    osm_result = None
+    multipart_union_area = None
+    multipart_reuse = False
+    if multipart_cache is not None:
+        osm_result, multipart_union_area = get_osm_from_multipart_cache(
+            ctx['request_body'], ctx['request_work_dir'], multipart_cache)
+        multipart_reuse = osm_result is not None
+        if osm_result is None:
+            osm_result, multipart_union_area = get_multipart_union_osm(
+                ctx['request_body'], ctx['request_work_dir'], cache=cache)
+    if osm_result is None:
+        osm_result = get_osm(ctx['request_body'], ctx['request_work_dir'], cache=cache)
+    if osm_result is None:
+        raise Exception("OSM path not available")
+    (
+        osm_path,
+        fetched_osm_bytes,
+        pruned_osm_bytes,
+        prune_rss_kib,
+        fetch_attempt_seconds,
+        prune_only_big_roads_seconds,
+        osm_fetch_provider,
+        osm_fetch_endpoint,
+        osm_fetch_attempts,
+        osm_cache_outcome
+    ) = osm_result
+    ctx['osm_fetched_bytes'] = fetched_osm_bytes
+    ctx['osm_pruned_bytes'] = pruned_osm_bytes
+    ctx['rss_prune_only_big_roads_kib'] = prune_rss_kib
+    ctx['timing_get_osm_seconds'] = fetch_attempt_seconds
+    ctx['timing_prune_only_big_roads_seconds'] = prune_only_big_roads_seconds
+    ctx['osm_fetch_provider'] = osm_fetch_provider
+    ctx['osm_fetch_endpoint'] = osm_fetch_endpoint
+    ctx['osm_fetch_attempts'] = osm_fetch_attempts
+    ctx['osm_cache_outcome'] = osm_cache_outcome
+    if cache is not None:
+        try:
+            ctx['osm_cache_hits'], ctx['osm_cache_misses'] = cache.counters()
+        except Exception as e:
+            print("OSM cache: can't read counters: " + str(e))
+    log_progress('get-osm-done')
+    track_process_rss_kib(ctx)
+
+    # Convert OSM => STL. map_desc only needs map-meta-raw.json, so it runs in this process
+    # while clip-2d and Blender still work in the osm-to-tactile.py process.
+    ctx['current_stage'] = 'osm-to-tactile'
+    log_progress('osm-to-tactile-start')
+    write_status_info_json(ctx, STATUS_PROGRESS_CONVERTING)
+    osm_to_tactile_start_time = time_clock()
+    osm_to_tactile = start_osm_to_tactile(
+        osm_path, ctx['request_body'], multipart_union_area=multipart_union_area, multipart_reuse=multipart_reuse)
+    raw_meta_path = os.path.join(os.path.dirname(osm_path), 'map-meta-raw.json')
+    map_desc_times = None
+    try:
+        if wait_for_osm_to_tactile_meta(osm_to_tactile):
+            try:
+                map_desc_times = run_map_desc_stage(ctx, raw_meta_path)
+            except Exception:
+                # A failing osm-to-tactile.py is reported first, like in sequential runs.
+                ctx['current_stage'] = 'osm-to-tactile'
+                finish_osm_to_tactile(osm_to_tactile)
+                raise
+            ctx['current_stage'] = 'osm-to-tactile'
+        artifacts, meta, rss_kib = finish_osm_to_tactile(osm_to_tactile)
+    finally:
+        kill_osm_to_tactile(osm_to_tactile)
+    osm_to_tactile_end_time = time_clock()
+    ctx['timing_osm_to_tactile_seconds'] = osm_to_tactile_end_time - osm_to_tactile_start_time
+    ctx['rss_osm2world_kib'] = rss_kib.get('rss_osm2world_kib')
+    ctx['rss_blender_kib'] = rss_kib.get('rss_blender_kib')
+    ctx['rss_clip_2d_kib'] = rss_kib.get('rss_clip_2d_kib')
+    log_progress('osm-to-tactile-done')
+    track_process_rss_kib(ctx)
+    if multipart_union_area is not None and not multipart_reuse:
+        try:
+            multipart_cache.store(
+                multipart_batch.set_key(ctx['request_body']),
+                multipart_union_area,
+                os.path.join(os.path.dirname(osm_path), 'map.obj'),
+                os.path.join(os.path.dirname(osm_path), multipart_batch.UNION_META_FILE_NAME)
+            )
+        except Exception as e:
+            print("multipart cache: can't store union output: " + str(e))
+
+    # Compress each uploaded artifact once, in the background, as soon as it is final
+    compressed = artifact_store.ArtifactStore(rss_tracker=functools.partial(track_process_rss_kib, ctx))
+    ctx['stl_bytes'] = compressed.add_file('stl', artifacts['stl_path']).raw_bytes
+
+    if map_desc_times is None:
+        # osm-to-tactile.py finished without the ready signal; enrich meta now.
+        map_desc_times = run_map_desc_stage(ctx, raw_meta_path)
+    map_desc_start_time, map_desc_end_time = map_desc_times
+    ctx['timing_map_desc_overlap_seconds'] = max(
+        0.0,
+        min(map_desc_end_time, osm_to_tactile_end_time) - map_desc_start_time
+    )
 
-        common_args = {
-            'ACL': 'public-read', 'ContentEncoding': 'gzip',
-            'CacheControl': 'max-age=8640000', 'StorageClass': 'GLACIER_IR',
-        }
+    ctx['current_stage'] = 'map-content-read'
+    map_content_path = os.path.join(os.path.dirname(osm_path), 'map-content.json')
+    log_progress('map-content-read-start', detail='path={}'.format(map_content_path))
+    with open(map_content_path, 'rb') as f:
+        map_content = f.read()
+    map_content = attach_request_metadata_to_map_content(map_content, ctx['request_body'])
+    compressed.add_bytes('map-content', map_content)
+    map_content = None
+    log_progress('map-content-read-done')
+    track_process_rss_kib(ctx)
+
+    common_args = {
+        'ACL': 'public-read', 'ContentEncoding': 'gzip',
+        'CacheControl': 'max-age=8640000', 'StorageClass': 'GLACIER_IR',
+    }
 
-        # Put the augmented request to S3
-        ctx['current_stage'] = 'prepare-upload'
-        json_object_name = ctx['info_object_name']
-        ctx['map_content_key'] = ctx['name_base'] + '.map-content.json'
-        info = build_info_payload(
-            ctx['request_body'],
-            meta,
-            status_payload={ 'progress': STATUS_PROGRESS_UPLOADING_PRIMARY }
+    # Put the augmented request to S3
+    ctx['current_stage'] = 'prepare-upload'
+    json_object_name = ctx['info_object_name']
+    ctx['map_content_key'] = ctx['name_base'] + '.map-content.json'
+    info = build_info_payload(
+        ctx['request_body'],
+        meta,
+        status_payload={ 'progress': STATUS_PROGRESS_UPLOADING_PRIMARY }
+    )
+    record_compression_stats(ctx, compressed)
+    track_process_rss_kib(ctx)
+
+    # Upload primary assets
+    ctx['current_stage'] = 'upload-primary'
+    upload_primary_start_time = time_clock()
+    log_progress('upload-primary-start')
+    write_status_info_json(ctx, STATUS_PROGRESS_UPLOADING_PRIMARY)
+    try:
+        upload_primary_assets(
+            bucket,
+            json_object_name,
+            info,
+            ctx['name_base'],
+            ctx['map_object_name'],
+            compressed,
+            common_args,
+            rss_tracker=functools.partial(track_process_rss_kib, ctx),
+            progress_logger=ctx['progress_logger']
         )
-        ctx['stl_gzip_bytes'] = len(gzip_file_to_bytes(
-            artifacts['stl_path'],
-            compresslevel=5,
-            rss_tracker=functools.partial(track_process_rss_kib, ctx)
-        ))
-        track_process_rss_kib(ctx)
+    finally:
+        ctx['timing_upload_primary_seconds'] = duration_since(upload_primary_start_time)
+    log_progress('upload-primary-done')
+    compressed = None
+    track_process_rss_kib(ctx)
 
-        # Upload primary assets
-        ctx['current_stage'] = 'upload-primary'
-        upload_primary_start_time = time_clock()
-        log_progress('upload-primary-start')
-        write_status_info_json(ctx, STATUS_PROGRESS_UPLOADING_PRIMARY)
-        try:
-            upload_primary_assets(
-                bucket,
-                json_object_name,
-                info,
-                ctx['name_base'],
-                ctx['map_object_name'],
-                map_content,
-                artifacts['stl_path'],
-                common_args,
-                rss_tracker=functools.partial(track_process_rss_kib, ctx),
-                progress_logger=ctx['progress_logger']
-            )
-        finally:
-            ctx['timing_upload_primary_seconds'] = duration_since(upload_primary_start_time)
-        log_progress('upload-primary-done')
-        map_content = None
-        track_process_rss_kib(ctx)
+    # Mark map as ready for client polling
+    info['status'] = { 'progress': STATUS_PROGRESS_DONE }
+    write_info_json(bucket, json_object_name, info)
+    ctx['status_progress'] = STATUS_PROGRESS_DONE
 
-        # Mark map as ready for client polling
-        info['status'] = { 'progress': STATUS_PROGRESS_DONE }
-        write_info_json(bucket, json_object_name, info)
-        ctx['status_progress'] = STATUS_PROGRESS_DONE
+    # Create PDF from SVG while the other secondary assets are uploaded
+    pdf_path = os.path.join(os.path.dirname(osm_path), 'map.pdf')
 
-        # Create PDF from SVG and put it to S3
+    def make_pdf():
         ctx['current_stage'] = 'svg-to-pdf'
         svg_to_pdf_start_time = time_clock()
         log_progress('svg-to-pdf-start')
-        pdf_path = os.path.join(os.path.dirname(osm_path), 'map.pdf')
         ctx['rss_svg_to_pdf_kib'] = svg_to_pdf(artifacts['svg_path'], pdf_path)
         ctx['timing_svg_to_pdf_seconds'] = duration_since(svg_to_pdf_start_time)
         log_progress('svg-to-pdf-done')
         track_process_rss_kib(ctx)
-
-        # Upload secondary assets
         ctx['current_stage'] = 'upload-secondary'
-        log_progress('upload-secondary-start')
+
+    # Upload secondary assets
+    ctx['current_stage'] = 'upload-secondary'
+    upload_secondary_start_time = time_clock()
+    log_progress('upload-secondary-start')
+    try:
         upload_secondary_assets(
             bucket,
             ctx['name_base'],
@@ -1328,21 +1770,205 @@ def main():
             artifacts['stl_rest_path'],
             artifacts['blend_path'],
             common_args,
+            make_pdf,
             rss_tracker=functools.partial(track_process_rss_kib, ctx),
             progress_logger=ctx['progress_logger']
         )
-        log_progress('upload-secondary-done')
-        track_process_rss_kib(ctx)
+    finally:
+        ctx['timing_upload_secondary_seconds'] = duration_since(upload_secondary_start_time)
+    log_progress('upload-secondary-done')
+    track_process_rss_kib(ctx)
+
+    print("Processing entire request took " + str(time_clock() - ctx['main_start_time']))
+    log_progress('complete', status='success')
+    ctx['status'] = 'success'
+
+
+# Poll for one SQS message and process it.
+def process_one_request(ctx):
+    run_request_with_failure_handling(ctx, poll_and_process_request)
 
-        print("Processing entire request took " + str(time_clock() - ctx['main_start_time']))
-        log_progress('complete', status='success')
-        ctx['status'] = 'success'
+
+def daemon_recycle_reason(args, handled_count):
+    if args.max_requests > 0 and handled_count >= args.max_requests:
+        return 'handled {} requests'.format(handled_count)
+    rss_kib = read_process_rss_kib()
+    if args.max_rss_mib > 0 and rss_kib is not None and rss_kib > args.max_rss_mib * 1024:
+        return 'RSS {} KiB exceeds {} MiB'.format(rss_kib, args.max_rss_mib)
+    return None
+
+
+def init_daemon_services(worker_ctx):
+    signal.signal(signal.SIGALRM, handle_request_timeout_signal)
+    worker_ctx['sqs_queue'] = resolve_sqs_queue(worker_ctx['queue_name'])
+    worker_ctx['s3'] = worker_ctx['stats_s3'] if worker_ctx['stats_s3'] is not None else boto3.resource('s3')
+
+
+# Keep processing requests in this process, reusing boto3 resources, the SQS queue and imported
+# modules. Exit once a recycle limit is hit; poller.sh then starts a fresh worker.
+def run_daemon(worker_ctx):
+    init_daemon_services(worker_ctx)
+    handled_count = 0
+    while True:
+        reset_progress_state()
+        run_stats_maintenance(worker_ctx)
+        ctx = init_request_context(worker_ctx)
+        ctx['request_work_dir'] = prepare_request_work_dir(worker_ctx['args'].work_dir, DAEMON_REQUEST_WORK_DIR_NAME)
+        process_one_request(ctx)
+        if ctx['request_body'] is None and ctx['failure_exception'] is None:
+            continue
+        handled_count += 1
+        failure_exception = ctx['failure_exception']
+        if isinstance(failure_exception, (SystemExit, KeyboardInterrupt)):
+            # Timeouts and termination signals end the worker, as they did with one process per request.
+            raise_if_exception(failure_exception)
+        reason = daemon_recycle_reason(worker_ctx['args'], handled_count)
+        if reason is not None:
+            print("Daemon worker recycling: " + reason)
+            log_progress('daemon-recycle', status='idle', detail=reason)
+            return
+
+
+# Entry point of a forked child that processes one request received by run_concurrent_daemon.
+def run_request_in_child(worker_ctx, request_body, slot_name, predicted_peak_kib, admission_wait_seconds):
+    reset_progress_state()
+    worker_ctx = dict(worker_ctx)
+    # Pooled HTTP connections of the parent's boto3 resources must not be shared between processes.
+    worker_ctx['s3'] = boto3.resource('s3')
+    if worker_ctx['stats_s3'] is not None:
+        worker_ctx['stats_s3'] = worker_ctx['s3']
+    worker_ctx['sqs_queue'] = None
+    ctx = init_request_context(worker_ctx)
+    ctx['request_work_dir'] = prepare_request_work_dir(worker_ctx['args'].work_dir, slot_name)
+    ctx['request_body'] = request_body
+    ctx['rss_predicted_peak_kib'] = predicted_peak_kib
+    ctx['timing_admission_wait_seconds'] = admission_wait_seconds
+    run_request_with_failure_handling(ctx, process_request_body)
+    rethrow_failure_if_needed(ctx)
+
+
+def reap_finished_requests(running, free_slots, request_timeout):
+    # Join finished request processes and free their slots; return how many finished.
+    finished_count = 0
+    for slot_name, entry in list(running.items()):
+        process = entry['process']
+        if process.is_alive():
+            if time_clock() - entry['started'] > request_timeout + CONCURRENT_KILL_GRACE_SECONDS:
+                print("request {} in {} did not stop after timeout, killing".format(entry['request_id'], slot_name))
+                os.kill(process.pid, signal.SIGKILL)
+            continue
+        process.join()
+        del running[slot_name]
+        free_slots.append(slot_name)
+        finished_count += 1
+        print("request {} in {} finished: exit_code={}".format(entry['request_id'], slot_name, process.exitcode))
+    return finished_count
+
+
+# Daemon mode with --concurrency > 1: receive SQS messages in batches into a local queue and run
+# each request in a forked child. A queued request is started only when its predicted peak RSS
+# fits in the memory that running requests have not claimed yet.
+def run_concurrent_daemon(worker_ctx):
+    init_daemon_services(worker_ctx)
+    args = worker_ctx['args']
+    mp_context = multiprocessing.get_context('fork')
+    predictor = request_admission.RssPredictor.from_stats(worker_ctx['stats_root_dir'])
+    print("admission: RSS predictor built from {} records".format(predictor.sample_count))
+    reserve_kib = args.memory_reserve_mib * 1024
+    pending = collections.deque()
+    running = {}  # type: Dict[str, Dict[str, Any]]
+    free_slots = ['slot-{}'.format(i + 1) for i in range(args.concurrency)]
+    handled_count = 0
+    recycle_reason = None
+    while True:
+        finished_count = reap_finished_requests(running, free_slots, args.request_timeout)
+        if finished_count:
+            previous_count = handled_count
+            handled_count += finished_count
+            if handled_count // RSS_PREDICTOR_REFRESH_INTERVAL != previous_count // RSS_PREDICTOR_REFRESH_INTERVAL:
+                predictor = request_admission.RssPredictor.from_stats(worker_ctx['stats_root_dir'])
+
+        if recycle_reason is None:
+            recycle_reason = daemon_recycle_reason(args, handled_count + len(running) + len(pending))
+            if recycle_reason is not None:
+                print("Daemon worker recycling after running requests finish: " + recycle_reason)
+                log_progress('daemon-recycle', status='idle', detail=recycle_reason)
+        if recycle_reason is not None and not running and not pending:
+            return
+
+        received = False
+        accepted_count = handled_count + len(running) + len(pending)
+        capacity = args.concurrency - len(running) - len(pending)
+        if args.max_requests > 0:
+            capacity = min(capacity, args.max_requests - accepted_count)
+        if recycle_reason is None and capacity > 0:
+            if not running and not pending:
+                run_stats_maintenance(worker_ctx)
+                wait_seconds = CONCURRENT_IDLE_WAIT_SECONDS
+            else:
+                wait_seconds = CONCURRENT_BUSY_WAIT_SECONDS
+            for request_body in receive_sqs_msgs(worker_ctx['sqs_queue'], capacity, wait_seconds):
+                pending.append((request_body, time_clock()))
+            received = True
+
+        while pending and free_slots:
+            request_body, received_at = pending[0]
+            predicted_kib = predictor.predict_kib({
+                'contentMode': normalize_content_mode(request_body.get('contentMode'))
+            })
+            if running:
+                headroom_kib = request_admission.admission_headroom_kib(
+                    dict((entry['process'].pid, entry['predicted_kib']) for entry in running.values()),
+                    reserve_kib
+                )
+                if headroom_kib is not None and predicted_kib > headroom_kib:
+                    break
+            pending.popleft()
+            slot_name = free_slots.pop(0)
+            process = mp_context.Process(
+                target=run_request_in_child,
+                args=(worker_ctx, request_body, slot_name, predicted_kib, duration_since(received_at))
+            )
+            process.daemon = True
+            process.start()
+            running[slot_name] = {
+                'process': process,
+                'predicted_kib': predicted_kib,
+                'request_id': request_body.get('requestId'),
+                'started': time_clock(),
+            }
+            print("request {} started in {}: predicted peak RSS {} KiB".format(
+                request_body.get('requestId'), slot_name, predicted_kib
+            ))
+
+        if not received:
+            time.sleep(CONCURRENT_BUSY_WAIT_SECONDS)
+
+
+def main():
+    # TODO: if output S3 object already exists, exit immediately
+    ctx = init_main_context()
+    try:
+        bootstrap_runtime(ctx)
+        track_process_rss_kib(ctx)
+        init_stats_services(ctx)
+        track_process_rss_kib(ctx)
     except BaseException as e:
         track_process_rss_kib(ctx)
         handle_main_exception(ctx, e)
-    finally:
-        write_final_stats_if_possible(ctx)
         rethrow_failure_if_needed(ctx)
+        return
+
+    if ctx['args'].daemon:
+        if ctx['args'].concurrency > 1:
+            run_concurrent_daemon(ctx)
+        else:
+            run_daemon(ctx)
+        return
+
+    ctx['request_work_dir'] = ctx['args'].work_dir
+    process_one_request(ctx)
+    rethrow_failure_if_needed(ctx)
 
 # never output anything
 
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+
+# RAM-aware admission control for running several map requests concurrently in one
+# converter worker. Peak RSS of a new request is predicted from recent stats records
+# and compared against the memory the machine can still hand out.
+
+import os
+
+import stats_pipeline
+
+
+# Stage RSS fields in stats records. Stages of one request run one after another, so a
+# request's peak is its largest stage plus process-request.py itself.
+STAGE_RSS_FIELDS = (
+    'rss_osm2world_kib',
+    'rss_blender_kib',
+    'rss_clip_2d_kib',
+    'rss_prune_only_big_roads_kib',
+    'rss_svg_to_pdf_kib',
+)
+PROCESS_RSS_FIELD = 'rss_process_request_peak_kib'
+# OSM2World alone runs with -Xmx1G, so assume a bit more when there is no history.
+DEFAULT_PREDICTED_PEAK_KIB = 1536 * 1024
+PREDICTION_PERCENTILE = 0.9
+PREDICTION_SAFETY_FACTOR = 1.15
+MIN_SAMPLES_PER_MODE = 20
+HISTORY_DAYS = 3
+HISTORY_MAX_RECORDS = 600
+
+
+def read_mem_available_kib():
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        return int(parts[1])
+    except Exception:
+        return None
+    return None
+
+
+def _read_ppid_and_rss_kib(pid, page_kib):
+    try:
+        with open('/proc/{}/stat'.format(pid), 'r') as f:
+            stat_text = f.read()
+        with open('/proc/{}/statm'.format(pid), 'r') as f:
+            statm_fields = f.read().split()
+    except Exception:
+        return None, None
+    # Command name may contain spaces; fields after the closing paren are fixed.
+    after_comm = stat_text[stat_text.rfind(')') + 2:].split()
+    if len(after_comm) < 2 or len(statm_fields) < 2:
+        return None, None
+    return int(after_comm[1]), int(statm_fields[1]) * page_kib
+
+
+def _process_table():
+    # Return ({ppid: [child pids]}, {pid: rss_kib}) for all processes.
+    page_kib = os.sysconf('SC_PAGE_SIZE') // 1024
+    children = {}
+    rss_by_pid = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        ppid, rss_kib = _read_ppid_and_rss_kib(pid, page_kib)
+        if ppid is None:
+            continue
+        rss_by_pid[pid] = rss_kib
+        children.setdefault(ppid, []).append(pid)
+    return children, rss_by_pid
+
+
+def _tree_pids(children, root_pid):
+    pids = []
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def descendant_pids(root_pid):
+    children, _ = _process_table()
+    return _tree_pids(children, root_pid)[1:]
+
+
+def process_tree_rss_kib(root_pids):
+    # Return {root_pid: summed RSS of the process and all its descendants} for each given pid.
+    children, rss_by_pid = _process_table()
+    totals = {}
+    for root_pid in root_pids:
+        totals[root_pid] = sum(rss_by_pid.get(pid, 0) for pid in _tree_pids(children, root_pid))
+    return totals
+
+
+def _record_peak_kib(record):
+    stage_values = [record.get(field) for field in STAGE_RSS_FIELDS]
+    stage_values = [value for value in stage_values if isinstance(value, int) and not isinstance(value, bool)]
+    if not stage_values:
+        return None
+    process_rss = record.get(PROCESS_RSS_FIELD)
+    if not isinstance(process_rss, int) or isinstance(process_rss, bool):
+        process_rss = 0
+    return max(stage_values) + process_rss
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = int(round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class RssPredictor(object):
+    def __init__(self, records):
+        peaks_by_mode = {}
+        all_peaks = []
+        for record in records:
+            if record.get('status') != 'success':
+                continue
+            peak_kib = _record_peak_kib(record)
+            if peak_kib is None:
+                continue
+            all_peaks.append(peak_kib)
+            peaks_by_mode.setdefault(record.get('content_mode') or 'normal', []).append(peak_kib)
+        self.sample_count = len(all_peaks)
+        self._fallback_kib = self._predict_from(all_peaks, MIN_SAMPLES_PER_MODE)
+        self._by_mode = {}
+        for mode, peaks in peaks_by_mode.items():
+            predicted = self._predict_from(peaks, MIN_SAMPLES_PER_MODE)
+            if predicted is not None:
+                self._by_mode[mode] = predicted
+
+    @staticmethod
+    def _predict_from(peaks, min_samples):
+        if len(peaks) < min_samples:
+            return None
+        return int(_percentile(peaks, PREDICTION_PERCENTILE) * PREDICTION_SAFETY_FACTOR)
+
+    @classmethod
+    def from_stats(cls, stats_root_dir):
+        try:
+            records = stats_pipeline.load_recent_attempt_records(
+                stats_root_dir,
+                days=HISTORY_DAYS,
+                max_records=HISTORY_MAX_RECORDS
+            )
+        except Exception as e:
+            print("admission: can't read stats history: " + str(e))
+            records = []
+        return cls(records)
+
+    def predict_kib(self, request_body):
+        mode = (request_body or {}).get('contentMode') or 'normal'
+        predicted = self._by_mode.get(mode)
+        if predicted is None:
+            predicted = self._fallback_kib
+        if predicted is None:
+            predicted = DEFAULT_PREDICTED_PEAK_KIB
+        return predicted
+
+
+def admission_headroom_kib(running_predictions, reserve_kib):
+    # Memory left for a new request: what the kernel can hand out now, minus the part of each
+    # running request's predicted peak it has not reached yet, minus a fixed reserve.
+    # running_predictions maps the root pid of each running request to its predicted peak.
+    mem_available_kib = read_mem_available_kib()
+    if mem_available_kib is None:
+        return None
+    current_kib = process_tree_rss_kib(list(running_predictions.keys()))
+    outstanding_kib = 0
+    for pid, predicted_kib in running_predictions.items():
+        outstanding_kib += max(0, predicted_kib - current_kib.get(pid, 0))
+    return mem_available_kib - outstanding_kib - reserve_kib
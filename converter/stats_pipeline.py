@@ -117,6 +117,30 @@ def upload_month_from_local_data(stats_root_dir, s3_resource, stats_bucket_name,
     return True
 
 
+def load_recent_attempt_records(stats_root_dir, days=3, max_records=600, now_utc=None):
+    # Return locally stored attempt records of the last `days` UTC days, newest days first.
+    if now_utc is None:
+        now_utc = datetime.datetime.utcnow()
+    records = []
+    for day_offset in range(days):
+        target_day = now_utc.date() - datetime.timedelta(days=day_offset)
+        day_dir = os.path.join(
+            _month_dir(stats_root_dir, target_day.year, target_day.month),
+            '{:02d}'.format(target_day.day)
+        )
+        if not os.path.isdir(day_dir):
+            continue
+        for name in sorted(os.listdir(day_dir)):
+            if not name.endswith('.json'):
+                continue
+            value = _read_json_object(os.path.join(day_dir, name))
+            if value:
+                records.append(value)
+            if len(records) >= max_records:
+                return records
+    return records
+
+
 def _write_attempt_record_real_date(stats_root_dir, record, now_utc=None):
     if now_utc is None:
         now_utc = datetime.datetime.utcnow()
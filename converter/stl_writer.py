@@ -0,0 +1,137 @@
+# Binary STL writer for obj-to-tactile.py. Each object's triangles are evaluated once and streamed
+# to every STL file the object belongs to (the full map and one of the split files), instead of
+# exporting the scene once per file.
+#
+# The files are byte-identical to what bpy.ops.export_mesh.stl writes (Blender 2.78): vertices
+# are transformed and normals computed in float32 with the same operations in the same order as
+# Mesh.transform (mul_m4_v3) and mathutils.geometry.normal (normal_poly_v3). The test scripts
+# read the written files back with TRIANGLE_DTYPE.
+
+import struct
+
+import numpy as np
+
+HEADER_SIZE = 80
+COUNT_FORMAT = '<I'
+TRIANGLE_DTYPE = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+def tessface_triangles(vertices_raw):
+    """
+    Vertex index triples of Blender tessfaces, given their vertices_raw (four indices per face,
+    the fourth 0 for triangles; Blender never puts index 0 last in a quad). Quads are split into
+    (0, 1, 2) and (2, 3, 0) like the STL export add-on does.
+    """
+    faces = np.asarray(vertices_raw, dtype=np.int64).reshape(-1, 4)
+    is_quad = faces[:, 3] != 0
+    counts = 1 + is_quad
+    face_ids = np.repeat(np.arange(len(faces)), counts)
+    second_half = np.arange(len(face_ids)) - np.repeat(np.cumsum(counts) - counts, counts) == 1
+    corners = np.where(second_half[:, None], [2, 3, 0], [0, 1, 2])
+    return faces[face_ids[:, None], corners]
+
+
+def transform_vertices(co, matrix):
+    """
+    (N, 3) vertex coordinates transformed by a 4x4 matrix (rows as in mathutils), in float32 as
+    Blender's mul_m4_v3 does it: ((x * m[r][0] + y * m[r][1]) + z * m[r][2]) + m[r][3] for row r.
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    (x, y, z) = (co[:, 0], co[:, 1], co[:, 2])
+    transformed = np.empty_like(co)
+    for row in range(3):
+        m = matrix[row]
+        transformed[:, row] = x * m[0] + y * m[1] + z * m[2] + m[3]
+    return transformed
+
+
+def _newell_cross(prev, curr):
+    return np.stack((
+        (prev[:, 1] - curr[:, 1]) * (prev[:, 2] + curr[:, 2]),
+        (prev[:, 2] - curr[:, 2]) * (prev[:, 0] + curr[:, 0]),
+        (prev[:, 0] - curr[:, 0]) * (prev[:, 1] + curr[:, 1]),
+    ), axis=1)
+
+
+def triangle_normals(corners):
+    """
+    Unit normals of (N, 3, 3) float32 triangle corners, in float32 as Blender's normal_poly_v3
+    computes them: Newell's method summed from a zero vector over the edges (2, 0), (0, 1),
+    (1, 2), then normalized; normals whose squared length is at most 1e-35 become zero.
+    """
+    (v0, v1, v2) = (corners[:, 0], corners[:, 1], corners[:, 2])
+    normals = np.zeros((len(corners), 3), dtype=np.float32)
+    for (prev, curr) in ((v2, v0), (v0, v1), (v1, v2)):
+        normals += _newell_cross(prev, curr)
+    squared = normals[:, 0] * normals[:, 0] + normals[:, 1] * normals[:, 1] + normals[:, 2] * normals[:, 2]
+    nonzero = squared > np.float32(1e-35)
+    normals[nonzero] *= (np.float32(1) / np.sqrt(squared[nonzero]))[:, None]
+    normals[~nonzero] = 0
+    return normals
+
+
+def triangle_records(corners):
+    # STL records of (N, 3, 3) triangle corners, with unit normals from their winding
+    corners = np.asarray(corners, dtype=np.float32)
+    records = np.zeros(len(corners), dtype=TRIANGLE_DTYPE)
+    records['normal'] = triangle_normals(corners)
+    records['corners'] = corners
+    return records
+
+
+def triangle_count(path):
+    # Triangle count in the header of a binary STL file
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        return struct.unpack(COUNT_FORMAT, f.read(struct.calcsize(COUNT_FORMAT)))[0]
+
+
+class MultiStlWriter(object):
+    """
+    Writes several binary STL files at once. write() appends triangles to some of them; the
+    triangle counts in the headers are filled in when the writer is closed.
+    """
+
+    def __init__(self, paths, header):
+        self.header = header[:HEADER_SIZE]
+        self.counts = {}
+        self.files = {}
+        try:
+            for path in paths:
+                self.files[path] = open(path, 'wb')
+                self.files[path].write(b'\0' * (HEADER_SIZE + struct.calcsize(COUNT_FORMAT)))
+                self.counts[path] = 0
+        except Exception:
+            self.abort()
+            raise
+
+    def write(self, paths, corners):
+        if len(corners) == 0:
+            return
+        data = triangle_records(corners).tobytes()
+        for path in paths:
+            self.files[path].write(data)
+            self.counts[path] += len(corners)
+
+    def close(self):
+        for (path, f) in self.files.items():
+            f.seek(0)
+            f.write(struct.pack('<%ds' % HEADER_SIZE, self.header) + struct.pack(COUNT_FORMAT, self.counts[path]))
+            f.close()
+        self.files = {}
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the JSON call sites of the converter with every installed backend of
+converter/fast_json.py, and check their output against the stdlib backend.
+
+The inputs are the repo test map-meta and map-content files, with their item
+lists repeated --scale times to get realistic document sizes. Each call site
+runs --repeat times per backend; the best time is reported. Every backend's
+output must parse to the same value as the stdlib output. Exits with status 1
+on any difference.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import fast_json  # noqa: E402
+
+META_INPUT = os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json')
+CONTENT_INPUT = os.path.join(REPO_ROOT, 'test', 'data', 'map-content.json')
+
+
+def scaled(path, scale):
+    with open(path, 'r', encoding='utf8') as f:
+        value = json.load(f)
+
+    def grow(node):
+        # Repeat the outermost lists of objects (items, subclass entries), nothing nested in them.
+        if isinstance(node, dict):
+            return {key: grow(child) for key, child in node.items()}
+        if isinstance(node, list) and node and isinstance(node[0], dict):
+            return node * scale
+        return node
+    return grow(value)
+
+
+def call_sites(tmp_dir, meta, content_bytes):
+    meta_path = os.path.join(tmp_dir, 'map-meta-raw.json')
+    out_path = os.path.join(tmp_dir, 'out.json')
+
+    def run_osm2world(backend):
+        # osm-to-tactile.py run_osm2world: load OSM2World's output and rewrite it compact.
+        value = fast_json.load_file(meta_path, backend=backend)
+        fast_json.dump_file(meta_path, value, backend=backend)
+        return value
+
+    def run_osm_to_tactile(backend):
+        # process-request.py run_osm_to_tactile: re-read map-meta-raw.json.
+        return fast_json.load_file(meta_path, backend=backend)
+
+    def map_desc_load(backend):
+        # map_desc._load_json.
+        return fast_json.load_file(meta_path, ordered=True, backend=backend)
+
+    def map_desc_write(backend):
+        # map_desc._write_json_fast for map-meta.json, map-meta.augmented.json, map-content.json.
+        fast_json.dump_file(out_path, meta, backend=backend)
+
+    def map_desc_write_pretty(backend):
+        # The same with TOUCH_MAPPER_PRETTY_JSON.
+        fast_json.dump_file(out_path, meta, pretty=True, backend=backend)
+
+    def attach_request_metadata(backend):
+        # process-request.py attach_request_metadata_to_map_content.
+        value = fast_json.loads(content_bytes, backend=backend)
+        value['metadata'] = {'requestBody': {'requestId': 'bench'}}
+        return fast_json.dumps(value, backend=backend)
+
+    return meta_path, out_path, [
+        ('run_osm2world', run_osm2world),
+        ('run_osm_to_tactile', run_osm_to_tactile),
+        ('map_desc._load_json', map_desc_load),
+        ('map_desc._write_json_fast', map_desc_write),
+        ('map_desc._write_json_fast pretty', map_desc_write_pretty),
+        ('attach_request_metadata_to_map_content', attach_request_metadata),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=30, help="item list repetitions")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [name for name in fast_json.BACKENDS if fast_json.select_backend(name) == name]
+    meta = scaled(META_INPUT, args.scale)
+    content_bytes = fast_json.dumps(scaled(CONTENT_INPUT, args.scale), backend='stdlib')
+    meta_bytes = fast_json.dumps(meta, backend='stdlib')
+    print("backends: {} (default {}), map-meta-raw {:.1f} MB, map-content {:.1f} MB".format(
+        ', '.join(backends), fast_json.BACKEND, len(meta_bytes) / 1e6, len(content_bytes) / 1e6
+    ))
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        meta_path, out_path, sites = call_sites(tmp_dir, meta, content_bytes)
+        for name, site in sites:
+            timings = []
+            expected = None
+            for backend in backends:
+                best = None
+                for _ in range(args.repeat):
+                    with open(meta_path, 'wb') as f:
+                        f.write(meta_bytes)
+                    start = time.perf_counter()
+                    value = site(backend)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                # Written files and encoded bytes are compared as parsed values.
+                if value is None:
+                    value = fast_json.load_file(out_path, backend='stdlib')
+                elif isinstance(value, bytes):
+                    value = fast_json.loads(value, backend='stdlib')
+                if expected is None:
+                    expected = value
+                same = value == expected
+                if not same:
+                    failures += 1
+                timings.append('{} {:.3f}s{}'.format(backend, best, '' if same else ' MISMATCH'))
+            print("{}: {}".format(name, ', '.join(timings)))
+    if failures:
+        print("{} call site result(s) differ".format(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
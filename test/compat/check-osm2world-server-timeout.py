@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""
+Check that a stuck OSM2World job server job falls back to one-shot.
+
+A fake server answers pings but never replies to jobs, the way a hung JVM
+does. Its port file names a stand-in process started in a new session, like
+the real server. run_osm2world_server_job in osm-to-tactile.py must give up
+after the job timeout and return None (run one-shot), kill the stand-in's
+process group and remove the port file. Needs no Java. Exits with status 1 on
+any difference.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CONVERTER_DIR = os.path.join(REPO_ROOT, 'converter')
+sys.path.insert(0, CONVERTER_DIR)
+
+from telemetry import TelemetryLogger  # noqa: E402
+
+TOKEN = 'compat-token'
+
+
+def load_osm_to_tactile():
+    spec = importlib.util.spec_from_file_location('osm_to_tactile', os.path.join(CONVERTER_DIR, 'osm-to-tactile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def serve_stuck(listener, stop):
+    # Reply to pings, swallow jobs without replying.
+    held = []
+    while not stop.is_set():
+        try:
+            conn, _ = listener.accept()
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        request = json.loads(data.decode('utf8')) if data.endswith(b'\n') else {}
+        if request.get('ping') and request.get('token') == TOKEN:
+            conn.sendall(b'{"ok": true}\n')
+            conn.close()
+        else:
+            held.append(conn)
+    for conn in held:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--timeout', type=int, default=1, help='job timeout in seconds')
+    args = parser.parse_args()
+
+    osm_to_tactile = load_osm_to_tactile()
+    os.environ[osm_to_tactile.OSM2WORLD_SERVER_JOB_TIMEOUT_ENV_VAR] = str(args.timeout)
+    work_dir = tempfile.mkdtemp(prefix='osm2world-server-timeout-')
+    port_path = osm_to_tactile.osm2world_server_port_path(work_dir)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(4)
+    listener.settimeout(0.1)
+    stop = threading.Event()
+    thread = threading.Thread(target=serve_stuck, args=(listener, stop))
+    thread.start()
+    stand_in = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(600)'],
+                                start_new_session=True)
+    problems = []
+    try:
+        with open(port_path, 'w') as f:
+            json.dump({'port': listener.getsockname()[1], 'token': TOKEN, 'pid': stand_in.pid}, f)
+        telemetry = TelemetryLogger(component='osm2world-server-timeout')
+        start = time.time()
+        reply = osm_to_tactile.run_osm2world_server_job(
+            {'input': os.path.join(work_dir, 'map.osm')}, 'OSM2World.jar', work_dir, telemetry)
+        seconds = time.time() - start
+        if reply is not None:
+            problems.append('returned a reply instead of None: {}'.format(reply))
+        if seconds > args.timeout + 5:
+            problems.append('took {:.1f}s with a {}s timeout'.format(seconds, args.timeout))
+        try:
+            stand_in.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            problems.append('server process group was not killed')
+        if os.path.exists(port_path):
+            problems.append('port file was not removed')
+        print('stuck job: gave up after {:.1f}s, {}'.format(
+            seconds, 'fell back to one-shot' if not problems else 'MISMATCH ' + ', '.join(problems)))
+    finally:
+        stop.set()
+        listener.close()
+        thread.join()
+        if stand_in.poll() is None:
+            stand_in.kill()
+            stand_in.wait()
+        if os.path.exists(port_path):
+            os.remove(port_path)
+        shutil.rmtree(work_dir)
+    if problems:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Check that the one-pass STL writer (converter/stl_writer.py) writes the same
+bytes as Blender's STL export, without Blender.
+
+The reference is a pure Python port of what bpy.ops.export_mesh.stl does in
+Blender 2.78 (io_mesh_stl faces_from_mesh and _binary_write, with
+Mesh.transform's mul_m4_v3 and mathutils.geometry.normal's normal_poly_v3),
+rounding to float32 after every operation like the C code. Seeded random
+objects (triangles and quads, degenerate and tiny faces, mirrored and
+rotated matrices) are written by both into a full file and a split file per
+object group. The files must be byte-identical. Exits with status 1 on any
+difference.
+"""
+
+import argparse
+import math
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import stl_writer  # noqa: E402
+
+HEADER = b'Exported from Blender-2.78 (sub 0)'
+F32 = struct.Struct('<f')
+
+
+def f32(value):
+    # Round to float32. Rounding the exact double result of +, -, *, / or sqrt of float32
+    # operands gives the float32 result of the operation.
+    return F32.unpack(F32.pack(value))[0]
+
+
+# Reference, after Blender 2.78 source
+
+def mul_m4_v3(m, v):
+    # m as rows: the C code's mat[col][row] is m[row][col]
+    (x, y, z) = v
+    return [
+        f32(f32(f32(f32(x * m[row][0]) + f32(y * m[row][1])) + f32(z * m[row][2])) + m[row][3])
+        for row in range(3)
+    ]
+
+
+def normal_poly_v3(verts):
+    n = [0.0, 0.0, 0.0]
+    v_prev = verts[-1]
+    for v_curr in verts:
+        # add_newell_cross_v3_v3v3
+        n[0] = f32(n[0] + f32(f32(v_prev[1] - v_curr[1]) * f32(v_prev[2] + v_curr[2])))
+        n[1] = f32(n[1] + f32(f32(v_prev[2] - v_curr[2]) * f32(v_prev[0] + v_curr[0])))
+        n[2] = f32(n[2] + f32(f32(v_prev[0] - v_curr[0]) * f32(v_prev[1] + v_curr[1])))
+        v_prev = v_curr
+    # normalize_v3
+    d = f32(f32(f32(n[0] * n[0]) + f32(n[1] * n[1])) + f32(n[2] * n[2]))
+    if d > f32(1.0e-35):
+        d = f32(math.sqrt(d))
+        scale = f32(1.0 / d)
+        return [f32(c * scale) for c in n]
+    return [0.0, 0.0, 0.0]
+
+
+def faces_from_mesh(co, faces, matrix):
+    vertices = [mul_m4_v3(matrix, v) for v in co]
+    for face in faces:
+        if len(face) == 4:
+            yield [vertices[i] for i in (face[0], face[1], face[2])]
+            yield [vertices[i] for i in (face[2], face[3], face[0])]
+        else:
+            yield [vertices[i] for i in face]
+
+
+def binary_write(path, faces):
+    with open(path, 'wb') as data:
+        fw = data.write
+        fw(struct.calcsize('<80sI') * b'\0')
+        pack = struct.Struct('<9f').pack
+        nb = 0
+        for face in faces:
+            fw(struct.pack('<3f', *normal_poly_v3(face)) + pack(*[c for v in face for c in v]))
+            fw(b'\0\0')
+            nb += 1
+        data.seek(0)
+        fw(struct.pack('<80sI', HEADER, nb))
+
+
+# Synthetic objects
+
+def random_matrix(rng):
+    angle = rng.uniform(-math.pi, math.pi)
+    (c, s) = (math.cos(angle), math.sin(angle))
+    scale = rng.choice([1.0, 1000 / 3100.0, rng.uniform(0.01, 10.0)])
+    mirror = rng.choice([1.0, 1.0, -1.0])
+    rows = [
+        [c * scale * mirror, -s * scale, 0.0, rng.uniform(-500.0, 500.0)],
+        [s * scale * mirror, c * scale, 0.0, rng.uniform(-500.0, 500.0)],
+        [0.0, 0.0, scale, rng.uniform(-5.0, 5.0)],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+    return [[f32(value) for value in row] for row in rows]
+
+
+def random_object(rng):
+    # (float32 vertex coordinates, faces as index tuples, tessface vertices_raw)
+    vertex_count = rng.randint(4, 60)
+    spread = rng.choice([1.0, 100.0, 1e-6])
+    co = [[f32(rng.uniform(-spread, spread)) for _ in range(3)] for _ in range(vertex_count)]
+    co[1] = list(co[0])  # a repeated vertex for degenerate faces
+    faces = []
+    for _ in range(rng.randint(1, 80)):
+        size = rng.choice([3, 4])
+        if rng.random() < 0.05:
+            # Vertices 0 and 1 are at the same place
+            face = [0, 1] + rng.sample(range(2, vertex_count), size - 2)
+            rng.shuffle(face)
+        else:
+            face = rng.sample(range(vertex_count), size)
+        if size == 4 and face[3] == 0:
+            # Blender never puts index 0 last in a quad
+            face = face[1:] + face[:1]
+        faces.append(tuple(face))
+    vertices_raw = [index for face in faces for index in (face + (0,) * (4 - len(face)))]
+    return co, faces, vertices_raw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--objects', type=int, default=60, help='random objects')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the output directory')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    objects = [(random_object(rng), random_matrix(rng), rng.random() < 0.5) for _ in range(args.objects)]
+    output_dir = tempfile.mkdtemp(prefix='stl-writer-bytes-')
+    names = ('map.stl', 'map-ways.stl', 'map-rest.stl')
+    ok = True
+    try:
+        expected_dir = os.path.join(output_dir, 'reference')
+        actual_dir = os.path.join(output_dir, 'writer')
+        os.makedirs(expected_dir)
+        os.makedirs(actual_dir)
+
+        t = time.time()
+        for (name, selected) in zip(names, (lambda ways: True, lambda ways: ways, lambda ways: not ways)):
+            binary_write(os.path.join(expected_dir, name), (
+                face
+                for ((co, faces, _raw), matrix, ways) in objects if selected(ways)
+                for face in faces_from_mesh(co, faces, matrix)
+            ))
+        reference_seconds = time.time() - t
+
+        t = time.time()
+        paths = [os.path.join(actual_dir, name) for name in names]
+        with stl_writer.MultiStlWriter(paths, HEADER) as writer:
+            for ((co, _faces, vertices_raw), matrix, ways) in objects:
+                transformed = stl_writer.transform_vertices(np.array(co, dtype=np.float32), matrix)
+                triangles = transformed[stl_writer.tessface_triangles(vertices_raw)]
+                writer.write((paths[0], paths[1] if ways else paths[2]), triangles)
+        writer_seconds = time.time() - t
+
+        for name in names:
+            with open(os.path.join(expected_dir, name), 'rb') as f:
+                expected = f.read()
+            with open(os.path.join(actual_dir, name), 'rb') as f:
+                actual = f.read()
+            same = expected == actual
+            detail = ''
+            if not same:
+                ok = False
+                offset = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b),
+                              min(len(expected), len(actual)))
+                detail = ', first difference at byte {} (triangle {})'.format(
+                    offset, (offset - stl_writer.HEADER_SIZE - 4) // stl_writer.TRIANGLE_DTYPE.itemsize)
+            print('{}: {} triangles, {}{}'.format(
+                name, stl_writer.triangle_count(os.path.join(actual_dir, name)),
+                'identical' if same else 'MISMATCH', detail))
+        print('reference {:.2f}s, writer {:.2f}s'.format(reference_seconds, writer_seconds))
+    finally:
+        if args.keep:
+            print('outputs in ' + output_dir)
+        else:
+            shutil.rmtree(output_dir)
+    if not ok:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+Check the multipart batch tile geometry in converter/multipart_batch.py.
+
+For seeded random tiles and grid radii, tile_boundary must match projecting
+the tile's corners directly with a port of OSM2World's MetricMapProjection
+centred on the union (as an OSM2World run over the union would). tile_meta on
+the test map meta must keep exactly the entries whose bounds touch the tile.
+Exits with status 1 on any difference.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import multipart_batch  # noqa: E402
+
+META_PATH = os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json')
+# tile_boundary is scale free; a realistic circumference keeps TOLERANCE_M in meters.
+EARTH_CIRCUMFERENCE_M = 40075016.686
+TOLERANCE_M = 1e-6
+
+
+def metric_projection(origin_lat, origin_lon):
+    # MetricMapProjection: scaled MercatorProjection.lonToX / latToY around an origin.
+    def lon_to_x(lon):
+        return (lon + 180.0) / 360.0
+
+    def lat_to_y(lat):
+        sin_lat = math.sin(math.radians(lat))
+        return math.log((1.0 + sin_lat) / (1.0 - sin_lat)) / (4.0 * math.pi) + 0.5
+
+    scale = EARTH_CIRCUMFERENCE_M * math.cos(math.radians(origin_lat))
+    origin_x = lon_to_x(origin_lon) * scale
+    origin_y = lat_to_y(origin_lat) * scale
+    return lambda lat, lon: (lon_to_x(lon) * scale - origin_x, lat_to_y(lat) * scale - origin_y)
+
+
+def check_boundaries(rng, count):
+    worst = 0.0
+    for _ in range(count):
+        lat = rng.uniform(-70.0, 70.0)
+        lon = rng.uniform(-179.0, 179.0)
+        diameter_m = rng.choice([500.0, 1000.0, 2000.0, 5000.0])
+        deg_lat = diameter_m / 2 / 111320.0
+        deg_lon = deg_lat / math.cos(math.radians(lat))
+        tile = {'latMin': lat - deg_lat, 'latMax': lat + deg_lat, 'lonMin': lon - deg_lon, 'lonMax': lon + deg_lon}
+        union = multipart_batch.union_area(tile, rng.choice([1, 2]))
+        project = metric_projection((union['latMin'] + union['latMax']) / 2, (union['lonMin'] + union['lonMax']) / 2)
+        union_min = project(union['latMin'], union['lonMin'])
+        union_max = project(union['latMax'], union['lonMax'])
+        union_bounds = {'minX': union_min[0], 'minY': union_min[1], 'maxX': union_max[0], 'maxY': union_max[1]}
+        boundary = multipart_batch.tile_boundary(union, union_bounds, tile)
+        tile_min = project(tile['latMin'], tile['lonMin'])
+        tile_max = project(tile['latMax'], tile['lonMax'])
+        expected = (tile_min[0], tile_min[1], tile_max[0], tile_max[1])
+        actual = (boundary['minX'], boundary['minY'], boundary['maxX'], boundary['maxY'])
+        worst = max(worst, max(abs(a - b) for a, b in zip(actual, expected)))
+    return worst
+
+
+def check_tile_meta():
+    with open(META_PATH, 'r', encoding='utf8') as f:
+        union_meta = json.load(f)
+    union_bounds = union_meta['meta']['dataBoundary']
+    failures = 0
+    for fx in (0.0, 0.25, 0.5):
+        for fy in (0.0, 0.25, 0.5):
+            width = union_bounds['maxX'] - union_bounds['minX']
+            height = union_bounds['maxY'] - union_bounds['minY']
+            boundary = {
+                'minX': union_bounds['minX'] + fx * width,
+                'minY': union_bounds['minY'] + fy * height,
+                'maxX': union_bounds['minX'] + (fx + 0.5) * width,
+                'maxY': union_bounds['minY'] + (fy + 0.5) * height,
+            }
+            meta = multipart_batch.tile_meta(union_meta, boundary)
+            if meta['meta']['boundary'] != boundary:
+                failures += 1
+            for key in ('nodes', 'ways', 'areas'):
+                expected = [
+                    entry['osmId'] for entry in union_meta[key]
+                    if entry['bounds']['minX'] <= boundary['maxX'] and entry['bounds']['maxX'] >= boundary['minX']
+                    and entry['bounds']['minY'] <= boundary['maxY'] and entry['bounds']['maxY'] >= boundary['minY']
+                ]
+                if [entry['osmId'] for entry in meta[key]] != expected:
+                    print("tile_meta {} differ for tile at {}, {}".format(key, fx, fy))
+                    failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tiles', type=int, default=2000, help='random tiles to check (default 2000)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default 1)')
+    args = parser.parse_args()
+
+    worst = check_boundaries(random.Random(args.seed), args.tiles)
+    print("tile_boundary: {} tiles, worst corner difference {:.3g} m".format(args.tiles, worst))
+    failures = check_tile_meta()
+    print("tile_meta: {} failures".format(failures))
+    if worst > TOLERANCE_M or failures:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
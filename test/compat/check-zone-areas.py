@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""
+Check polygon_zone_areas in converter/map_desc/areas_coverage.py against point
+sampling.
+
+A dense grid of sample points over the map is classified with
+classify_location and tested against each polygon (even-odd, so holes are
+left out). The sampled share of the map covered by the polygon, in total and
+per location zone, must match the exact areas within the sampling error.
+Polygons: a convex one, a concave one crossing the map edge, one with a hole,
+and seeded random concave stars. Exits with status 1 on any difference.
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+from map_desc.areas_coverage import polygon_zone_areas  # noqa: E402
+from map_desc.map_desc_loc_segments import classify_location  # noqa: E402
+
+BOUNDARY = {"minX": -120.0, "minY": -80.0, "maxX": 120.0, "maxY": 80.0}
+
+
+def fixed_polygons():
+    convex = [(-30.0, -50.0), (40.0, -40.0), (70.0, 10.0), (20.0, 60.0), (-60.0, 30.0)]
+    # An L whose foot sticks out of the east edge
+    concave_crossing_edge = [(60.0, -60.0), (150.0, -60.0), (150.0, -20.0), (90.0, -20.0),
+                             (90.0, 50.0), (60.0, 50.0)]
+    with_hole = [(-110.0, -70.0), (-10.0, -70.0), (-10.0, 20.0), (-110.0, 20.0)]
+    hole = [(-80.0, -40.0), (-80.0, -10.0), (-40.0, -10.0), (-40.0, -40.0)]
+    return [
+        ("convex", convex, []),
+        ("concave crossing edge", concave_crossing_edge, []),
+        ("with hole", with_hole, [hole]),
+    ]
+
+
+def star_polygon(rng):
+    cx = rng.uniform(BOUNDARY["minX"], BOUNDARY["maxX"])
+    cy = rng.uniform(BOUNDARY["minY"], BOUNDARY["maxY"])
+    radius = rng.uniform(20.0, 100.0)
+    points = rng.randint(5, 14)
+    ring = []
+    for i in range(points):
+        angle = 2.0 * math.pi * i / points
+        r = radius * rng.uniform(0.3, 1.0)
+        ring.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+    return ring
+
+
+def sample_grid(samples):
+    # Cell-centred sample points and the location zone of each
+    width = BOUNDARY["maxX"] - BOUNDARY["minX"]
+    height = BOUNDARY["maxY"] - BOUNDARY["minY"]
+    xs = BOUNDARY["minX"] + (np.arange(samples) + 0.5) * width / samples
+    ys = BOUNDARY["minY"] + (np.arange(samples) + 0.5) * height / samples
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    grid_x = grid_x.ravel()
+    grid_y = grid_y.ravel()
+    zone_keys = []
+    zones = np.empty(len(grid_x), dtype=np.int64)
+    for i in range(len(grid_x)):
+        loc = classify_location({"x": float(grid_x[i]), "y": float(grid_y[i])}, BOUNDARY)["loc"]
+        key = (loc["kind"], loc["dir"])
+        if key not in zone_keys:
+            zone_keys.append(key)
+        zones[i] = zone_keys.index(key)
+    return grid_x, grid_y, zones, zone_keys
+
+
+def inside_ring(xs, ys, ring):
+    inside = np.zeros(len(xs), dtype=bool)
+    x0, y0 = ring[-1]
+    for x1, y1 in ring:
+        if y0 != y1:
+            crosses = (y0 > ys) != (y1 > ys)
+            x_at = x0 + (ys - y0) * (x1 - x0) / (y1 - y0)
+            inside ^= crosses & (xs < x_at)
+        x0, y0 = x1, y1
+    return inside
+
+
+def check(name, outer, holes, grid, tolerance):
+    grid_x, grid_y, zones, zone_keys = grid
+    inside = inside_ring(grid_x, grid_y, outer)
+    for hole in holes:
+        inside ^= inside_ring(grid_x, grid_y, hole)
+    sampled_total = float(np.count_nonzero(inside)) / len(inside)
+    sampled_zones = np.bincount(zones[inside], minlength=len(zone_keys)) / float(len(inside))
+
+    total, exact_zones = polygon_zone_areas(outer, holes, BOUNDARY)
+    failures = []
+    if abs(total - sampled_total) > tolerance:
+        failures.append("total {:.5f}, sampled {:.5f}".format(total, sampled_total))
+    for index, key in enumerate(zone_keys):
+        exact = exact_zones.get(key, 0.0)
+        if abs(exact - sampled_zones[index]) > tolerance:
+            failures.append("{} {:.5f}, sampled {:.5f}".format(key, exact, sampled_zones[index]))
+    for key in exact_zones:
+        if key not in zone_keys and exact_zones[key] > tolerance:
+            failures.append("{} {:.5f}, never sampled".format(key, exact_zones[key]))
+
+    print("{}: coverage {:.4f} (sampled {:.4f}), {} zones{}".format(
+        name, total, sampled_total, sum(1 for area in exact_zones.values() if area > 0),
+        "" if not failures else " FAIL"))
+    for failure in failures:
+        print("  " + failure)
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check polygon_zone_areas against point sampling")
+    parser.add_argument("--samples", type=int, default=500, help="sample points per map side")
+    parser.add_argument("--synthetic", type=int, default=10, help="number of random star polygons")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    grid = sample_grid(args.samples)
+    # A polygon edge misclassifies about one sample row along its length
+    tolerance = 2.0 / args.samples
+    ok = True
+    for name, outer, holes in fixed_polygons():
+        ok = check(name, outer, holes, grid, tolerance) and ok
+    rng = random.Random(args.seed)
+    for i in range(args.synthetic):
+        ok = check("star {}".format(i), star_polygon(rng), [], grid, tolerance) and ok
+    if not ok:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+"""
+Compare the batch line clipper clip_line_strings in
+converter/map_desc/ways_clip.py against the per line clip_line_string, and
+benchmark both.
+
+Every line string of the input map-meta files, plus seeded random lines
+(crossing the boundary, running along its edges and corners, with repeated
+and invalid points), is clipped both ways. The visible runs of every line must
+be identical. Exits with status 1 on any difference.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+from map_desc import ways_clip  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json'),
+]
+
+
+def lines_from_meta(path):
+    with open(path, 'r', encoding='utf8') as f:
+        data = json.load(f)
+    boundary = (data.get('meta') or {}).get('boundary')
+    lines = []
+    for key in ('areas', 'ways', 'nodes'):
+        for item in data.get(key) or []:
+            geometry = item.get('geometry') or {}
+            if geometry.get('type') == 'line_string' and isinstance(geometry.get('coordinates'), list):
+                lines.append(geometry['coordinates'])
+    return boundary, lines
+
+
+def synthetic_lines(boundary, count, seed):
+    rng = random.Random(seed)
+    min_x = boundary['minX']
+    min_y = boundary['minY']
+    width = boundary['maxX'] - min_x
+    height = boundary['maxY'] - min_y
+    # Edge and corner coordinates hit the parallel and touching cases of Liang-Barsky.
+    xs = [min_x, boundary['maxX'], min_x + width / 2]
+    ys = [min_y, boundary['maxY'], min_y + height / 2]
+    lines = []
+    for _ in range(count):
+        line = []
+        for _ in range(rng.randint(0, 40)):
+            roll = rng.random()
+            if roll < 0.03:
+                line.append(rng.choice([None, [1.0], ['a', 2.0], [True, 0]]))
+            elif roll < 0.08 and line and isinstance(line[-1], list) and len(line[-1]) == 2:
+                line.append(list(line[-1]))
+            elif roll < 0.3:
+                line.append([rng.choice(xs), rng.choice(ys)])
+            elif roll < 0.35:
+                line.append([int(rng.choice(xs)), rng.uniform(min_y, min_y + height)])
+            else:
+                line.append([min_x + rng.uniform(-0.3, 1.3) * width,
+                             min_y + rng.uniform(-0.3, 1.3) * height])
+        lines.append(line)
+    return lines
+
+
+def run_engine(use_numpy, boundary, lines):
+    ways_clip.USE_NUMPY = use_numpy
+    start = time.perf_counter()
+    if use_numpy:
+        results = ways_clip.clip_line_strings(lines, boundary)
+    else:
+        results = [ways_clip.clip_line_string(coords, boundary) for coords in lines]
+    elapsed = time.perf_counter() - start
+    return [repr(result) for result in results], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('meta', nargs='*', help="map-meta JSON files (default: repo test data)")
+    parser.add_argument('--synthetic', type=int, default=20000, help="random lines per input")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if ways_clip.np is None:
+        print("NumPy is not installed; only the per line clipper is available")
+        return 1
+
+    failures = 0
+    for path in args.meta or DEFAULT_INPUTS:
+        boundary, lines = lines_from_meta(path)
+        boundary = {key: float(boundary[key]) for key in ('minX', 'minY', 'maxX', 'maxY')}
+        lines += synthetic_lines(boundary, args.synthetic, args.seed)
+        scalar_results, scalar_seconds = run_engine(False, boundary, lines)
+        batch_results, batch_seconds = run_engine(True, boundary, lines)
+        mismatches = [
+            i for i, (a, b) in enumerate(zip(scalar_results, batch_results)) if a != b
+        ]
+        failures += len(mismatches)
+        print("{}: {} {} lines, per line {:.3f}s, batch {:.3f}s ({:.1f}x)".format(
+            os.path.relpath(path, REPO_ROOT),
+            'OK' if not mismatches else 'MISMATCH',
+            len(lines),
+            scalar_seconds,
+            batch_seconds,
+            scalar_seconds / batch_seconds if batch_seconds > 0 else 0.0
+        ))
+        for i in mismatches[:5]:
+            print("  line {} differs:\n    per line {}\n    batch    {}".format(
+                i, scalar_results[i][:300], batch_results[i][:300]
+            ))
+    if failures:
+        print("{} line(s) differ".format(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
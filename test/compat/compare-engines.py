@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+Compare the compiled classification engine in
+converter/map_desc/classification_engine.py against the rule interpreter in
+converter/map_desc/__init__.py (classify_item, _collect_modifiers), and
+benchmark both.
+
+Every item of the input map-meta files goes through both engines, with the
+spec options as-is and with each boolean option flipped. By default the inputs
+are the test fixture and all map-content suite outputs under
+test/map-content/out/. Seeded synthetic items built from the values the spec
+mentions (element and geometry types, tag keys and values, representation
+fields, plus near misses) are added on top. Classification results and
+modifier lists must be identical.
+
+The same items also go through the memoizing layer in
+converter/map_desc/item_memo.py, with a small LRU so that evictions happen
+too: memoized semantics, classification and modifiers must equal
+build_feature_semantics() and the interpreter. Synthetic items also carry
+the tags feature semantics read, and copies of items with only unrelated tags
+changed. Exits with status 1 on any difference.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import map_desc  # noqa: E402
+from map_desc.classification_engine import compile_spec  # noqa: E402
+from map_desc.feature_semantics import SEMANTIC_TAG_KEYS, build_feature_semantics  # noqa: E402
+from map_desc.item_memo import ItemMemo  # noqa: E402
+
+SEMANTIC_VALUES = ['yes', 'no', 'asphalt', 'gravel', '2', '3.5', '50 mph', 'both', 'left',
+                   'lowered', '10%', 'up', 'footway', 'traffic_signals', 'grade2', '', None]
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json'),
+] + sorted(glob.glob(os.path.join(REPO_ROOT, 'test', 'map-content', 'out', '*', 'pipeline', 'map-meta-raw.json')))
+
+
+def items_from_meta(path):
+    with open(path, 'r', encoding='utf8') as f:
+        data = json.load(f, object_pairs_hook=OrderedDict)
+    items = []
+    for value in data.values():
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            if isinstance(item, dict) and item.get('elementType'):
+                items.append(item)
+    return items
+
+
+def spec_vocabulary(spec):
+    # Values the spec matches on, per field.
+    vocab = {'elementTypes': set(), 'geometryTypes': set(), 'tags': {}, 'lists': {}}
+
+    def walk(rule):
+        vocab['elementTypes'].update(rule.get('elementTypes') or [])
+        vocab['geometryTypes'].update(rule.get('geometryTypes') or [])
+        for key in ('primaryRepresentationAny', 'representationsAny', 'tmCategoryAny', 'tmRoadTypeAny'):
+            if key in rule:
+                vocab['lists'].setdefault(key, set()).update(rule[key] or [])
+        for key in ('tagsAny', 'tagsAll'):
+            for cond in rule.get(key) or []:
+                vocab['tags'].setdefault(cond.get('key'), set()).update(cond.get('values') or [])
+        for key in ('anyOf', 'allOf'):
+            for sub in rule.get(key) or []:
+                walk(sub)
+
+    for key in ('rules', 'fallbacks', 'modifierRules'):
+        for rule in spec.get(key) or []:
+            walk(rule)
+    return vocab
+
+
+def synthetic_items(spec, rng, count):
+    vocab = spec_vocabulary(spec)
+    inputs = spec.get('inputs', {})
+    element_types = sorted(vocab['elementTypes']) + ['relation', None]
+    geometry_types = sorted(vocab['geometryTypes']) + ['multipolygon', None]
+    tag_keys = sorted(vocab['tags'])
+    extra_values = ['', 'yes', 'no', 'unknown', None]
+    list_fields = {
+        'primaryRepresentationAny': inputs.get('primaryRepresentationField'),
+        'representationsAny': inputs.get('representationsField'),
+        'tmCategoryAny': inputs.get('tmCategoryField'),
+        'tmRoadTypeAny': inputs.get('tmRoadTypeField'),
+    }
+    items = []
+    for _ in range(count):
+        item = {'elementType': rng.choice(element_types)}
+        geometry_type = rng.choice(geometry_types)
+        if geometry_type is not None or rng.random() < 0.5:
+            item['geometry'] = {'type': geometry_type}
+        tags = {}
+        for key in rng.sample(tag_keys, rng.randint(0, min(4, len(tag_keys)))):
+            values = sorted(vocab['tags'][key]) or extra_values
+            tags[key] = rng.choice(values) if rng.random() < 0.8 else rng.choice(extra_values)
+        for key in rng.sample(sorted(SEMANTIC_TAG_KEYS), rng.randint(0, 3)):
+            tags[key] = rng.choice(SEMANTIC_VALUES)
+        if rng.random() < 0.1:
+            tags['name'] = 'Synthetic {}'.format(rng.randint(0, 5))
+        if tags or rng.random() < 0.7:
+            item['tags'] = tags
+        for rule_key, field in list_fields.items():
+            values = sorted(vocab['lists'].get(rule_key) or [])
+            if not field or not values or rng.random() < 0.6:
+                continue
+            if field == inputs.get('representationsField'):
+                item[field] = rng.sample(values, rng.randint(0, min(2, len(values))))
+            else:
+                item[field] = rng.choice(values + [''])
+        if 'tags' in item and rng.random() < 0.1:
+            item['tagSources'] = [
+                {'osmType': 'way', 'osmId': rng.randint(1, 3), 'tags': dict(tags)},
+                {'osmType': rng.choice(['node', 'relation']), 'osmId': 1,
+                 'tags': {rng.choice(sorted(SEMANTIC_TAG_KEYS)): rng.choice(SEMANTIC_VALUES)}},
+            ]
+        items.append(item)
+        if 'tags' in item and rng.random() < 0.3:
+            twin = dict(item)
+            twin['tags'] = dict(tags, name='Twin', note=rng.choice(['a', 'b']))
+            items.append(twin)
+    return items
+
+
+def option_variants(spec):
+    variants = [None]
+    for name, value in (spec.get('options') or {}).items():
+        if isinstance(value, bool):
+            variants.append({name: not value})
+    return variants
+
+
+def compare(label, items, spec, engine):
+    mismatches = 0
+    for override in option_variants(spec):
+        options = engine.resolve_options(override)
+        for item in items:
+            expected = map_desc.classify_item(item, spec, override)
+            actual = engine.classify(item, options)
+            if actual != expected:
+                mismatches += 1
+                if mismatches <= 10:
+                    print('MISMATCH classify {} {}: compiled {} interpreter {}'.format(
+                        override, json.dumps(item)[:200], actual, expected))
+    for item in items:
+        expected = map_desc._collect_modifiers(item, spec, None)
+        actual = engine.modifiers(item)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print('MISMATCH modifiers {}: compiled {} interpreter {}'.format(
+                    json.dumps(item)[:200], actual, expected))
+
+    start = time.perf_counter()
+    for item in items:
+        map_desc.classify_item(item, spec, None)
+        map_desc._collect_modifiers(item, spec, None)
+    interpreter_seconds = time.perf_counter() - start
+    options = engine.resolve_options(None)
+    start = time.perf_counter()
+    for item in items:
+        engine.classify(item, options)
+        engine.modifiers(item)
+    compiled_seconds = time.perf_counter() - start
+    print('{}: {} items, {} mismatches, interpreter {:.3f}s, compiled {:.3f}s'.format(
+        label, len(items), mismatches, interpreter_seconds, compiled_seconds))
+    return mismatches
+
+
+def compare_memo(label, items, spec, engine):
+    mismatches = 0
+    for override in option_variants(spec):
+        memo = ItemMemo(engine, engine.resolve_options(override), max_entries=64)
+        for item in items:
+            key = memo.classification_key(item)
+            checks = (
+                ('classify', memo.classify(item, key), map_desc.classify_item(item, spec, override)),
+                ('modifiers', memo.modifiers(item, key), map_desc._collect_modifiers(item, spec, override)),
+                ('semantics', memo.semantics(item), build_feature_semantics(item)),
+            )
+            for name, actual, expected in checks:
+                if json.dumps(actual) != json.dumps(expected):
+                    mismatches += 1
+                    if mismatches <= 10:
+                        print('MISMATCH memo {} {}: memo {} direct {}'.format(
+                            name, json.dumps(item)[:200], actual, expected))
+        profile = {}
+        memo.record_profile(profile, 'memo')
+    print('{} (memo): {} mismatches, hit rates {}'.format(label, mismatches, ', '.join(
+        '{} {:.0%}'.format(key.split('.')[1], value)
+        for key, value in sorted(profile.items()) if key.endswith('hit-rate'))))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help='map-meta-raw.json files')
+    parser.add_argument('--synthetic', type=int, default=20000, help='number of synthetic items')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    spec = map_desc.load_spec()
+    engine = compile_spec(spec)
+    mismatches = 0
+    for path in args.inputs or DEFAULT_INPUTS:
+        label = os.path.relpath(path, REPO_ROOT)
+        items = items_from_meta(path)
+        mismatches += compare(label, items, spec, engine)
+        mismatches += compare_memo(label, items, spec, engine)
+    if args.synthetic:
+        items = synthetic_items(spec, random.Random(args.seed), args.synthetic)
+        label = 'synthetic (seed {})'.format(args.seed)
+        mismatches += compare(label, items, spec, engine)
+        mismatches += compare_memo(label, items, spec, engine)
+    if mismatches:
+        print('FAIL: {} mismatches'.format(mismatches))
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
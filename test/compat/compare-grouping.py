@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Compare parallel group_map_data in converter/map_desc/__init__.py against the
+serial grouping, and benchmark both.
+
+Each input map-meta file is grouped serially and then on a process pool, with
+the item threshold disabled and small chunks so even small maps are split
+across workers. The grouped output and the augmented map data must serialize
+to identical JSON, and the pool size must be reported in the stats. Exits with
+status 1 on any difference.
+
+--scale repeats the items of each input, to time maps above the default
+TOUCH_MAPPER_MAP_DESC_PARALLEL_MIN_ITEMS on the host that would enable the pool.
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import map_desc  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json'),
+]
+
+
+def scaled(map_data, scale):
+    result = OrderedDict()
+    for key, value in map_data.items():
+        if isinstance(value, list):
+            value = [copy.deepcopy(item) for _ in range(scale) for item in value]
+        result[key] = value
+    return result
+
+
+def item_count(map_data):
+    return sum(
+        1 for value in map_data.values() if isinstance(value, list)
+        for item in value if isinstance(item, dict) and item.get('elementType')
+    )
+
+
+def group(map_data, spec, workers):
+    map_data = copy.deepcopy(map_data)
+    stats = {}
+    start = time.perf_counter()
+    grouped = map_desc.group_map_data(map_data, spec, workers=workers, stats=stats)
+    seconds = time.perf_counter() - start
+    return json.dumps(grouped), json.dumps(map_data), seconds, stats.get('groupMapDataWorkers')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help='map-meta-raw.json files')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-items', type=int, default=16)
+    parser.add_argument('--scale', type=int, default=1, help='repeat the items of each input this many times')
+    args = parser.parse_args()
+
+    os.environ['TOUCH_MAPPER_MAP_DESC_PARALLEL_MIN_ITEMS'] = '0'
+    map_desc.PARALLEL_CHUNK_ITEMS = args.chunk_items
+    spec = map_desc.load_spec()
+    failures = 0
+    for path in args.inputs or DEFAULT_INPUTS:
+        with open(path, 'r', encoding='utf8') as f:
+            map_data = json.load(f, object_pairs_hook=OrderedDict)
+        if args.scale > 1:
+            map_data = scaled(map_data, args.scale)
+        serial_grouped, serial_data, serial_seconds, serial_workers = group(map_data, spec, 0)
+        parallel_grouped, parallel_data, parallel_seconds, parallel_workers = group(map_data, spec, args.workers)
+        same = serial_grouped == parallel_grouped and serial_data == parallel_data
+        if not same:
+            failures += 1
+        if (serial_workers, parallel_workers) != (0, args.workers if args.workers > 1 else 0):
+            failures += 1
+            print('{}: reported workers {} serial, {} parallel'.format(path, serial_workers, parallel_workers))
+        print('{}: {} items, {}, serial {:.3f}s, {} workers {:.3f}s'.format(
+            path, item_count(map_data), 'identical' if same else 'MISMATCH',
+            serial_seconds, args.workers, parallel_seconds))
+    if failures:
+        print('FAIL: {} mismatching inputs'.format(failures))
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
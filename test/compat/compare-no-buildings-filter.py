@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""
+Compare the streaming no-buildings filter in converter/osm_xml.py against the
+previous ElementTree DOM implementation (kept below as the reference), and
+benchmark both.
+
+Outputs are compared as canonical element trees (whitespace between elements
+is ignored). Exits with status 1 if any input produces different output.
+"""
+
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+import osm_xml  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map.osm'),
+    os.path.join(os.path.dirname(__file__), 'fixtures', 'building-relations.osm'),
+] + sorted(
+    os.path.join(REPO_ROOT, 'test', 'osm-parser-compat', 'fixtures', name)
+    for name in os.listdir(os.path.join(REPO_ROOT, 'test', 'osm-parser-compat', 'fixtures'))
+)
+EFF_AREA = {'latMin': 60.0, 'lonMin': 24.0, 'latMax': 60.5, 'lonMax': 24.5}
+
+
+def reference_set_bounds_on_tree(root, eff_area):
+    bounds_attrs = {
+        'minlat': str(eff_area['latMin']),
+        'minlon': str(eff_area['lonMin']),
+        'maxlat': str(eff_area['latMax']),
+        'maxlon': str(eff_area['lonMax']),
+    }
+    for child in list(root):
+        if child.tag == 'bounds':
+            child.attrib = bounds_attrs
+            return
+    bounds_elem = ET.Element('bounds', bounds_attrs)
+    insert_index = 0
+    for i, child in enumerate(list(root)):
+        if child.tag in ('note', 'meta'):
+            insert_index = i + 1
+            continue
+        if child.tag in ('node', 'way', 'relation'):
+            break
+        insert_index = i + 1
+    root.insert(insert_index, bounds_elem)
+
+
+def reference_filter(src_path, dst_path, eff_area):
+    root = ET.parse(src_path).getroot()
+    element_tags = osm_xml.element_tags
+    has_building_tags = osm_xml.has_building_tags
+    ways = {}
+    relations = {}
+    for child in list(root):
+        elem_id = child.get('id')
+        if elem_id is None:
+            continue
+        if child.tag == 'way':
+            ways[elem_id] = child
+        elif child.tag == 'relation':
+            relations[elem_id] = child
+
+    building_way_ids = set()
+    building_relation_ids = set()
+    for way_id, way_elem in ways.items():
+        if has_building_tags(element_tags(way_elem)):
+            building_way_ids.add(way_id)
+    for rel_id, rel_elem in relations.items():
+        if has_building_tags(element_tags(rel_elem)):
+            building_relation_ids.add(rel_id)
+
+    pending_building_relations = list(building_relation_ids)
+    seen_building_relations = set()
+    while pending_building_relations:
+        rel_id = pending_building_relations.pop()
+        if rel_id in seen_building_relations:
+            continue
+        seen_building_relations.add(rel_id)
+        rel_elem = relations.get(rel_id)
+        if rel_elem is None:
+            continue
+        for member in rel_elem.findall('member'):
+            member_type = member.get('type')
+            member_ref = member.get('ref')
+            if member_ref is None:
+                continue
+            if member_type == 'way':
+                building_way_ids.add(member_ref)
+            elif member_type == 'relation' and member_ref not in seen_building_relations:
+                building_relation_ids.add(member_ref)
+                pending_building_relations.append(member_ref)
+
+    keep_way_ids = set(ways.keys()) - building_way_ids
+    keep_relation_ids = set(relations.keys()) - building_relation_ids
+
+    keep_node_ids = set()
+    for way_id in keep_way_ids:
+        for nd in ways[way_id].findall('nd'):
+            ref = nd.get('ref')
+            if ref is not None:
+                keep_node_ids.add(ref)
+    for rel_id in keep_relation_ids:
+        for member in relations[rel_id].findall('member'):
+            if member.get('type') == 'node' and member.get('ref') is not None:
+                keep_node_ids.add(member.get('ref'))
+
+    new_root = ET.Element(root.tag, root.attrib)
+    for child in list(root):
+        elem_id = child.get('id')
+        if child.tag in ('note', 'meta'):
+            new_root.append(copy.deepcopy(child))
+            continue
+        if child.tag == 'node':
+            tags = element_tags(child)
+            if has_building_tags(tags):
+                continue
+            if len(tags) == 0 and elem_id not in keep_node_ids:
+                continue
+            new_root.append(copy.deepcopy(child))
+            continue
+        if child.tag == 'way':
+            if elem_id in keep_way_ids:
+                new_root.append(copy.deepcopy(child))
+            continue
+        if child.tag == 'relation' and elem_id in keep_relation_ids:
+            rel_copy = copy.deepcopy(child)
+            for member in list(rel_copy):
+                if member.tag != 'member':
+                    continue
+                member_ref = member.get('ref')
+                if member_ref is None:
+                    continue
+                if member.get('type') == 'way' and member_ref in building_way_ids:
+                    rel_copy.remove(member)
+                elif member.get('type') == 'relation' and member_ref in building_relation_ids:
+                    rel_copy.remove(member)
+            new_root.append(rel_copy)
+
+    reference_set_bounds_on_tree(new_root, eff_area)
+    with open(dst_path, 'wb') as f:
+        ET.ElementTree(new_root).write(f, encoding='UTF-8', xml_declaration=True)
+
+
+def canonical(elem):
+    return (
+        elem.tag,
+        tuple(sorted(elem.attrib.items())),
+        (elem.text or '').strip(),
+        tuple(canonical(child) for child in elem),
+    )
+
+
+def run_timed(filter_fn, src_path, dst_path, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        filter_fn(src_path, dst_path, EFF_AREA)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    filter_fn(src_path, dst_path, EFF_AREA)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('osm', nargs='*', help="OSM files to compare (default: repo test data and fixtures)")
+    parser.add_argument('--repeats', type=int, default=3, help="timing runs per implementation, best is reported")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference_path = os.path.join(tmp_dir, 'reference.osm')
+        streaming_path = os.path.join(tmp_dir, 'streaming.osm')
+        for src_path in args.osm or DEFAULT_INPUTS:
+            ref_seconds, ref_peak = run_timed(reference_filter, src_path, reference_path, args.repeats)
+            new_seconds, new_peak = run_timed(osm_xml.filter_osm_file_for_no_buildings, src_path, streaming_path, args.repeats)
+            same = canonical(ET.parse(reference_path).getroot()) == canonical(ET.parse(streaming_path).getroot())
+            if not same:
+                failures += 1
+            print("{}: {} reference {:.3f}s peak {:.1f} MiB, streaming {:.3f}s peak {:.1f} MiB, output {} -> {} bytes".format(
+                os.path.relpath(src_path, REPO_ROOT),
+                'OK' if same else 'MISMATCH',
+                ref_seconds, ref_peak / (1024 * 1024),
+                new_seconds, new_peak / (1024 * 1024),
+                os.path.getsize(src_path), os.path.getsize(streaming_path)
+            ))
+    if failures:
+        print("{} input(s) differ".format(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+Compare the NumPy scanline rasterizer in converter/map_desc/areas_raster.py
+against the pure Python cell loop it falls back to, and benchmark both.
+
+Every building/water polygon of the input map-meta files, plus seeded random
+polygons (concave, with holes, crossing the map boundary), is analyzed with
+both engines. The full analyze_area_visibility() results (coverage, segments,
+components, edges, shape) must be identical. Exits with status 1 on any
+difference.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+from map_desc import areas_raster  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json'),
+]
+
+
+def polygons_from_meta(path):
+    with open(path, 'r', encoding='utf8') as f:
+        data = json.load(f)
+    boundary = (data.get('meta') or {}).get('boundary')
+    polygons = []
+    for key in ('areas', 'ways', 'nodes'):
+        for item in data.get(key) or []:
+            geometry = item.get('geometry') or {}
+            if geometry.get('type') == 'polygon':
+                polygons.append(geometry)
+    return boundary, polygons
+
+
+def star_ring(rng, cx, cy, radius, points):
+    ring = []
+    for i in range(points):
+        angle = 2.0 * math.pi * i / points
+        r = radius * rng.uniform(0.35, 1.0)
+        ring.append([cx + r * math.cos(angle), cy + r * math.sin(angle)])
+    ring.append(list(ring[0]))
+    return ring
+
+
+def comb_ring(cx, cy, width, height, teeth):
+    # Comb with teeth pointing north; clipped at the map edge it splits into components.
+    tooth = width / (2 * teeth - 1)
+    ring = [[cx, cy], [cx + width, cy]]
+    for i in range(teeth - 1, -1, -1):
+        left = cx + 2 * i * tooth
+        ring.append([left + tooth, cy + height])
+        ring.append([left, cy + height])
+        if i:
+            ring.append([left, cy + height * 0.2])
+            ring.append([left - tooth, cy + height * 0.2])
+    ring.append([cx, cy])
+    return ring
+
+
+def synthetic_polygons(boundary, count, seed):
+    rng = random.Random(seed)
+    width = boundary['maxX'] - boundary['minX']
+    height = boundary['maxY'] - boundary['minY']
+    polygons = []
+    for i in range(count):
+        cx = boundary['minX'] + rng.uniform(-0.1, 1.1) * width
+        cy = boundary['minY'] + rng.uniform(-0.1, 1.1) * height
+        radius = max(width, height) * rng.choice([0.003, 0.01, 0.05, 0.2, 0.6])
+        if i % 5 == 4:
+            polygons.append({
+                'type': 'polygon',
+                'outer': comb_ring(cx, cy, radius * 2, radius * 2, rng.randint(2, 6))
+            })
+            continue
+        geometry = {
+            'type': 'polygon',
+            'outer': star_ring(rng, cx, cy, radius, rng.randint(3, 60)),
+        }
+        if i % 3 == 0:
+            geometry['holes'] = [star_ring(rng, cx, cy, radius * 0.3, rng.randint(3, 12))]
+        polygons.append(geometry)
+    return polygons
+
+
+def run_engine(use_numpy, boundary, polygons):
+    areas_raster.USE_NUMPY = use_numpy
+    start = time.perf_counter()
+    results = [areas_raster.analyze_area_visibility(geometry, boundary) for geometry in polygons]
+    elapsed = time.perf_counter() - start
+    return [json.dumps(result, sort_keys=True) for result in results], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('meta', nargs='*', help="map-meta JSON files (default: repo test data)")
+    parser.add_argument('--synthetic', type=int, default=300, help="random polygons per input")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if areas_raster.np is None:
+        print("NumPy is not installed; only the pure Python rasterizer is available")
+        return 1
+
+    failures = 0
+    for path in args.meta or DEFAULT_INPUTS:
+        boundary, polygons = polygons_from_meta(path)
+        polygons += synthetic_polygons(boundary, args.synthetic, args.seed)
+        # Warm up the per-boundary segment grid so timings compare rasterization only.
+        run_engine(True, boundary, polygons[:1])
+        python_results, python_seconds = run_engine(False, boundary, polygons)
+        numpy_results, numpy_seconds = run_engine(True, boundary, polygons)
+        mismatches = [
+            i for i, (a, b) in enumerate(zip(python_results, numpy_results)) if a != b
+        ]
+        failures += len(mismatches)
+        multi_component = sum(1 for r in python_results if r.count('"cellCount"') > 1)
+        print("{}: {} {} polygons ({} with several components), python {:.3f}s, numpy {:.3f}s ({:.1f}x)".format(
+            os.path.relpath(path, REPO_ROOT),
+            'OK' if not mismatches else 'MISMATCH',
+            len(polygons),
+            multi_component,
+            python_seconds,
+            numpy_seconds,
+            python_seconds / numpy_seconds if numpy_seconds > 0 else 0.0
+        ))
+        for i in mismatches[:5]:
+            print("  polygon {} differs:\n    python {}\n    numpy  {}".format(
+                i, python_results[i][:300], numpy_results[i][:300]
+            ))
+    if failures:
+        print("{} polygon(s) differ".format(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
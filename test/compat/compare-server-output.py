@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Compare the output of the warm OSM2World job server against one-shot
+OSM2World runs.
+
+Each input is converted one-shot, and then several times in a row by one job
+server, the way osm-to-tactile.py runs them with
+TOUCH_MAPPER_OSM2WORLD_SERVER=true. Every server job must write the same
+map.obj, map.obj.mtl and map-meta-raw.json as the one-shot run, so state left
+behind by earlier jobs in the JVM shows up as a difference. All jobs after the
+first must run in the warm server. Exits with status 1 on any difference.
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CONVERTER_DIR = os.path.join(REPO_ROOT, 'converter')
+sys.path.insert(0, CONVERTER_DIR)
+
+from telemetry import TelemetryLogger  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map.osm'),
+]
+OUTPUT_NAMES = ('map.obj', 'map.obj.mtl', 'map-meta-raw.json')
+
+
+def load_osm_to_tactile():
+    spec = importlib.util.spec_from_file_location('osm_to_tactile', os.path.join(CONVERTER_DIR, 'osm-to-tactile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def convert(osm_to_tactile, osm_path, out_dir, scale, server):
+    # Run OSM2World on osm_path into out_dir and return (outputs by name, server reply or None)
+    os.environ[osm_to_tactile.OSM2WORLD_SERVER_ENV_VAR] = 'true' if server else 'false'
+    for name in OUTPUT_NAMES:
+        if os.path.exists(os.path.join(out_dir, name)):
+            os.remove(os.path.join(out_dir, name))
+    telemetry = TelemetryLogger(component='osm2world-server-compat')
+    _meta, _rss, reply = osm_to_tactile.run_osm2world(
+        osm_path, os.path.join(out_dir, 'map.obj'), scale, False, telemetry)
+    outputs = {}
+    for name in OUTPUT_NAMES:
+        with open(os.path.join(out_dir, name), 'rb') as f:
+            outputs[name] = f.read()
+    return outputs, reply
+
+
+def stop_server(osm_to_tactile, server_dir):
+    port_path = osm_to_tactile.osm2world_server_port_path(server_dir)
+    state = osm_to_tactile.read_osm2world_server_state(port_path)
+    if state is not None:
+        osm_to_tactile.kill_osm2world_server(port_path, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help='.osm files')
+    parser.add_argument('--jobs', type=int, default=2, help='server jobs per input')
+    parser.add_argument('--scale', type=int, default=1400, help='map scale')
+    parser.add_argument('--keep', action='store_true', help='keep the output directory')
+    args = parser.parse_args()
+
+    osm_to_tactile = load_osm_to_tactile()
+    work_dir = tempfile.mkdtemp(prefix='osm2world-server-compat-')
+    one_shot_dir = os.path.join(work_dir, 'one-shot')
+    server_dir = os.path.join(work_dir, 'server')
+    os.makedirs(one_shot_dir)
+    os.makedirs(server_dir)
+    failures = 0
+    jobs = 0
+    try:
+        for osm_path in args.inputs or DEFAULT_INPUTS:
+            expected, _reply = convert(osm_to_tactile, osm_path, one_shot_dir, args.scale, False)
+            for _ in range(args.jobs):
+                actual, reply = convert(osm_to_tactile, osm_path, server_dir, args.scale, True)
+                jobs += 1
+                problems = [name for name in OUTPUT_NAMES if actual[name] != expected[name]]
+                if reply is None:
+                    problems.append('ran one-shot, the server failed')
+                elif jobs > 1 and not reply.get('warm'):
+                    problems.append('server was not warm')
+                if problems:
+                    failures += 1
+                print('{}: server job {}: {}'.format(
+                    osm_path, jobs, 'identical' if not problems else 'MISMATCH ' + ', '.join(problems)))
+    finally:
+        stop_server(osm_to_tactile, server_dir)
+        if args.keep:
+            print('outputs in ' + work_dir)
+        else:
+            shutil.rmtree(work_dir)
+    if failures:
+        print('FAIL: {} mismatching server jobs'.format(failures))
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Compare the one-pass STL writer of obj-to-tactile.py (converter/stl_writer.py)
+against bpy.ops.export_mesh.stl, and time both.
+
+Runs inside Blender. make_tactile_map runs once on the input; the same scene is
+then exported both ways. Each of map.stl, map-ways.stl and map-rest.stl must be
+byte-identical; when it isn't, the largest corner difference of the triangles
+(in any order) is printed too. The triangle counts in map-stl-report.json must
+match the files. Exits with status 1 on any difference.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import importlib.util
+
+import bpy
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CONVERTER_DIR = os.path.join(REPO_ROOT, 'converter')
+DEFAULT_INPUT = os.path.join(REPO_ROOT, 'test', 'data', 'map.obj')
+DEFAULT_META = os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json')
+# STL coordinates are float32 millimetres
+TOLERANCE_MM = 1e-4
+
+
+def script_argv():
+    return sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+
+def load_obj_to_tactile():
+    spec = importlib.util.spec_from_file_location('obj_to_tactile', os.path.join(CONVERTER_DIR, 'obj-to-tactile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_mesh(obj_to_tactile, mesh_path):
+    # OSM2World .obj files are imported with their object names, which make_tactile_map groups
+    # objects by; grouped .ply files from clip-2d are imported like obj-to-tactile.py does
+    if mesh_path.lower().endswith('.obj'):
+        bpy.ops.import_scene.obj(filepath=mesh_path, axis_forward='-Z', axis_up='Y')
+    else:
+        obj_to_tactile.import_mesh_file(mesh_path)
+
+
+def read_triangles(path, stl_writer):
+    with open(path, 'rb') as f:
+        data = f.read()
+    count = stl_writer.triangle_count(path)
+    records = np.frombuffer(data, dtype=stl_writer.TRIANGLE_DTYPE, count=count, offset=stl_writer.HEADER_SIZE + 4)
+    return records['corners'].astype(np.float64)
+
+
+def canonical_triangles(corners):
+    # Rotate each triangle to start at its smallest corner (keeping the winding) and sort them
+    quantized = np.round(corners / TOLERANCE_MM).astype(np.int64).reshape(-1, 3)
+    triangle_ids = np.repeat(np.arange(len(corners)), 3)
+    smallest = np.lexsort((quantized[:, 2], quantized[:, 1], quantized[:, 0], triangle_ids))[::3] % 3
+    rotation = (smallest[:, None] + np.arange(3)) % 3
+    rotated = corners[np.arange(len(corners))[:, None], rotation].reshape(-1, 9)
+    order = np.lexsort(np.round(rotated / TOLERANCE_MM).astype(np.int64).T[::-1])
+    return rotated[order]
+
+
+def compare(name, expected_path, actual_path, stl_writer):
+    with open(expected_path, 'rb') as f:
+        expected_bytes = f.read()
+    with open(actual_path, 'rb') as f:
+        actual_bytes = f.read()
+    expected = read_triangles(expected_path, stl_writer)
+    if expected_bytes == actual_bytes:
+        print('{}: {} triangles, identical'.format(name, len(expected)))
+        return True
+    offset = next((i for i, (a, b) in enumerate(zip(expected_bytes, actual_bytes)) if a != b),
+                  min(len(expected_bytes), len(actual_bytes)))
+    actual = read_triangles(actual_path, stl_writer)
+    if len(expected) != len(actual):
+        print('{}: FAIL triangle count {} != {}'.format(name, len(actual), len(expected)))
+        return False
+    difference = 0.0
+    if len(expected):
+        difference = float(np.abs(canonical_triangles(expected) - canonical_triangles(actual)).max())
+    print('{}: FAIL {} triangles, first difference at byte {}, max corner difference {:.2e} mm'.format(
+        name, len(expected), offset, difference))
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the one-pass STL writer against bpy.ops.export_mesh.stl')
+    parser.add_argument('--meta', default=DEFAULT_META, help='map-meta JSON with meta.boundary of the input')
+    parser.add_argument('--scale', type=int, default=3100, help='map scale')
+    parser.add_argument('--keep', action='store_true', help='keep the output directory')
+    parser.add_argument('mesh_paths', nargs='*', default=[DEFAULT_INPUT], help='.obj/.ply input files')
+    args = parser.parse_args(script_argv())
+
+    with open(args.meta, 'r', encoding='utf8') as f:
+        boundary = json.load(f)['meta']['boundary']
+    obj_to_tactile = load_obj_to_tactile()
+    stl_writer = obj_to_tactile.stl_writer
+    if stl_writer is None:
+        print('NumPy is not available in this Blender')
+        sys.exit(1)
+
+    map_args = obj_to_tactile.do_cmdline([
+        '--scale', str(args.scale),
+        '--min-x', str(boundary['minX']),
+        '--min-y', str(boundary['minY']),
+        '--max-x', str(boundary['maxX']),
+        '--max-y', str(boundary['maxY']),
+    ] + args.mesh_paths)
+    obj_to_tactile.remove_everything()
+    for mesh_path in args.mesh_paths:
+        import_mesh(obj_to_tactile, mesh_path)
+    base_cube = obj_to_tactile.make_tactile_map(map_args)
+    obj_to_tactile.move_everything([-c for c in obj_to_tactile.get_minimum_coordinate(base_cube)])
+
+    output_dir = tempfile.mkdtemp(prefix='stl-writer-blender-')
+    base_paths = {}
+    reports = {}
+    for writer in ('operator', 'numpy'):
+        os.environ[obj_to_tactile.STL_WRITER_ENV_VAR] = writer
+        base_paths[writer] = os.path.join(output_dir, writer, 'map')
+        os.makedirs(os.path.dirname(base_paths[writer]))
+        t = time.time()
+        obj_to_tactile.export_stl_files(base_paths[writer], args.scale)
+        print('{} writer took {:.2f}s'.format(writer, time.time() - t))
+        with open(base_paths[writer] + '-stl-report.json', 'r', encoding='utf8') as f:
+            reports[writer] = json.load(f)
+
+    ok = True
+    for suffix in obj_to_tactile.STL_SUFFIXES:
+        name = 'map' + suffix + '.stl'
+        ok = compare(name, base_paths['operator'] + suffix + '.stl', base_paths['numpy'] + suffix + '.stl',
+                     stl_writer) and ok
+        reported = reports['numpy']['triangles'].get(name)
+        written = stl_writer.triangle_count(base_paths['numpy'] + suffix + '.stl')
+        if reported != written:
+            print('{}: FAIL report says {} triangles, file has {}'.format(name, reported, written))
+            ok = False
+    if args.keep:
+        print('outputs in ' + output_dir)
+    else:
+        shutil.rmtree(output_dir)
+    if not ok:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Compare the STL files obj-to-tactile.py writes with its NumPy mesh path
+(TOUCH_MAPPER_BLENDER_NUMPY_MESH=true, converter/mesh_arrays.py) against the
+ones it writes with Blender's edit mode operators, and time both.
+
+Runs inside Blender. Both paths run make_tactile_map on the same input and
+export the STL files. For each of map.stl, map-ways.stl and map-rest.stl the
+triangle counts, total areas, signed volumes and bounds must match, and every
+vertex and every triangle centroid of one file must have a counterpart in the
+other within the tolerance. Exits with status 1 on any difference.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import importlib.util
+
+import bpy
+import mathutils.kdtree
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CONVERTER_DIR = os.path.join(REPO_ROOT, 'converter')
+DEFAULT_INPUT = os.path.join(REPO_ROOT, 'test', 'data', 'map.obj')
+DEFAULT_META = os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json')
+STL_SUFFIXES = ('', '-ways', '-rest')
+# STL coordinates are float32 millimetres
+TOLERANCE_MM = 1e-3
+RELATIVE_TOLERANCE = 1e-5
+STL_TRIANGLE = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+def script_argv():
+    return sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+
+def load_obj_to_tactile():
+    spec = importlib.util.spec_from_file_location('obj_to_tactile', os.path.join(CONVERTER_DIR, 'obj-to-tactile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_mesh(obj_to_tactile, mesh_path):
+    # OSM2World .obj files are imported with their object names, which make_tactile_map groups
+    # objects by; grouped .ply files from clip-2d are imported like obj-to-tactile.py does
+    if mesh_path.lower().endswith('.obj'):
+        bpy.ops.import_scene.obj(filepath=mesh_path, axis_forward='-Z', axis_up='Y')
+    else:
+        obj_to_tactile.import_mesh_file(mesh_path)
+
+
+def read_stl(path):
+    # Triangle corners of a binary STL file as a (N, 3, 3) array
+    with open(path, 'rb') as f:
+        f.read(80)
+        count = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        triangles = np.frombuffer(f.read(count * STL_TRIANGLE.itemsize), dtype=STL_TRIANGLE)
+    return triangles['corners'].astype(np.float64)
+
+
+def unique_points(points):
+    # np.unique(axis=0) is too new for Blender 2.78's NumPy
+    points = np.ascontiguousarray(points)
+    rows = points.view(np.dtype((np.void, points.dtype.itemsize * points.shape[1])))
+    _rows, indices = np.unique(rows, return_index=True)
+    return points[indices]
+
+
+def max_distance(points, other_points):
+    # Largest distance from a point to the nearest of other_points
+    if len(points) == 0 or len(other_points) == 0:
+        return 0.0 if len(points) == len(other_points) else float('inf')
+    tree = mathutils.kdtree.KDTree(len(other_points))
+    for i, point in enumerate(other_points):
+        tree.insert(point, i)
+    tree.balance()
+    return max(tree.find(point)[2] for point in points)
+
+
+def stl_stats(corners):
+    edges1 = corners[:, 1] - corners[:, 0]
+    edges2 = corners[:, 2] - corners[:, 0]
+    crosses = np.cross(edges1, edges2)
+    return {
+        'triangles': len(corners),
+        'area': float(np.sqrt(np.einsum('ij,ij->i', crosses, crosses)).sum() / 2),
+        'volume': float(np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6),
+        'min': corners.reshape(-1, 3).min(axis=0) if len(corners) else np.zeros(3),
+        'max': corners.reshape(-1, 3).max(axis=0) if len(corners) else np.zeros(3),
+    }
+
+
+def compare_stl(name, expected_path, actual_path):
+    expected = read_stl(expected_path)
+    actual = read_stl(actual_path)
+    expected_stats = stl_stats(expected)
+    actual_stats = stl_stats(actual)
+    failures = []
+    if expected_stats['triangles'] != actual_stats['triangles']:
+        failures.append('triangle count {} != {}'.format(actual_stats['triangles'], expected_stats['triangles']))
+    for key in ('area', 'volume'):
+        scale = max(abs(expected_stats[key]), 1.0)
+        if abs(actual_stats[key] - expected_stats[key]) > RELATIVE_TOLERANCE * scale:
+            failures.append('{} {:.6f} != {:.6f}'.format(key, actual_stats[key], expected_stats[key]))
+    for key in ('min', 'max'):
+        if np.abs(actual_stats[key] - expected_stats[key]).max() > TOLERANCE_MM:
+            failures.append('bounds {} {} != {}'.format(key, actual_stats[key], expected_stats[key]))
+
+    expected_vertices = unique_points(expected.reshape(-1, 3))
+    actual_vertices = unique_points(actual.reshape(-1, 3))
+    vertex_distance = max(max_distance(expected_vertices, actual_vertices),
+                          max_distance(actual_vertices, expected_vertices))
+    if vertex_distance > TOLERANCE_MM:
+        failures.append('vertices differ by up to {:.6f} mm'.format(vertex_distance))
+    centroid_distance = max(max_distance(expected.mean(axis=1), actual.mean(axis=1)),
+                            max_distance(actual.mean(axis=1), expected.mean(axis=1)))
+    if centroid_distance > TOLERANCE_MM:
+        failures.append('triangles differ by up to {:.6f} mm'.format(centroid_distance))
+
+    print('{}: {} triangles, area {:.1f} mm2, volume {:.1f} mm3, max vertex distance {:.2e} mm, '
+          'max triangle distance {:.2e} mm'.format(name, expected_stats['triangles'], expected_stats['area'],
+                                                   expected_stats['volume'], vertex_distance, centroid_distance))
+    for failure in failures:
+        print('  FAIL ' + failure)
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare obj-to-tactile STL output of the NumPy mesh path and the operator path')
+    parser.add_argument('--meta', default=DEFAULT_META, help='map-meta JSON with meta.boundary of the input')
+    parser.add_argument('--scale', type=int, default=3100, help='map scale')
+    parser.add_argument('--keep', action='store_true', help='keep the output directory')
+    parser.add_argument('mesh_paths', nargs='*', default=[DEFAULT_INPUT], help='.obj/.ply input files')
+    args = parser.parse_args(script_argv())
+
+    with open(args.meta, 'r', encoding='utf8') as f:
+        boundary = json.load(f)['meta']['boundary']
+    obj_to_tactile = load_obj_to_tactile()
+    if obj_to_tactile.mesh_arrays is None:
+        print('NumPy is not available in this Blender')
+        sys.exit(1)
+
+    output_dir = tempfile.mkdtemp(prefix='mesh-arrays-compat-')
+    base_paths = {}
+    for mode in ('operators', 'numpy'):
+        os.environ[obj_to_tactile.NUMPY_MESH_ENV_VAR] = 'true' if mode == 'numpy' else 'false'
+        base_paths[mode] = os.path.join(output_dir, mode, 'map')
+        os.makedirs(os.path.dirname(base_paths[mode]))
+        map_args = obj_to_tactile.do_cmdline([
+            '--scale', str(args.scale),
+            '--min-x', str(boundary['minX']),
+            '--min-y', str(boundary['minY']),
+            '--max-x', str(boundary['maxX']),
+            '--max-y', str(boundary['maxY']),
+        ] + args.mesh_paths)
+        obj_to_tactile.remove_everything()
+        for mesh_path in args.mesh_paths:
+            import_mesh(obj_to_tactile, mesh_path)
+        t = time.time()
+        base_cube = obj_to_tactile.make_tactile_map(map_args)
+        seconds = time.time() - t
+        obj_to_tactile.move_everything([-c for c in obj_to_tactile.get_minimum_coordinate(base_cube)])
+        obj_to_tactile.export_stl(base_paths[mode], args.scale)
+        obj_to_tactile.export_stl_separate(base_paths[mode], args.scale)
+        print('{} path: make_tactile_map took {:.2f}s'.format(mode, seconds))
+
+    ok = True
+    for suffix in STL_SUFFIXES:
+        ok = compare_stl('map' + suffix + '.stl',
+                         base_paths['operators'] + suffix + '.stl',
+                         base_paths['numpy'] + suffix + '.stl') and ok
+    if args.keep:
+        print('outputs in ' + output_dir)
+    else:
+        shutil.rmtree(output_dir)
+    if not ok:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+Compare LocationZoneGrid in converter/map_desc/map_desc_loc_segments.py against
+classify_location, and benchmark both.
+
+Points are taken from the item geometries of the input map-meta files, from a
+seeded random cloud around each boundary (including points outside it), and
+from dense lines along every zone border: the center and part bands, the
+sector rays and the grid cell edges. Every point is classified twice through
+the grid, so both the first-hit path and the filled-cell path are checked.
+Results must be identical to classify_location. Exits with status 1 on any
+difference.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'converter'))
+
+from map_desc import map_desc_loc_segments as zones  # noqa: E402
+
+DEFAULT_INPUTS = [
+    os.path.join(REPO_ROOT, 'test', 'data', 'map-meta.indented.json'),
+]
+SYNTHETIC_BOUNDARIES = [
+    {'minX': -250.0, 'minY': -250.0, 'maxX': 250.0, 'maxY': 250.0},
+    {'minX': 3.7, 'minY': -1000.0, 'maxX': 17.1, 'maxY': -990.0},
+    {'minX': 0, 'minY': 0, 'maxX': 7, 'maxY': 3},
+]
+
+
+def collect_coords(value, out):
+    if isinstance(value, (list, tuple)):
+        if len(value) >= 2 and all(isinstance(v, (int, float)) for v in value[:2]):
+            out.append({'x': value[0], 'y': value[1]})
+            return
+        for child in value:
+            collect_coords(child, out)
+
+
+def points_from_meta(path):
+    with open(path, 'r', encoding='utf8') as f:
+        data = json.load(f)
+    boundary = (data.get('meta') or {}).get('boundary')
+    points = []
+    for key in ('areas', 'ways', 'nodes'):
+        for item in data.get(key) or []:
+            geometry = item.get('geometry') or {}
+            collect_coords(geometry.get('coordinates'), points)
+            for ring in (geometry.get('outer'), ) + tuple(geometry.get('holes') or ()):
+                collect_coords(ring, points)
+    return boundary, points
+
+
+def border_points(boundary, rng, count):
+    min_x = boundary['minX']
+    min_y = boundary['minY']
+    width = boundary['maxX'] - min_x
+    height = boundary['maxY'] - min_y
+
+    def at(dx, dy):
+        return {'x': min_x + width * (0.5 + dx / 2.0), 'y': min_y + height * (0.5 + dy / 2.0)}
+
+    points = []
+    for _ in range(count):
+        points.append({'x': min_x + width * rng.uniform(-0.1, 1.1),
+                       'y': min_y + height * rng.uniform(-0.1, 1.1)})
+    steps = 1000
+    for band in (zones.CENTER_BAND, zones.PART_BAND, 1.0):
+        for step in range(-steps, steps + 1):
+            offset = band * step / steps
+            points.extend([at(band, offset), at(-band, offset), at(offset, band), at(offset, -band)])
+    for angle in (-180.0, -155.0, -115.0, -65.0, -25.0, 0.0, 25.0, 65.0, 90.0, 115.0, 155.0, 180.0):
+        rad = math.radians(angle)
+        for step in range(steps + 500):
+            radius = step / steps
+            points.append(at(radius * math.cos(rad), radius * math.sin(rad)))
+    size = zones.ZONE_GRID_SIZE * 8
+    for i in range(size + 1):
+        for j in range(0, size + 1, 7):
+            points.append({'x': min_x + width * i / size, 'y': min_y + height * j / size})
+    return points
+
+
+def compare(boundary, points):
+    grid = zones.LocationZoneGrid(boundary)
+    mismatches = 0
+    for _ in range(2):
+        for point in points:
+            expected = zones.classify_location(point, boundary)
+            actual = grid.classify(point)
+            if actual != expected:
+                mismatches += 1
+                if mismatches <= 10:
+                    print('MISMATCH {} {}: grid {} exact {}'.format(boundary, point, actual, expected))
+
+    start = time.perf_counter()
+    for point in points:
+        zones.classify_location(point, boundary)
+    exact_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for point in points:
+        grid.classify(point)
+    grid_seconds = time.perf_counter() - start
+    mixed = sum(1 for cell in grid.cells if cell == zones._CELL_MIXED)
+    print('{}: {} points, {} mismatches, {} of {} cells straddle zones, exact {:.3f}s, grid {:.3f}s'.format(
+        boundary, len(points), mismatches, mixed, len(grid.cells), exact_seconds, grid_seconds))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help='map-meta-raw.json files')
+    parser.add_argument('--random', type=int, default=100000, help='random points per boundary')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    for path in args.inputs or DEFAULT_INPUTS:
+        boundary, points = points_from_meta(path)
+        if not boundary:
+            print('{}: no boundary, skipped'.format(path))
+            continue
+        mismatches += compare(boundary, points + border_points(boundary, rng, args.random))
+    for boundary in SYNTHETIC_BOUNDARIES:
+        mismatches += compare(boundary, border_points(boundary, rng, args.random))
+    if mismatches:
+        print('FAIL: {} mismatches'.format(mismatches))
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+"""
+Run the converter compatibility checks in this directory.
+
+Each check is a standalone script that compares a converter code path against
+its reference implementation and exits with status 1 on any difference.
+Exits with status 1 if any check failed.
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+COMPAT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(COMPAT_DIR, '..', '..'))
+
+# (name, script, what else it needs: None, 'numpy', 'ant', 'osm2world' or 'blender'). For 'ant'
+# the script is an ant build file relative to the repo root, built with its jar target; 'blender'
+# scripts run inside Blender.
+CHECKS = [
+    ('osm-filter', 'compare-no-buildings-filter.py', None),
+    ('areas-raster', 'compare-rasterizers.py', 'numpy'),
+    ('areas-coverage', 'check-zone-areas.py', 'numpy'),
+    ('location-zones', 'compare-zone-grid.py', None),
+    ('classification', 'compare-engines.py', None),
+    ('map-desc-parallel', 'compare-grouping.py', None),
+    ('ways-clip', 'compare-clippers.py', 'numpy'),
+    ('json-backends', 'bench-call-sites.py', None),
+    ('osm2world-server-timeout', 'check-osm2world-server-timeout.py', None),
+    ('osm2world-build', 'OSM2World/build.xml', 'ant'),
+    ('osm2world-server', 'compare-server-output.py', 'osm2world'),
+    ('multipart-batch', 'check-tile-geometry.py', None),
+    ('mesh-arrays', 'compare-stl.py', 'blender'),
+    ('stl-writer', 'check-stl-writer-bytes.py', 'numpy'),
+    ('stl-writer-blender', 'compare-stl-writers.py', 'blender'),
+]
+
+OSM2WORLD_JAR = os.path.join(REPO_ROOT, 'converter', 'OSM2World', 'build', 'OSM2World.jar')
+BLENDER_DIR = os.path.join(REPO_ROOT, 'converter', 'blender')
+
+
+def check_command(script, needs):
+    if needs == 'ant':
+        return ['ant', '-q', '-f', os.path.join(REPO_ROOT, script), 'jar']
+    if needs == 'blender':
+        return [os.path.join(BLENDER_DIR, 'blender'), '-noaudio', '--background', '--factory-startup',
+                '--python-exit-code', '1', '--python', os.path.join(COMPAT_DIR, script)]
+    return [sys.executable, os.path.join(COMPAT_DIR, script)]
+
+
+def missing_requirement(needs):
+    # Why a check can't run here, or None
+    if needs == 'numpy' and importlib.util.find_spec('numpy') is None:
+        return 'NumPy is not installed'
+    if needs == 'ant' and shutil.which('ant') is None:
+        return 'ant is not installed'
+    if needs == 'osm2world':
+        if shutil.which('java') is None:
+            return 'java is not installed'
+        if not os.path.exists(OSM2WORLD_JAR):
+            return 'OSM2World is not built (make osm2world)'
+    if needs == 'blender' and not os.path.exists(os.path.join(BLENDER_DIR, 'blender')):
+        return 'Blender is not installed (init.sh)'
+    return None
+
+
+def check_env(needs):
+    env = os.environ.copy()
+    if needs == 'blender':
+        # Like osm-to-tactile.py runs Blender
+        env['LD_LIBRARY_PATH'] = os.path.join(BLENDER_DIR, 'lib') + ':' + env.get('LD_LIBRARY_PATH', '')
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('names', nargs='*', help='checks to run, default all')
+    parser.add_argument('--verbose', action='store_true', help='also print the output of passing checks')
+    args = parser.parse_args()
+
+    known = [name for name, _script, _needs in CHECKS]
+    unknown = [name for name in args.names if name not in known]
+    if unknown:
+        parser.error('unknown checks: {} (known: {})'.format(', '.join(unknown), ', '.join(known)))
+
+    failed = []
+    skipped = 0
+    for name, script, needs in CHECKS:
+        if args.names and name not in args.names:
+            continue
+        reason = missing_requirement(needs)
+        if reason is not None:
+            skipped += 1
+            print('SKIP {}: {}'.format(name, reason))
+            continue
+        start = time.time()
+        result = subprocess.run(check_command(script, needs), cwd=REPO_ROOT, env=check_env(needs),
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = result.stdout.decode('utf8', 'replace')
+        ok = result.returncode == 0
+        print('{} {} ({:.1f}s)'.format('PASS' if ok else 'FAIL', name, time.time() - start))
+        if not ok:
+            failed.append(name)
+        if not ok or args.verbose:
+            for line in output.rstrip().splitlines():
+                print('  ' + line)
+
+    if failed:
+        print('FAIL: {}'.format(', '.join(failed)))
+        sys.exit(1)
+    print('OK{}'.format(', {} skipped'.format(skipped) if skipped else ''))
+
+
+if __name__ == '__main__':
+    main()
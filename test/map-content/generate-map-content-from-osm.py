@@ -9,7 +9,7 @@ import subprocess
 import sys
 import time
 from pathlib import Path
-from typing import Dict, List, TypedDict
+from typing import Any, Dict, List, TypedDict
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 if str(REPO_ROOT) not in sys.path:
@@ -357,7 +357,8 @@ def main() -> int:
 
     map_desc_start = _stage_start(log_prefix, "run-map-desc")
     map_desc_profile: Dict[str, float] = {}
-    run_map_desc(str(raw_meta_path), profile=map_desc_profile, pretty_json=pretty_json)
+    map_desc_stats: Dict[str, Any] = {}
+    run_map_desc(str(raw_meta_path), profile=map_desc_profile, pretty_json=pretty_json, stats=map_desc_stats)
     for key, value in sorted(map_desc_profile.items()):
         timings["run-map-desc." + key] = value
     timings["run-map-desc"] = _stage_done(log_prefix, "run-map-desc", map_desc_start)
@@ -410,6 +411,7 @@ def main() -> int:
         "mapMetaAugmentedPath": str(map_meta_augmented_path),
         "mapContentPath": str(map_content_path),
         "timings": timings,
+        "mapDescStats": map_desc_stats,
     }
     result.update(blender_output_paths)
     print(json.dumps(result, indent=2))
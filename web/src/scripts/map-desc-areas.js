@@ -444,11 +444,12 @@
       if (!bucket) {
         return;
       }
-      matchedSegments += 1;
+      // insideCount is an area in grid cells, not an integer count
       const count = Number(segment.insideCount);
       if (!isFinite(count) || count <= 0) {
         return;
       }
+      matchedSegments += 1;
       buckets[bucket] += count;
     });
     if (matchedSegments <= 1) {